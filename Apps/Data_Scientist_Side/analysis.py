@@ -0,0 +1,169 @@
+"""
+Uncertainty and per-segment breakdown of a stored model test run.
+
+Bootstrap: MAE, RMSE and R² only depend on four sums over the rows (|e|,
+e², y, y²), so a resample is a vector of row counts times an (n, 4) value
+matrix. Resamples are drawn in blocks as index matrices, turned into count
+matrices with a single bincount and multiplied out; blocks can be spread
+over forked workers (fork_pool.fork_map), which read the value matrix from
+the parent's memory.
+
+Segments: the result store keeps text columns as integer codes, so the
+error sums per Area/Neighborhood/... are bincounts over the codes, with no
+string handling at all.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .fork_pool import fork_map
+from .preprocessing import TARGET_COLUMN
+from .result_store import TEXT, ResultReader
+
+BOOTSTRAP_RESAMPLES = 200
+CONFIDENCE = 0.95
+# Resamples drawn per index matrix (bounds its memory to block * n * 8 bytes)
+BOOTSTRAP_BLOCK = 8
+# Below this many rows forking workers costs more than it saves
+PARALLEL_MIN_ROWS = 100_000
+
+SEGMENT_COLUMNS = ['Area', 'Neighborhood', 'political_classification', 'parcel_shape']
+# Segments shown per column, largest MAE first
+SEGMENT_ROWS = 15
+# Segments with fewer rows than this are left out of the tables
+MIN_SEGMENT_ROWS = 5
+
+
+def _resample_sums(values, resamples, seed):
+    """(resamples, 4) column sums of `values` over bootstrap resamples."""
+    n = len(values)
+    rng = np.random.default_rng(seed)
+    sums = np.empty((resamples, values.shape[1]))
+    for start in range(0, resamples, BOOTSTRAP_BLOCK):
+        block = min(BOOTSTRAP_BLOCK, resamples - start)
+        # Index matrix: row i is resample i; offset rows so one bincount counts all of them
+        index = rng.integers(0, n, size=(block, n))
+        index += np.arange(block)[:, None] * n
+        counts = np.bincount(index.ravel(), minlength=block * n).reshape(block, n)
+        sums[start:start + block] = counts @ values
+    return sums
+
+
+def bootstrap_intervals(y_true, y_pred, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE,
+                        seed=0, workers=None):
+    """
+    Percentile bootstrap confidence intervals for MAE, RMSE and R².
+    Returns {'mae': [low, high], 'rmse': [...], 'r2': [...], 'confidence', 'resamples'}.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    error = np.asarray(y_pred, dtype=np.float64) - y_true
+    # Centred first so the sum-of-squares form of the variance doesn't cancel out
+    centred = y_true - y_true.mean()
+    values = np.column_stack([np.abs(error), error * error, centred, centred * centred])
+    n = len(values)
+
+    if workers is None:
+        workers = getattr(settings, 'MODEL_TEST_BOOTSTRAP_WORKERS', None) or os.cpu_count() or 1
+    if n < PARALLEL_MIN_ROWS:
+        workers = 1
+    workers = max(1, min(workers, math.ceil(resamples / BOOTSTRAP_BLOCK)))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [len(part) for part in np.array_split(np.arange(resamples), workers)]
+
+    sums = np.vstack(fork_map(_resample_sums, values, zip(shares, seeds), workers))
+
+    mae = sums[:, 0] / n
+    rmse = np.sqrt(sums[:, 1] / n)
+    ss_tot = sums[:, 3] - sums[:, 2] ** 2 / n
+    # Constant targets follow OnlineRegressionMetrics.r2 (and sklearn)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - sums[:, 1] / ss_tot, np.where(sums[:, 1] == 0, 1.0, 0.0))
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for name, samples, digits in (('mae', mae, 2), ('rmse', rmse, 2), ('r2', r2, 4)):
+        low, high = np.percentile(samples, [tail, 100 - tail])
+        intervals[name] = [round(float(low), digits), round(float(high), digits)]
+    intervals['confidence'] = round(confidence * 100)
+    intervals['resamples'] = resamples
+    return intervals
+
+
+def segment_breakdown(codes, labels, error, percent_error, limit=SEGMENT_ROWS, min_rows=MIN_SEGMENT_ROWS):
+    """
+    Error per value of a dictionary-encoded column (codes into `labels`,
+    -1 for missing): rows, MAE, RMSE and mean deviation %, largest MAE first.
+    """
+    valid = codes >= 0
+    codes = codes[valid]
+    error = error[valid]
+    size = len(labels)
+    count = np.bincount(codes, minlength=size)
+    abs_sum = np.bincount(codes, weights=np.abs(error), minlength=size)
+    sq_sum = np.bincount(codes, weights=error * error, minlength=size)
+
+    finite = np.isfinite(percent_error[valid])
+    percent_count = np.bincount(codes[finite], minlength=size)
+    percent_sum = np.bincount(codes[finite], weights=percent_error[valid][finite], minlength=size)
+
+    segments = []
+    for code in np.flatnonzero(count >= min_rows):
+        segments.append({
+            'value': labels[code],
+            'count': int(count[code]),
+            'mae': round(float(abs_sum[code] / count[code]), 2),
+            'rmse': round(float(math.sqrt(sq_sum[code] / count[code])), 2),
+            'mean_deviation_percent': (
+                round(float(percent_sum[code] / percent_count[code]), 1) if percent_count[code] else None
+            ),
+        })
+    segments.sort(key=lambda s: s['mae'], reverse=True)
+    return segments[:limit]
+
+
+def _label(value):
+    value = value.item() if hasattr(value, 'item') else value
+    return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+
+
+def numeric_column(reader, name):
+    """A stored column as float64, text converted like pd.to_numeric (missing/invalid = NaN)."""
+    raw = np.asarray(reader.column(name))
+    column = next(c for c in reader.columns if c['name'] == name)
+    if column['kind'] != TEXT:
+        return raw.astype(np.float64)
+    # Convert each distinct value once, then index by code (-1 hits the trailing NaN)
+    numbers = pd.to_numeric(pd.Series(column['vocabulary'], dtype=object), errors='coerce')
+    lookup = np.append(numbers.to_numpy(dtype=np.float64), np.nan)
+    return lookup[raw]
+
+
+def analyze_run(run_id, resamples=BOOTSTRAP_RESAMPLES, workers=None):
+    """Bootstrap intervals and segment breakdowns for a stored test run."""
+    reader = ResultReader(run_id)
+    y_true = np.nan_to_num(numeric_column(reader, TARGET_COLUMN), nan=0.0)
+    y_pred = numeric_column(reader, 'predicted_price_per_m2')
+    error = y_pred - y_true
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent_error = error / y_true * 100
+
+    segments = []
+    stored = {c['name']: c for c in reader.columns}
+    for name in SEGMENT_COLUMNS:
+        if name not in stored:
+            continue
+        if stored[name]['kind'] == TEXT:
+            codes, labels = np.asarray(reader.column(name)), reader.vocabulary(name)
+        else:
+            # A column that happened to parse as numbers (e.g. coded shapes)
+            codes, labels = pd.factorize(np.asarray(reader.column(name)))
+            labels = [_label(value) for value in labels]
+        segments.append({'column': name, 'segments': segment_breakdown(codes, labels, error, percent_error)})
+
+    return {
+        'intervals': bootstrap_intervals(y_true, y_pred, resamples=resamples, workers=workers),
+        'segment_breakdown': segments,
+    }
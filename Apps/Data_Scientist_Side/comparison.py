@@ -0,0 +1,149 @@
+"""
+Side-by-side evaluation of several models on one uploaded test file.
+
+The file is parsed and preprocessed once. Predictions are then fanned out
+over a process pool, one model per task (fork_pool.fork_map). The models
+are loaded through the model cache in this process before the pool forks;
+the workers inherit them with the feature matrix and never touch the cache
+themselves (another thread may hold its lock at fork time, and a child that
+tried to take it would wait forever). Only the predictions, 8 bytes per
+row, travel back. Where fork isn't available the models are run one after
+the other in this process.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from Apps.Normal_User_Side.ml.model_loader import load_model_file
+from .evaluation import EvaluationError, OnlineRegressionMetrics, _display_value
+from .fork_pool import fork_map
+
+# Rows shown in the disagreement table
+DISAGREEMENT_ROWS = 50
+
+
+class Dataset:
+    """A preprocessed test file: features, actual prices and display columns."""
+
+    def __init__(self, features, actual, labels):
+        self.features = features
+        self.actual = actual
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.actual)
+
+
+def load_dataset(prepared):
+    """Collect prepared chunks (see evaluation.prepare_chunks) into one Dataset."""
+    features, actual, labels = [], [], []
+    try:
+        for chunk, X, y_actual in prepared:
+            features.append(X)
+            actual.append(y_actual)
+            labels.append(chunk[['Area', 'Neighborhood', 'area_m2']])
+    finally:
+        close = getattr(prepared, 'close', None)
+        if close is not None:
+            close()
+
+    if not features:
+        raise EvaluationError("The uploaded file is empty.")
+    return Dataset(
+        pd.concat(features),
+        np.concatenate(actual).astype(np.float64),
+        pd.concat(labels),
+    )
+
+
+def _predict(shared, model_id):
+    """(predictions, None), or (None, error message) if the model fails."""
+    features, predictors = shared
+    try:
+        return np.asarray(predictors[model_id].predict(features), dtype=np.float64), None
+    except Exception as e:
+        return None, str(e)
+
+
+def predict_all(ml_models, features, workers=None):
+    """
+    Predictions of every model for `features`, as {model id: array or error message}.
+    """
+    results = {}
+    predictors = {}
+    for ml_model in ml_models:
+        path = os.path.join(settings.MEDIA_ROOT, ml_model.model_file_path)
+        try:
+            predictors[ml_model.id] = load_model_file(path, ml_model.id).predictor
+        except Exception as e:
+            results[ml_model.id] = str(e)
+    if workers is None:
+        workers = getattr(settings, 'MODEL_COMPARE_WORKERS', None) or os.cpu_count() or 1
+
+    # The workers never touch the database or the model cache, so the
+    # parent's connections and cache lock can be in any state at the fork.
+    targets = list(predictors)
+    outcomes = fork_map(_predict, (features, predictors), [(model_id,) for model_id in targets], workers)
+    for model_id, (predictions, error) in zip(targets, outcomes):
+        results[model_id] = predictions if error is None else error
+    return {ml_model.id: results[ml_model.id] for ml_model in ml_models}
+
+
+def compare_models(ml_models, dataset, workers=None):
+    """
+    Metrics of each model on the dataset plus the rows the models disagree on most.
+
+    Returns a dict with 'models' (one entry per model, in the given order,
+    with the metrics summary or an 'error') and 'disagreements' (rows with
+    the largest spread between the highest and lowest prediction).
+    """
+    predictions = predict_all(ml_models, dataset.features, workers)
+
+    models = []
+    predicted = []
+    for ml_model in ml_models:
+        result = predictions[ml_model.id]
+        entry = {'id': ml_model.id, 'name': ml_model.name, 'version': ml_model.version}
+        if isinstance(result, str):
+            entry['error'] = result
+        else:
+            metrics = OnlineRegressionMetrics()
+            metrics.update(dataset.actual, result)
+            entry.update(metrics.summary())
+            predicted.append((ml_model.id, result))
+        models.append(entry)
+
+    scored = [m for m in models if 'error' not in m]
+    if scored:
+        best_mae = min(m['mae'] for m in scored)
+        for m in scored:
+            m['is_best'] = m['mae'] == best_mae
+
+    disagreements = []
+    mean_spread = None
+    if len(predicted) > 1:
+        matrix = np.column_stack([p for _, p in predicted])
+        spread = matrix.max(axis=1) - matrix.min(axis=1)
+        mean_spread = round(float(spread.mean()), 2)
+        worst = np.argsort(-spread, kind='stable')[:DISAGREEMENT_ROWS]
+        labels = dataset.labels
+        for i in worst:
+            disagreements.append({
+                'row_num': int(labels.index[i]) + 1,
+                'area': _display_value(labels['Area'].iloc[i]),
+                'neighborhood': _display_value(labels['Neighborhood'].iloc[i]),
+                'area_m2': _display_value(labels['area_m2'].iloc[i]),
+                'actual': round(float(dataset.actual[i]), 2),
+                'predictions': [round(float(matrix[i, j]), 2) for j in range(matrix.shape[1])],
+                'spread': round(float(spread[i]), 2),
+            })
+
+    return {
+        'models': models,
+        'scored_models': [m for m in models if 'error' not in m],
+        'sample_count': len(dataset),
+        'mean_spread': mean_spread,
+        'disagreements': disagreements,
+    }
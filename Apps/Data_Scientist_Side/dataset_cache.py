@@ -0,0 +1,224 @@
+"""
+Content-addressed cache of preprocessed test datasets.
+
+Scientists test the same file against every new model version. An upload is
+hashed (SHA-256 of its bytes) and, the first time it's evaluated, the
+chunks flowing through the evaluation are recorded under
+MEDIA_ROOT/dataset_cache/<key>/:
+
+    raw/        the columns as read from the file (for the results download)
+    features/   the model input built by preprocess_test_data, plus the
+                actual prices
+    meta.json   original file name, size and row count
+
+both in the columnar layout of result_store. Later tests of the same bytes,
+or of a dataset picked from the recent list, replay these instead of
+decoding, parsing and preprocessing the file again. The key includes
+PREPROCESS_VERSION, so changing the preprocessing invalidates old entries.
+The cache is bounded by MODEL_TEST_DATASET_CACHE_BYTES; the least recently
+used entries are evicted first.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+
+from .evaluation import prepare_chunks, read_chunks
+from .preprocessing import PREPROCESS_SPEC, PREPROCESS_VERSION
+from .result_store import FLOAT, INT, TEXT, ResultReader, ResultWriter
+
+DATASET_CACHE_DIRNAME = 'dataset_cache'
+META_FILENAME = 'meta.json'
+RAW_DIRNAME = 'raw'
+FEATURES_DIRNAME = 'features'
+# Actual prices are stored as an extra column of the features
+ACTUAL_COLUMN = '__actual__'
+# Partial entries left by a crashed process are removed after this long
+ABANDONED_AFTER_SECONDS = 24 * 60 * 60
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+RECENT_DATASETS = 10
+
+KEY_PATTERN = re.compile(r'[0-9a-f]{64}-[a-z]+-p\d+')
+
+# Fixed kinds of the stored features: a chunk whose measurements happen to
+# be whole numbers must not decide how later chunks are stored
+SPEC_KINDS = {'numeric': FLOAT, 'width': FLOAT, 'flag': INT}
+FEATURE_KINDS = {
+    **{spec.name: SPEC_KINDS.get(spec.kind, TEXT) for spec in PREPROCESS_SPEC},
+    ACTUAL_COLUMN: FLOAT,
+}
+
+
+def cache_root():
+    return os.path.join(settings.MEDIA_ROOT, DATASET_CACHE_DIRNAME)
+
+
+def content_key(uploaded_file):
+    """Cache key of an uploaded file: content hash, format and preprocessing version."""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    ext = uploaded_file.name.split('.')[-1].lower()
+    return f"{digest.hexdigest()}-{ext}-p{PREPROCESS_VERSION}"
+
+
+def dataset_path(key):
+    """Directory of a cached dataset (None if the key is malformed)."""
+    if not key or not KEY_PATTERN.fullmatch(key):
+        return None
+    return os.path.join(cache_root(), key)
+
+
+def has_dataset(key):
+    path = dataset_path(key)
+    return path is not None and os.path.isfile(os.path.join(path, META_FILENAME))
+
+
+def read_meta(key):
+    with open(os.path.join(dataset_path(key), META_FILENAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(key, name, size, prepared):
+    """
+    Pass prepared chunks through while storing them as dataset `key`.
+
+    The entry is published only if the chunks are consumed to the end; an
+    evaluation that fails or is cancelled leaves nothing behind.
+    """
+    tmp_path = os.path.join(cache_root(), f"{key}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp_path)
+    raw = ResultWriter(path=os.path.join(tmp_path, RAW_DIRNAME))
+    features = ResultWriter(path=os.path.join(tmp_path, FEATURES_DIRNAME), kinds=FEATURE_KINDS)
+    rows = 0
+    try:
+        for chunk, X, y_actual in prepared:
+            raw.append(chunk)
+            features.append(X.assign(**{ACTUAL_COLUMN: y_actual}))
+            rows += len(chunk)
+            yield chunk, X, y_actual
+    except BaseException:
+        raw.abort()
+        features.abort()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    finally:
+        prepared.close()
+
+    if not rows:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+    raw.close()
+    features.close()
+    meta = {'key': key, 'name': name, 'bytes': size, 'rows': rows, 'created_at': time.time()}
+    with open(os.path.join(tmp_path, META_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    try:
+        os.rename(tmp_path, dataset_path(key))
+    except OSError:
+        # Recorded concurrently by another evaluation; keep that one
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    evict()
+
+
+def replay(key, chunk_rows=None):
+    """Yield the prepared chunks of a cached dataset, as prepare_chunks would."""
+    chunk_rows = chunk_rows or getattr(settings, 'MODEL_TEST_CHUNK_ROWS', 50000)
+    path = dataset_path(key)
+    raw = ResultReader(path=os.path.join(path, RAW_DIRNAME))
+    features = ResultReader(path=os.path.join(path, FEATURES_DIRNAME))
+    # meta.json's mtime is the entry's last use, for eviction and the recent list
+    os.utime(os.path.join(path, META_FILENAME))
+
+    for chunk, X in zip(raw.iter_frames(chunk_rows, categorical=False),
+                        features.iter_frames(chunk_rows, categorical=False)):
+        y_actual = X.pop(ACTUAL_COLUMN).to_numpy()
+        yield chunk, X, y_actual
+
+
+def open_dataset(uploaded_file=None, key=None):
+    """
+    Prepared chunks for an upload or a cached dataset key. An upload whose
+    content is already cached is replayed; otherwise it's parsed and
+    recorded on the way.
+    """
+    if uploaded_file is None:
+        return replay(key)
+    key = content_key(uploaded_file)
+    if has_dataset(key):
+        return replay(key)
+    return record(key, uploaded_file.name, uploaded_file.size, prepare_chunks(read_chunks(uploaded_file)))
+
+
+def _entries():
+    """(key, path, last used, size in bytes) of every published entry."""
+    try:
+        names = os.listdir(cache_root())
+    except OSError:
+        return []
+    entries = []
+    for name in names:
+        if not KEY_PATTERN.fullmatch(name):
+            continue
+        path = os.path.join(cache_root(), name)
+        try:
+            last_used = os.path.getmtime(os.path.join(path, META_FILENAME))
+            size = sum(
+                os.path.getsize(os.path.join(directory, filename))
+                for directory, _, filenames in os.walk(path) for filename in filenames
+            )
+        except OSError:
+            continue
+        entries.append((name, path, last_used, size))
+    return entries
+
+
+def recent_datasets(limit=RECENT_DATASETS):
+    """Metadata of the most recently used cached datasets, newest first."""
+    recent = []
+    for key, _, last_used, _ in sorted(_entries(), key=lambda e: e[2], reverse=True)[:limit]:
+        try:
+            meta = read_meta(key)
+        except (OSError, ValueError):
+            continue
+        recent.append({**meta, 'last_used': last_used})
+    return recent
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits. Returns how many."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'MODEL_TEST_DATASET_CACHE_BYTES', DEFAULT_MAX_BYTES)
+    _remove_abandoned()
+    entries = sorted(_entries(), key=lambda e: e[2])
+    total = sum(size for _, _, _, size in entries)
+    removed = 0
+    for _, path, _, size in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _remove_abandoned():
+    try:
+        names = os.listdir(cache_root())
+    except OSError:
+        return
+    cutoff = time.time() - ABANDONED_AFTER_SECONDS
+    for name in names:
+        path = os.path.join(cache_root(), name)
+        try:
+            if name.endswith('.tmp') and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
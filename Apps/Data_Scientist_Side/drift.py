@@ -0,0 +1,119 @@
+"""
+Feature drift of a model's live traffic against its reference data.
+
+The reference snapshot is taken at upload from the training file the
+scientist provides (data/sample_data.csv if none), preprocessed like a
+test file. Live counts are kept by Apps/Normal_User_Side/ml/drift.py. Each
+feature is scored with the Population Stability Index over the reference's
+bins or categories and, for numeric features, the Kolmogorov-Smirnov
+statistic between the binned distributions (exact at the bin edges, which
+sit at the reference's quantiles).
+"""
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from Apps.core.models import FeatureHistogram
+from Apps.Normal_User_Side.ml.drift import drift_monitor, snapshot_reference
+from Apps.Normal_User_Side.ml.predict import REQUIRED_ML_COLUMNS
+from .evaluation import prepare_chunks, read_chunks
+from .profiling import SAMPLE_DATA_PATH
+
+# Floor of a bin's share in PSI, so empty bins don't make it infinite
+PSI_EPSILON = 1e-4
+DEFAULT_PSI_WARN = 0.1
+DEFAULT_PSI_ALERT = 0.25
+DEFAULT_MIN_LIVE_ROWS = 100
+# Live categories missing from the reference listed per feature
+MAX_UNSEEN_VALUES = 5
+
+
+def snapshot_reference_file(ml_model, uploaded_file=None):
+    """
+    Take `ml_model`'s reference snapshot from a CSV/Excel training file (the
+    canonical sample if None). Returns the row count; raises EvaluationError.
+    """
+    if uploaded_file is None:
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            return snapshot_reference_file(ml_model, f)
+    features = pd.concat(X for _, X, _ in prepare_chunks(read_chunks(uploaded_file)))
+    return snapshot_reference(ml_model, features[REQUIRED_ML_COLUMNS])
+
+
+def psi(reference, live):
+    """Population Stability Index between two aligned count arrays."""
+    expected = np.maximum(reference / reference.sum(), PSI_EPSILON)
+    actual = np.maximum(live / live.sum(), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(reference, live):
+    """Largest gap between the cumulative shares of two aligned count arrays."""
+    return float(np.max(np.abs(np.cumsum(reference) / reference.sum() - np.cumsum(live) / live.sum())))
+
+
+def _aligned(reference, live):
+    """(reference counts, live counts, categories or None) of one feature as float arrays."""
+    if reference.edges is not None:
+        return np.asarray(reference.counts, dtype=np.float64), np.asarray(live.counts, dtype=np.float64), None
+    # Reference categories by frequency, then ones only seen live
+    categories = sorted(reference.counts, key=reference.counts.get, reverse=True)
+    categories += sorted(set(live.counts) - set(reference.counts))
+    return (
+        np.array([reference.counts.get(c, 0) for c in categories], dtype=np.float64),
+        np.array([live.counts.get(c, 0) for c in categories], dtype=np.float64),
+        categories,
+    )
+
+
+def _status(score, live_total):
+    if live_total < getattr(settings, 'DRIFT_MIN_LIVE_ROWS', DEFAULT_MIN_LIVE_ROWS):
+        return 'insufficient'
+    if score >= getattr(settings, 'DRIFT_PSI_ALERT', DEFAULT_PSI_ALERT):
+        return 'alert'
+    if score >= getattr(settings, 'DRIFT_PSI_WARN', DEFAULT_PSI_WARN):
+        return 'warn'
+    return 'ok'
+
+
+def drift_report(ml_model):
+    """
+    Per-feature drift of `ml_model`, most drifted first: [{'feature', 'kind',
+    'psi', 'ks', 'reference_total', 'live_total', 'status', 'unseen'}].
+    Empty if the model has no reference snapshot.
+    """
+    # This worker's buffered rows, so the report is current
+    drift_monitor.flush()
+
+    histograms = {
+        (h.source, h.feature): h for h in FeatureHistogram.objects.filter(model=ml_model)
+    }
+    report = []
+    for feature in REQUIRED_ML_COLUMNS:
+        reference = histograms.get((FeatureHistogram.Source.REFERENCE, feature))
+        if reference is None or not reference.total:
+            continue
+        live = histograms.get((FeatureHistogram.Source.LIVE, feature))
+        entry = {
+            'feature': feature,
+            'kind': 'categorical' if reference.edges is None else 'numeric',
+            'psi': None,
+            'ks': None,
+            'reference_total': reference.total,
+            'live_total': live.total if live else 0,
+            'status': 'insufficient',
+            'unseen': [],
+        }
+        if live is not None and live.total:
+            expected, actual, categories = _aligned(reference, live)
+            entry['psi'] = round(psi(expected, actual), 4)
+            if categories is None:
+                entry['ks'] = round(ks(expected, actual), 4)
+            else:
+                entry['unseen'] = [
+                    c for c, ref, cur in zip(categories, expected, actual) if ref == 0 and cur > 0
+                ][:MAX_UNSEEN_VALUES]
+            entry['status'] = _status(entry['psi'], live.total)
+        report.append(entry)
+    report.sort(key=lambda e: -1 if e['psi'] is None else e['psi'], reverse=True)
+    return report
@@ -0,0 +1,354 @@
+"""
+Streaming evaluation of a model against an uploaded test file.
+
+The file is parsed in fixed-size chunks; each chunk is preprocessed,
+predicted, folded into running metrics and appended to the result store
+(see result_store.py), then dropped. Memory use therefore depends on the
+chunk size, not on the size of the upload.
+"""
+import math
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.conf import settings
+
+from Apps.Normal_User_Side.ml.predict import REQUIRED_ML_COLUMNS
+from .preprocessing import preprocess_test_data, TARGET_COLUMN
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# Rows shown on the results page (the rest is in the download)
+DISPLAY_ROWS = 100
+
+# Deviation histogram bucket edges, in percent of the actual price
+DEVIATION_BIN_EDGES = [-50, -25, -10, -5, 0, 5, 10, 25, 50]
+
+# Columns a test file needs besides the target
+REQUIRED_BASE_COLUMNS = ['Area', 'Neighborhood', 'area_m2']
+
+
+class EvaluationError(Exception):
+    """A problem with the uploaded file, with a message for the user."""
+
+
+class OnlineRegressionMetrics:
+    """
+    MAE, RMSE and R² accumulated chunk by chunk.
+
+    Error sums are plain running totals; the mean and sum of squared
+    deviations of the actual values (the R² denominator) are merged per
+    chunk with the parallel form of Welford's algorithm, so the result
+    matches a single pass over all rows without keeping them.
+    """
+
+    def __init__(self, bin_edges=DEVIATION_BIN_EDGES):
+        self.count = 0
+        self.abs_error_sum = 0.0
+        self.sq_error_sum = 0.0
+        self.mean_actual = 0.0
+        self.m2_actual = 0.0
+        self.bin_edges = np.asarray([-np.inf] + list(bin_edges) + [np.inf], dtype=np.float64)
+        self.histogram = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        n = len(y_true)
+        if not n:
+            return
+
+        error = y_pred - y_true
+        self.abs_error_sum += float(np.abs(error).sum())
+        self.sq_error_sum += float(np.square(error).sum())
+
+        chunk_mean = float(y_true.mean())
+        chunk_m2 = float(np.square(y_true - chunk_mean).sum())
+        total = self.count + n
+        delta = chunk_mean - self.mean_actual
+        self.mean_actual += delta * n / total
+        self.m2_actual += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = error / y_true * 100
+        percent = percent[np.isfinite(percent)]
+        self.histogram += np.histogram(percent, bins=self.bin_edges)[0]
+
+    @property
+    def mae(self):
+        return self.abs_error_sum / self.count if self.count else 0.0
+
+    @property
+    def rmse(self):
+        return math.sqrt(self.sq_error_sum / self.count) if self.count else 0.0
+
+    @property
+    def r2(self):
+        # Same convention as sklearn's r2_score for constant targets
+        if self.m2_actual == 0:
+            return 1.0 if self.sq_error_sum == 0 else 0.0
+        return 1 - self.sq_error_sum / self.m2_actual
+
+    def summary(self):
+        """Rounded figures for the results page (JSON-serializable)."""
+        return {
+            'mae': round(self.mae, 2),
+            'rmse': round(self.rmse, 2),
+            'r2': round(self.r2, 4),
+            'r2_percent': round(self.r2 * 100, 1),
+            'sample_count': self.count,
+            'deviation_histogram': self.histogram_buckets(),
+        }
+
+    def histogram_buckets(self):
+        """[{'label', 'count'}] for each deviation bucket, lowest first."""
+        buckets = []
+        for low, high, count in zip(self.bin_edges[:-1], self.bin_edges[1:], self.histogram):
+            if np.isinf(low):
+                label = f"< {high:g}%"
+            elif np.isinf(high):
+                label = f"≥ {low:g}%"
+            else:
+                label = f"{low:g}% to {high:g}%"
+            buckets.append({'label': label, 'count': int(count)})
+        return buckets
+
+
+def sniff_delimiter(uploaded_file):
+    """';' if the header line has more semicolons than commas, else ','."""
+    uploaded_file.seek(0)
+    first_line = uploaded_file.readline().decode('utf-8', errors='ignore')
+    uploaded_file.seek(0)
+    return ';' if first_line.count(';') > first_line.count(',') else ','
+
+
+def read_chunks(uploaded_file, chunk_rows=None):
+    """Yield the uploaded CSV/Excel file as DataFrames of at most chunk_rows rows."""
+    chunk_rows = chunk_rows or getattr(settings, 'MODEL_TEST_CHUNK_ROWS', DEFAULT_CHUNK_ROWS)
+    file_ext = uploaded_file.name.split('.')[-1].lower()
+
+    if file_ext == 'csv':
+        delimiter = sniff_delimiter(uploaded_file)
+        # Parse every column as text: type inference per chunk would turn a
+        # chunk where e.g. road_status3 is all FALSE into booleans.
+        # preprocess_test_data converts the numeric columns itself.
+        with pd.read_csv(uploaded_file, delimiter=delimiter, encoding='utf-8', dtype=str,
+                         chunksize=chunk_rows) as reader:
+            yield from reader
+    elif file_ext == 'xlsx':
+        yield from read_xlsx_chunks(uploaded_file, chunk_rows)
+    else:
+        # Legacy .xls has no streaming reader: read whole, evaluate in slices
+        df = pd.read_excel(uploaded_file)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def dedupe_columns(names):
+    """Column names made unique the way pandas does it (width_m, width_m.1, ...)."""
+    counts = {}
+    result = []
+    for name in names:
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        result.append(name)
+    return result
+
+
+def read_xlsx_chunks(uploaded_file, chunk_rows):
+    """
+    Yield the first sheet of an .xlsx file in chunks without loading the
+    workbook: openpyxl's read-only mode parses the sheet XML as rows are
+    requested. Like the CSV path, every cell is read as text (see
+    _cell_text), so a chunk's types don't depend on the values it holds.
+    """
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Read-only sheets can report trailing empty header cells
+        while header and header[-1] is None:
+            header = header[:-1]
+        columns = dedupe_columns([
+            f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header)
+        ])
+        width = len(columns)
+
+        start = 0
+        batch = []
+        for row in rows:
+            row = row[:width] if len(row) >= width else row + (None,) * (width - len(row))
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield _records_frame(batch, columns, start)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield _records_frame(batch, columns, start)
+    finally:
+        workbook.close()
+
+
+def xlsx_row_count(uploaded_file):
+    """
+    Data rows of the first sheet of an .xlsx file, from the dimension the
+    sheet records (blank rows included), or None if it records none. Only
+    the sheet's header is parsed; the file is rewound afterwards.
+    """
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+    finally:
+        workbook.close()
+        uploaded_file.seek(0)
+    return None if max_row is None else max(max_row - 1, 0)
+
+
+def _cell_text(value):
+    """A cell as the text a CSV export of the sheet holds; empty cells are NaN."""
+    if value is None:
+        return np.nan
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _records_frame(rows, columns, start):
+    return pd.DataFrame(
+        [[_cell_text(value) for value in row] for row in rows],
+        columns=columns, index=pd.RangeIndex(start, start + len(rows)), dtype=str,
+    )
+
+
+def check_columns(df):
+    if TARGET_COLUMN not in df.columns:
+        raise EvaluationError(
+            f"Missing target column: '{TARGET_COLUMN}'. This column is required for evaluation."
+        )
+    missing = [c for c in REQUIRED_BASE_COLUMNS if c not in df.columns]
+    if missing:
+        raise EvaluationError(f"Missing required columns: {', '.join(missing)}")
+
+
+def _display_value(value):
+    """JSON-safe cell value for the results table."""
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def result_display_rows(results):
+    """
+    Rows of the results table for a frame of evaluated rows (the test file
+    columns plus predicted_price_per_m2, deviation and deviation_percent),
+    numbered from its index.
+    """
+    actual = pd.to_numeric(results[TARGET_COLUMN], errors='coerce').fillna(0).to_numpy()
+    rows = []
+    for i, (index, row) in enumerate(zip(results.index, results.to_dict('records'))):
+        rows.append({
+            'row_num': int(index) + 1,
+            'area': _display_value(row.get('Area', 'N/A')),
+            'neighborhood': _display_value(row.get('Neighborhood', 'N/A')),
+            'area_m2': _display_value(row.get('area_m2', 0)),
+            'actual': round(float(actual[i]), 2),
+            'predicted': round(float(row['predicted_price_per_m2']), 2),
+            'deviation': round(float(row['deviation']), 2),
+            'deviation_percent': _display_value(round(float(row['deviation_percent']), 1)),
+        })
+    return rows
+
+
+def prepare_chunks(chunks):
+    """
+    Yield (chunk, features, y_actual) for every non-empty chunk: the chunk as
+    read, the model input built from it and the actual prices.
+    """
+    checked = False
+    try:
+        for chunk in chunks:
+            if not checked:
+                check_columns(chunk)
+                checked = True
+            if chunk.empty:
+                continue
+
+            # Extract actual prices before preprocessing
+            y_actual = pd.to_numeric(chunk[TARGET_COLUMN], errors='coerce').fillna(0).to_numpy()
+
+            try:
+                X = preprocess_test_data(chunk)[REQUIRED_ML_COLUMNS]
+            except Exception as e:
+                raise EvaluationError(f"Data preprocessing error: {str(e)}") from e
+
+            yield chunk, X, y_actual
+    finally:
+        # Release the parser (and its handle on the file) even when stopped early
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def evaluate_chunks(chunks, predictor, results_writer=None, on_chunk=None):
+    """Evaluate chunks as returned by read_chunks (see evaluate_prepared)."""
+    return evaluate_prepared(prepare_chunks(chunks), predictor, results_writer, on_chunk)
+
+
+def evaluate_prepared(prepared, predictor, results_writer=None, on_chunk=None):
+    """
+    Predict every prepared chunk (see prepare_chunks) with `predictor` and
+    accumulate metrics.
+
+    When `results_writer` (a result_store.ResultWriter) is given, every row
+    is appended to it with predicted_price_per_m2, deviation and
+    deviation_percent added. `on_chunk(metrics)` is called after each chunk
+    and may raise to stop the evaluation. Returns (metrics, display_rows).
+    """
+    metrics = OnlineRegressionMetrics()
+    display_rows = []
+
+    try:
+        for chunk, X, y_actual in prepared:
+            try:
+                y_predicted = np.asarray(predictor.predict(X), dtype=np.float64)
+            except Exception as e:
+                raise EvaluationError(f"Prediction error: {str(e)}. Please check your data format.") from e
+
+            metrics.update(y_actual, y_predicted)
+
+            deviation = y_predicted - y_actual
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deviation_percent = np.round(deviation / y_actual * 100, 2)
+
+            results = chunk.assign(
+                predicted_price_per_m2=y_predicted,
+                deviation=deviation,
+                deviation_percent=deviation_percent,
+            )
+            if results_writer is not None:
+                results_writer.append(results)
+
+            if len(display_rows) < DISPLAY_ROWS:
+                display_rows.extend(result_display_rows(results.iloc[:DISPLAY_ROWS - len(display_rows)]))
+
+            if on_chunk is not None:
+                on_chunk(metrics)
+    finally:
+        close = getattr(prepared, 'close', None)
+        if close is not None:
+            close()
+
+    if metrics.count == 0:
+        raise EvaluationError("The uploaded file is empty.")
+    return metrics, display_rows
@@ -0,0 +1,60 @@
+"""
+Process pools whose workers share one read-only object with the caller.
+
+fork_map() runs func(shared, *args) for a list of calls over forked
+workers. `shared` (a feature matrix, a value matrix) reaches the workers
+through the pool's initializer: with the fork start method its arguments
+are inherited with the parent's memory rather than pickled, so the workers
+read the caller's copy (copy-on-write) and only the results travel back.
+Every call gets its own pool and its own `shared`; nothing is stored in a
+module global of the caller, so concurrent callers in different threads
+can't hand their workers each other's data.
+
+Pools are created and their workers forked under one lock, so two threads
+never fork at the same time (a child forked while another thread is
+half-way through starting a pool can inherit that pool's locks held).
+Locks of other code are not covered: `func` must not take any lock another
+thread of the caller could hold (the model cache's, say), so whatever it
+needs from such code is fetched by the caller and passed in `shared`.
+Where fork isn't available, or with one worker, the calls run one after
+the other in this process.
+"""
+import multiprocessing as mp
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_fork_lock = threading.Lock()
+
+# Set in each worker by the pool initializer, never in the caller's process
+_worker_shared = None
+
+
+def _set_shared(shared):
+    global _worker_shared
+    _worker_shared = shared
+
+
+def _call_shared(func, args):
+    return func(_worker_shared, *args)
+
+
+def fork_map(func, shared, calls, workers):
+    """[func(shared, *args) for args in calls], over at most `workers` forked processes."""
+    calls = list(calls)
+    workers = min(workers, len(calls))
+    if workers <= 1 or 'fork' not in mp.get_all_start_methods():
+        return [func(shared, *args) for args in calls]
+
+    with _fork_lock:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp.get_context('fork'),
+            initializer=_set_shared, initargs=(shared,),
+        )
+        try:
+            # The first submit forks all the workers, so it happens under the lock
+            futures = [pool.submit(_call_shared, func, args) for args in calls]
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    with pool:
+        return [future.result() for future in futures]
@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from Apps.core.models import MLModel
+from .dataset_cache import recent_datasets
 
 
 class MLModelUploadForm(forms.ModelForm):
@@ -9,6 +12,12 @@ class MLModelUploadForm(forms.ModelForm):
         help_text="Upload a scikit-learn model saved with joblib (.pkl format)",
         widget=forms.FileInput(attrs={'class': 'form-input', 'accept': '.pkl'})
     )
+    reference_file = forms.FileField(
+        label="Training Data (CSV/Excel)",
+        help_text="Reference distribution for drift monitoring; the canonical sample is used if omitted",
+        required=False,
+        widget=forms.FileInput(attrs={'class': 'form-input', 'accept': '.csv,.xlsx,.xls'})
+    )
 
     class Meta:
         model = MLModel
@@ -39,17 +48,50 @@ class MLModelUploadForm(forms.ModelForm):
                 raise forms.ValidationError("File size must be under 50MB.")
         return file
 
+    def clean_reference_file(self):
+        file = self.cleaned_data.get('reference_file')
+        if file and file.name.split('.')[-1].lower() not in ('csv', 'xlsx', 'xls'):
+            raise forms.ValidationError("Only CSV and Excel files are allowed.")
+        return file
+
+
+class ReferenceSnapshotForm(forms.Form):
+    """Form for retaking a model's drift reference from a training file."""
+    reference_file = forms.FileField(
+        label="Training Data (CSV/Excel)",
+        widget=forms.FileInput(attrs={'class': 'form-input', 'accept': '.csv,.xlsx,.xls'})
+    )
+
+    def clean_reference_file(self):
+        file = self.cleaned_data.get('reference_file')
+        if file and file.name.split('.')[-1].lower() not in ('csv', 'xlsx', 'xls'):
+            raise forms.ValidationError("Only CSV and Excel files are allowed.")
+        return file
+
 
 class ModelTestForm(forms.Form):
     """Form for uploading test dataset to evaluate ML model."""
     test_file = forms.FileField(
         label="Test Dataset (CSV/Excel)",
         help_text="Upload a file containing feature columns and actual_price_per_m2 for evaluation",
+        required=False,
         widget=forms.FileInput(attrs={
             'class': 'form-input',
             'accept': '.csv,.xlsx,.xls'
         })
     )
+    dataset = forms.ChoiceField(
+        label="Or a recently tested dataset",
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-input'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recent_datasets = recent_datasets()
+        self.fields['dataset'].choices = [('', '---------')] + [
+            (d['key'], f"{d['name']} ({d['rows']} rows)") for d in self.recent_datasets
+        ]
 
     def clean_test_file(self):
         file = self.cleaned_data.get('test_file')
@@ -61,7 +103,44 @@ class ModelTestForm(forms.Form):
                 raise forms.ValidationError(
                     "Invalid file format. Please upload a CSV or Excel file."
                 )
-            # Max 10MB
-            if file.size > 10 * 1024 * 1024:
-                raise forms.ValidationError("File size must be under 10MB.")
+            max_bytes = getattr(settings, 'MODEL_TEST_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+            if file.size > max_bytes:
+                raise forms.ValidationError(
+                    f"File size must be under {filesizeformat(max_bytes)}."
+                )
+        return file
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('test_file') and not cleaned_data.get('dataset'):
+            raise forms.ValidationError("Upload a test file or pick a recently tested dataset.")
+        return cleaned_data
+
+
+class ModelCompareForm(ModelTestForm):
+    """Form for evaluating several ML models on one test dataset."""
+    models = forms.ModelMultipleChoiceField(
+        queryset=MLModel.objects.filter(deleted_at__isnull=True).order_by('-created_at'),
+        widget=forms.CheckboxSelectMultiple,
+        help_text="Select at least two models to compare",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['models'].label_from_instance = lambda m: f"{m.name} v{m.version}"
+
+    def clean_models(self):
+        models = self.cleaned_data.get('models')
+        if models is not None and len(models) < 2:
+            raise forms.ValidationError("Select at least two models to compare.")
+        return models
+
+    def clean_test_file(self):
+        file = super().clean_test_file()
+        # Compared datasets are held in memory while every model predicts
+        max_bytes = getattr(settings, 'MODEL_COMPARE_MAX_BYTES', 100 * 1024 * 1024)
+        if file and file.size > max_bytes:
+            raise forms.ValidationError(
+                f"Files compared across models must be under {filesizeformat(max_bytes)}."
+            )
         return file
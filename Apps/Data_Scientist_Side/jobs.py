@@ -0,0 +1,294 @@
+"""
+Background model evaluations backed by the EvaluationJob table.
+
+model_test stores the upload under MEDIA_ROOT/evaluation_jobs/ and queues a
+job; `manage.py run_jobs` workers claim queued jobs with a conditional
+UPDATE (so several workers never run the same job), stream the file through
+evaluate_chunks and write progress back after every chunk. Nothing lives in
+the web process, so queued and running jobs survive a web worker restart; a
+job whose worker died is re-queued once its heartbeat goes stale. Steps
+that don't go chunk by chunk (the bootstrap of analyze_run) keep the
+heartbeat fresh from a background thread instead.
+
+The load check of an uploaded model (profiling.profile_model, up to
+MODEL_PROFILE_TIMEOUT seconds in a child process) is queued the same way as
+a PROFILE job, so neither the upload nor model_activate waits for it;
+model_activate re-queues a check that was lost (queue_profile()).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from Apps.core.background import run_in_background
+from Apps.core.models import EvaluationJob
+from Apps.Normal_User_Side.ml.model_loader import load_ml_model
+from .analysis import analyze_run
+from .dataset_cache import content_key, has_dataset, record
+from .evaluation import EvaluationError, evaluate_prepared, prepare_chunks, read_chunks, xlsx_row_count
+from .profiling import profile_model
+from .result_store import ResultWriter, new_run_id
+
+logger = logging.getLogger(__name__)
+
+JOB_INPUT_DIRNAME = 'evaluation_jobs'
+
+# A running job whose worker hasn't reported for this long is re-queued
+DEFAULT_STALE_AFTER = timedelta(minutes=5)
+
+# How often the heartbeat is refreshed during a step that reports no chunks
+HEARTBEAT_SECONDS = 60
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_evaluation(ml_model, uploaded_file, user):
+    """Store the upload and queue an EvaluationJob for it."""
+    token = new_run_id()
+    ext = uploaded_file.name.split('.')[-1].lower()
+    relative_path = os.path.join(JOB_INPUT_DIRNAME, f"{token}.{ext}")
+    path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+
+    return EvaluationJob.objects.create(
+        model=ml_model,
+        created_by=user,
+        input_name=uploaded_file.name,
+        input_path=relative_path,
+        input_bytes=os.path.getsize(path),
+        results_token=token,
+    )
+
+
+def enqueue_profile(ml_model, user):
+    """Queue the load check of an uploaded model, which can't be activated until it passes."""
+    ml_model.profile_status = ml_model.ProfileStatus.PENDING
+    ml_model.save(update_fields=['profile_status'])
+    return EvaluationJob.objects.create(
+        model=ml_model,
+        created_by=user,
+        kind=EvaluationJob.Kind.PROFILE,
+        input_name=os.path.basename(ml_model.model_file_path),
+    )
+
+
+def queue_profile(ml_model, user):
+    """Queue a load check of `ml_model` unless one is already queued or running."""
+    pending = EvaluationJob.objects.filter(
+        model=ml_model, kind=EvaluationJob.Kind.PROFILE,
+        status__in=[EvaluationJob.Status.QUEUED, EvaluationJob.Status.RUNNING],
+    )
+    if not pending.exists():
+        enqueue_profile(ml_model, user)
+
+
+def request_cancel(job):
+    """Cancel a queued job now, or ask the worker running it to stop."""
+    updated = EvaluationJob.objects.filter(pk=job.pk, status=EvaluationJob.Status.QUEUED).update(
+        status=EvaluationJob.Status.CANCELLED, cancel_requested=True, finished_at=timezone.now()
+    )
+    if updated:
+        _remove_input(job)
+    else:
+        EvaluationJob.objects.filter(pk=job.pk, status=EvaluationJob.Status.RUNNING).update(
+            cancel_requested=True
+        )
+    job.refresh_from_db()
+
+
+def claim_next_job(worker):
+    """Mark the oldest queued job as running for `worker` and return it (or None)."""
+    candidates = EvaluationJob.objects.filter(
+        status=EvaluationJob.Status.QUEUED
+    ).order_by('created_at', 'id').values_list('pk', flat=True)[:5]
+
+    for pk in candidates:
+        now = timezone.now()
+        # Conditional update: only one worker can move it out of QUEUED
+        claimed = EvaluationJob.objects.filter(pk=pk, status=EvaluationJob.Status.QUEUED).update(
+            status=EvaluationJob.Status.RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            return EvaluationJob.objects.select_related('model').get(pk=pk)
+    return None
+
+
+def requeue_stale_jobs(stale_after=DEFAULT_STALE_AFTER):
+    """Put running jobs whose worker stopped reporting back in the queue."""
+    cutoff = timezone.now() - stale_after
+    return EvaluationJob.objects.filter(
+        status=EvaluationJob.Status.RUNNING, heartbeat_at__lt=cutoff
+    ).update(status=EvaluationJob.Status.QUEUED, worker='', bytes_processed=0, rows_processed=0, metrics={})
+
+
+def run_job(job):
+    """Evaluate a claimed job to completion, failure or cancellation."""
+    if job.kind == EvaluationJob.Kind.PROFILE:
+        return _run_profile(job)
+    input_path = os.path.join(settings.MEDIA_ROOT, job.input_path)
+    started = time.monotonic()
+
+    try:
+        predictor = load_ml_model(job.model).predictor
+        # The stored input keeps the upload's extension, which picks the parser
+        with File(open(input_path, 'rb'), name=job.input_path) as source, \
+                ResultWriter(job.results_token) as results_writer:
+            key = content_key(source)
+            # Recorded in the dataset cache so re-tests of this file skip parsing
+            total_rows = xlsx_row_count(source) if _input_ext(job) == 'xlsx' else None
+            prepared = prepare_chunks(read_chunks(source))
+            if not has_dataset(key):
+                prepared = record(key, job.input_name, job.input_bytes, prepared)
+
+            def on_chunk(metrics):
+                # Progress goes out, cancellation comes back, once per chunk
+                EvaluationJob.objects.filter(pk=job.pk).update(
+                    bytes_processed=_bytes_processed(job, source, metrics.count, total_rows),
+                    rows_processed=metrics.count,
+                    metrics=metrics.summary(),
+                    heartbeat_at=timezone.now(),
+                )
+                if EvaluationJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+                    raise JobCancelled()
+
+            metrics, display_rows = evaluate_prepared(prepared, predictor, results_writer, on_chunk)
+        with _heartbeat(job):
+            analysis = analyze_run(job.results_token)
+    # The writer discards a partial run when the evaluation raises
+    except JobCancelled:
+        _finish(job, EvaluationJob.Status.CANCELLED)
+    except EvaluationError as e:
+        _finish(job, EvaluationJob.Status.FAILED, error=str(e))
+    except Exception as e:
+        logger.exception("Evaluation job %s failed", job.pk)
+        _finish(job, EvaluationJob.Status.FAILED, error=f"Error processing file: {str(e)}")
+    else:
+        _finish(
+            job, EvaluationJob.Status.SUCCEEDED,
+            bytes_processed=job.input_bytes,
+            rows_processed=metrics.count,
+            metrics=metrics.summary(),
+            result={
+                'display_count': len(display_rows),
+                'results': display_rows,
+                'has_more': metrics.count > len(display_rows),
+                **analysis,
+            },
+        )
+        logger.info(
+            "Evaluation job %s: %d rows in %.1fs", job.pk, metrics.count, time.monotonic() - started
+        )
+
+
+def _input_ext(job):
+    return job.input_path.split('.')[-1].lower()
+
+
+def _bytes_processed(job, source, rows, total_rows):
+    """
+    Progress in input bytes after `rows` rows. The CSV reader consumes the
+    file as it parses, so the file position is the progress. The Excel
+    readers read the file before the first row comes out, so there it's the
+    share of the sheet's rows done (0, i.e. unknown, if the sheet doesn't
+    record its size or for legacy .xls).
+    """
+    if _input_ext(job) == 'csv':
+        return source.tell()
+    if not total_rows:
+        return 0
+    return min(job.input_bytes * rows // total_rows, job.input_bytes)
+
+
+def _beat(job):
+    EvaluationJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+
+@contextmanager
+def _heartbeat(job):
+    """Refresh the job's heartbeat every HEARTBEAT_SECONDS while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            _beat(job)
+
+    run_in_background(beat)
+    try:
+        yield
+    finally:
+        stop.set()
+
+
+def _run_profile(job):
+    """Run a claimed load check; the outcome is stored on the model."""
+    try:
+        passed = profile_model(job.model)
+    except Exception as e:
+        logger.exception("Profile job %s failed", job.pk)
+        _finish(job, EvaluationJob.Status.FAILED, error=f"Error checking model: {str(e)}")
+    else:
+        if passed:
+            _finish(job, EvaluationJob.Status.SUCCEEDED)
+        else:
+            _finish(job, EvaluationJob.Status.FAILED, error=job.model.profile_error)
+
+
+def requeue_job(job):
+    """Give a job back to the queue (its worker is shutting down)."""
+    EvaluationJob.objects.filter(pk=job.pk, status=EvaluationJob.Status.RUNNING).update(
+        status=EvaluationJob.Status.QUEUED, worker='', bytes_processed=0, rows_processed=0, metrics={}
+    )
+
+
+def _finish(job, status, **fields):
+    # The input is kept until the job is finished so an interrupted job can be re-run
+    EvaluationJob.objects.filter(pk=job.pk).update(status=status, finished_at=timezone.now(), **fields)
+    _remove_input(job)
+
+
+def _remove_input(job):
+    if not job.input_path:
+        return
+    try:
+        os.remove(os.path.join(settings.MEDIA_ROOT, job.input_path))
+    except OSError:
+        pass
+
+
+def job_progress(job):
+    """JSON payload for the progress endpoint."""
+    eta_seconds = None
+    if job.status == EvaluationJob.Status.RUNNING and job.started_at and job.bytes_processed:
+        elapsed = (timezone.now() - job.started_at).total_seconds()
+        remaining = max(job.input_bytes - job.bytes_processed, 0)
+        eta_seconds = round(elapsed * remaining / job.bytes_processed, 1)
+
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'finished': job.is_finished,
+        'rows_processed': job.rows_processed,
+        'bytes_processed': job.bytes_processed,
+        'input_bytes': job.input_bytes,
+        'percent': round(100 * job.bytes_processed / job.input_bytes, 1) if job.input_bytes else None,
+        'mae': job.metrics.get('mae'),
+        'eta_seconds': eta_seconds,
+        'error': job.error,
+    }
+
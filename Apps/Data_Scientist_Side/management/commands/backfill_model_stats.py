@@ -0,0 +1,23 @@
+"""
+Rebuild the per-model daily rollup (ModelDailyStats) from the valuations.
+
+The rollup is kept current on every valuation write; this recomputes it
+from scratch, e.g. after valuations were changed with raw SQL or a bulk
+update that bypassed Valuation.save().
+
+    python manage.py backfill_model_stats
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from Apps.core.model_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-model daily valuation rollup from the valuations table."
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild()
+        self.stdout.write(f"Rebuilt {rows} model/day rows in {time.monotonic() - started:.2f}s")
@@ -0,0 +1,216 @@
+"""
+Benchmark every uploaded model: cold load, warm single-row latency, batch
+throughput and peak memory.
+
+Each model is measured in its own forked process (where available) so load
+times are cold and peak RSS isn't inflated by the models measured before it.
+
+    python manage.py bench_models                  # MLModel rows
+    python manage.py bench_models --files          # every .pkl in MEDIA_ROOT/ml_models
+    python manage.py bench_models --json out.json  # also write the results as JSON
+"""
+import glob
+import json
+import multiprocessing as mp
+import os
+import queue as queue_module
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Apps.core.models import MLModel
+from Apps.Normal_User_Side.ml.model_cache import ModelCache
+from Apps.Normal_User_Side.ml.predict import REQUIRED_ML_COLUMNS, predict_feature_row, predict_feature_rows
+
+SAMPLE_DATA_PATH = os.path.join(settings.BASE_DIR, 'data', 'sample_data.csv')
+BATCH_SIZES = (1, 100, 10000)
+# Seconds between checks that a forked benchmark is still alive
+CHILD_POLL_SECONDS = 1
+
+COLUMNS = [
+    ('name', 'Model', '{}'),
+    ('load_ms', 'Load ms', '{:.2f}'),
+    ('compiled', 'Compiled', '{}'),
+    ('single_p50_us', 'p50 µs', '{:.1f}'),
+    ('single_p99_us', 'p99 µs', '{:.1f}'),
+] + [
+    (f'batch_{n}_rows_per_s', f'{n} rows/s', '{:,.0f}') for n in BATCH_SIZES
+] + [
+    ('peak_rss_mb', 'Peak RSS MB', '{:.1f}'),
+]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def load_sample_rows():
+    """Sample data run through the model test preprocessing, as feature dicts."""
+    from Apps.Data_Scientist_Side.preprocessing import preprocess_test_data
+
+    X = preprocess_test_data(pd.read_csv(SAMPLE_DATA_PATH))[REQUIRED_ML_COLUMNS]
+    return X.to_dict('records')
+
+
+def bench_model(name, path, model_id, rows, iterations):
+    """Measure one model file; returns a dict of results."""
+    started = time.perf_counter()
+    entry = ModelCache().get(path, model_id)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    result = {
+        'name': name,
+        'model_id': model_id,
+        'path': os.path.relpath(path, settings.MEDIA_ROOT),
+        'size_bytes': entry.size_bytes,
+        'load_ms': load_ms,
+        'compiled': entry.compiled is not None,
+    }
+
+    # Warm single-row latency (what predict_land_price runs on a cache miss)
+    for row in rows[:10]:
+        predict_feature_row(row, entry)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        row = rows[i % len(rows)]
+        started = time.perf_counter()
+        predict_feature_row(row, entry)
+        timings[i] = time.perf_counter() - started
+    result['single_p50_us'] = float(np.percentile(timings, 50)) * 1e6
+    result['single_p99_us'] = float(np.percentile(timings, 99)) * 1e6
+
+    # Batch throughput, best of three runs
+    for size in BATCH_SIZES:
+        batch = [rows[i % len(rows)] for i in range(size)]
+        best = min(_timed(predict_feature_rows, batch, entry) for _ in range(3))
+        result[f'batch_{size}_rows_per_s'] = size / best if best else float('inf')
+
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def _bench_in_child(queue, *args):
+    try:
+        queue.put(bench_model(*args))
+    except Exception as e:
+        queue.put({'name': args[0], 'error': str(e)})
+
+
+class Command(BaseCommand):
+    help = "Benchmark load time, latency, throughput and memory of the uploaded ML models."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', action='store_true',
+                            help="Benchmark every .pkl in MEDIA_ROOT/ml_models instead of MLModel rows.")
+        parser.add_argument('--iterations', type=int, default=1000,
+                            help="Single-row predictions timed per model (default: 1000).")
+        parser.add_argument('--json', metavar='PATH',
+                            help="Write the results as JSON to PATH ('-' for stdout instead of the table).")
+        parser.add_argument('--no-fork', action='store_true',
+                            help="Measure every model in this process (peak RSS is then cumulative).")
+        parser.add_argument('--timeout', type=float, default=600,
+                            help="Give up on a forked benchmark after this many seconds (default: 600).")
+
+    def handle(self, *args, **options):
+        targets = self.get_targets(options['files'])
+        if not targets:
+            raise CommandError("No models to benchmark.")
+
+        rows = load_sample_rows()
+        fork = not options['no_fork'] and 'fork' in mp.get_all_start_methods()
+
+        results = []
+        for name, path, model_id in targets:
+            bench_args = (name, path, model_id, rows, options['iterations'])
+            if not os.path.exists(path):
+                result = {'name': name, 'error': 'file not found'}
+            elif fork:
+                result = self.run_forked(bench_args, options['timeout'])
+            else:
+                try:
+                    result = bench_model(*bench_args)
+                except Exception as e:
+                    result = {'name': name, 'error': str(e)}
+            results.append(result)
+
+        report = {
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'compiled_inference': getattr(settings, 'ML_COMPILED_INFERENCE', True),
+            'shared_memory': getattr(settings, 'ML_MODEL_SHARED_MEMORY', False),
+            'sample_rows': len(rows),
+            'models': results,
+        }
+        if options['json']:
+            payload = json.dumps(report, indent=2)
+            if options['json'] == '-':
+                self.stdout.write(payload)
+                return
+            with open(options['json'], 'w', encoding='utf-8') as f:
+                f.write(payload)
+        self.write_table(results)
+
+    def get_targets(self, files):
+        """(name, absolute path, MLModel id) for every model to benchmark."""
+        if files:
+            pattern = os.path.join(settings.MEDIA_ROOT, 'ml_models', '*.pkl')
+            return [
+                (os.path.splitext(os.path.basename(path))[0], path, None)
+                for path in sorted(glob.glob(pattern))
+            ]
+        return [
+            (f"{model.name} v{model.version}", os.path.join(settings.MEDIA_ROOT, model.model_file_path), model.id)
+            for model in MLModel.objects.filter(deleted_at__isnull=True).order_by('id')
+        ]
+
+    def run_forked(self, bench_args, timeout):
+        from django.db import connections
+        connections.close_all()  # don't share DB sockets with the child
+
+        context = mp.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=_bench_in_child, args=(queue, *bench_args))
+        process.start()
+        deadline = time.monotonic() + timeout
+        result = None
+        while result is None:
+            try:
+                result = queue.get(timeout=CHILD_POLL_SECONDS)
+            except queue_module.Empty:
+                if not process.is_alive():
+                    try:
+                        # It may have reported just before exiting
+                        result = queue.get(timeout=CHILD_POLL_SECONDS)
+                    except queue_module.Empty:
+                        # Killed (e.g. out of memory) or crashed in native code
+                        result = {'name': bench_args[0], 'error': f"benchmark exited with code {process.exitcode}"}
+                elif time.monotonic() >= deadline:
+                    process.kill()
+                    result = {'name': bench_args[0], 'error': f"timed out after {timeout:g} s"}
+        process.join()
+        return result
+
+    def write_table(self, results):
+        header = [title for _, title, _ in COLUMNS]
+        lines = []
+        for result in results:
+            if 'error' in result:
+                lines.append([result['name'], f"error: {result['error']}"] + [''] * (len(COLUMNS) - 2))
+                continue
+            lines.append([fmt.format(result[key]) for key, _, fmt in COLUMNS])
+
+        widths = [max(len(str(line[i])) for line in [header] + lines) for i in range(len(header))]
+        for line in [header, ['-' * w for w in widths]] + lines:
+            self.stdout.write('  '.join(str(cell).ljust(w) for cell, w in zip(line, widths)).rstrip())
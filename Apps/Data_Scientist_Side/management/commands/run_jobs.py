@@ -0,0 +1,67 @@
+"""
+Worker process for queued model evaluations and upload load checks (see
+Apps/Data_Scientist_Side/jobs.py).
+
+    python manage.py run_jobs            # run until interrupted
+    python manage.py run_jobs --once     # drain the queue and exit
+
+Run as many as needed; each job is claimed by exactly one worker. On
+Ctrl-C/SIGTERM the current job is put back in the queue.
+"""
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Apps.Data_Scientist_Side.jobs import claim_next_job, requeue_job, requeue_stale_jobs, run_job, worker_name
+from Apps.Data_Scientist_Side.result_store import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Run queued model evaluation and load check jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Exit when the queue is empty instead of polling.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds between queue checks when idle (default: 2).")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Re-queue running jobs without a heartbeat for this many seconds (default: 300).")
+
+    def handle(self, *args, **options):
+        # SIGTERM behaves like Ctrl-C so the current job is handed back
+        previous_handler = signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        worker = worker_name()
+        stale_after = timedelta(seconds=options['stale_after'])
+        self.stdout.write(f"Worker {worker} waiting for jobs")
+
+        job = None
+        try:
+            while True:
+                close_old_connections()
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(f"Re-queued {requeued} stalled job(s)")
+
+                job = claim_next_job(worker)
+                if job is None:
+                    if options['once']:
+                        return
+                    collect_garbage()
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Running job {job.pk} ({job.input_name}, model {job.model_id})")
+                run_job(job)
+                job.refresh_from_db()
+                self.stdout.write(f"Job {job.pk}: {job.status} ({job.rows_processed} rows)")
+                job = None
+        except KeyboardInterrupt:
+            if job is not None:
+                requeue_job(job)
+                self.stdout.write(f"Returned job {job.pk} to the queue")
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
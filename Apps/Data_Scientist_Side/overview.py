@@ -0,0 +1,104 @@
+"""
+Overview figures of the statistics page in a single SQL statement.
+
+The valuation totals and error sums come from the ModelDailyStats rollup
+(see Apps/core/model_stats.py); the model and project counts, and on
+PostgreSQL the median and 90th percentile of the absolute error, ride along
+in the same SELECT as uncorrelated scalar subqueries. The view then only
+divides a handful of sums.
+
+The sums are SUM() calls through Func rather than Sum aggregates, in a
+values() query: without an Aggregate Django adds no GROUP BY, so the
+statement returns its one row even when the rollup is empty, and the
+subqueries can sit next to the sums (aggregate() only takes aggregates).
+"""
+import math
+
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, FloatField, Func, IntegerField, Subquery
+from django.db.models.functions import Abs
+
+from Apps.core.models import MLModel, ModelDailyStats, Project, Valuation
+
+# Absolute-error percentiles reported where the database has PERCENTILE_CONT
+ERROR_PERCENTILES = {'median_error': 0.5, 'p90_error': 0.9}
+
+
+class PercentileCont(Func):
+    """PERCENTILE_CONT(fraction) WITHIN GROUP (ORDER BY expression) (PostgreSQL)."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _count(queryset):
+    return Subquery(
+        queryset.order_by().values(n=Func(F('pk'), function='COUNT')),
+        output_field=IntegerField(),
+    )
+
+
+def _sum(field, output_field):
+    return Func(F(field), function='SUM', output_field=output_field)
+
+
+def supports_percentiles():
+    return connection.vendor == 'postgresql'
+
+
+def statistics_overview(active_model=None):
+    """
+    Totals and accuracy figures over the live valuations of `active_model`
+    (all models if None), as one query.
+    """
+    stats = ModelDailyStats.objects.all()
+    feedback = Valuation.objects.filter(deleted_at__isnull=True, user_expected_price__isnull=False)
+    if active_model is not None:
+        stats = stats.filter(model=active_model)
+        feedback = feedback.filter(model=active_model)
+
+    columns = {
+        'valuations': _sum('valuation_count', IntegerField()),
+        'feedback': _sum('feedback_count', IntegerField()),
+        'abs_error': _sum('abs_error_sum', FloatField()),
+        'deviation_percent': _sum('deviation_percent_sum', FloatField()),
+        'squared_error': _sum('squared_error_sum', FloatField()),
+        'total_models': _count(MLModel.objects.filter(deleted_at__isnull=True)),
+        'total_projects': _count(Project.objects.filter(deleted_at__isnull=True)),
+    }
+    if supports_percentiles():
+        error = ExpressionWrapper(
+            Abs(F('predicted_price_per_m2') - F('user_expected_price')), output_field=FloatField()
+        )
+        for name, fraction in ERROR_PERCENTILES.items():
+            columns[name] = Subquery(
+                feedback.order_by().values(p=PercentileCont(error, fraction)), output_field=FloatField()
+            )
+    row = stats.order_by().values(**columns).get()
+
+    total_valuations = row['valuations'] or 0
+    feedback_count = row['feedback'] or 0
+    overview = {
+        'total_models': row['total_models'] or 0,
+        'total_projects': row['total_projects'] or 0,
+        'total_valuations': total_valuations,
+        'valuations_with_feedback': feedback_count,
+        'feedback_rate': round(feedback_count / total_valuations * 100, 1) if total_valuations > 0 else 0,
+        'feedback_count': feedback_count,
+        'mae': 0,
+        'rmse': 0,
+        'avg_deviation': 0,
+        'accuracy_score': None,
+    }
+    if feedback_count > 0:
+        overview['mae'] = round(row['abs_error'] / feedback_count, 2)
+        overview['rmse'] = round(math.sqrt(max(row['squared_error'], 0) / feedback_count), 2)
+        overview['avg_deviation'] = round(row['deviation_percent'] / feedback_count, 1)
+        overview['accuracy_score'] = max(0, round(100 - overview['avg_deviation'], 1))
+    for name in ERROR_PERCENTILES:
+        if row.get(name) is not None:
+            overview[name] = round(row[name], 2)
+    return overview
@@ -0,0 +1,141 @@
+"""
+Cache of the computed contexts of the scientist dashboard and statistics pages.
+
+Both pages show aggregates that only change when valuations, models, the
+active-model setting or projects are written, so their computed context is
+cached per page and scope (the active model, plus the day for pages with a
+date range). Keys carry the token of the STATS_VERSION_NAME version
+(Apps/core/versioning.py), which those writes bump once they commit: after a
+write every worker computes a fresh payload under a new key, and nothing
+has to be deleted.
+
+With SCIENTIST_PAGE_CACHE_STALE_WHILE_REVALIDATE the last payload of a
+scope is kept under a version-less key as well. After an invalidation it's
+served (up to SCIENTIST_PAGE_CACHE_MAX_STALE seconds old) while one
+background thread per key computes the new one, so no request waits for
+the aggregates.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from Apps.core.background import run_in_background
+from Apps.core.model_stats import STATS_VERSION_NAME
+from Apps.core.versioning import read_version
+
+KEY_PREFIX = "land_price:page"
+DEFAULT_TTL_SECONDS = 10 * 60
+DEFAULT_MAX_STALE_SECONDS = 60 * 60
+
+
+def version_token():
+    """Current STATS_VERSION_NAME version as a key fragment."""
+    version = read_version(STATS_VERSION_NAME)
+    return "-".join(str(part) for part in version) if version else "0"
+
+
+class PageCache:
+    """Versioned cache of page payloads with hit/miss/recompute-time counters."""
+
+    def __init__(self, backend=None, ttl=None, stale_while_revalidate=None, max_stale=None):
+        self._backend = backend
+        self._ttl = ttl
+        self._stale_while_revalidate = stale_while_revalidate
+        self._max_stale = max_stale
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.compute_seconds = 0.0
+        self.last_compute_seconds = {}
+
+    @property
+    def backend(self):
+        return caches[self._backend or getattr(settings, "SCIENTIST_PAGE_CACHE_BACKEND", "default")]
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "SCIENTIST_PAGE_CACHE_TTL", DEFAULT_TTL_SECONDS)
+
+    @property
+    def stale_while_revalidate(self):
+        if self._stale_while_revalidate is not None:
+            return self._stale_while_revalidate
+        return getattr(settings, "SCIENTIST_PAGE_CACHE_STALE_WHILE_REVALIDATE", False)
+
+    @property
+    def max_stale(self):
+        if self._max_stale is not None:
+            return self._max_stale
+        return getattr(settings, "SCIENTIST_PAGE_CACHE_MAX_STALE", DEFAULT_MAX_STALE_SECONDS)
+
+    def key(self, page, scope, version):
+        return f"{KEY_PREFIX}:{page}:{scope}:{version}"
+
+    def get_or_compute(self, page, scope, compute):
+        """
+        Return (payload, status) for `page` in `scope`: the cached payload of
+        the current version ('hit'), the previous one while a refresh runs
+        ('stale'), or compute() stored and returned ('miss').
+        """
+        if self.ttl <= 0:
+            return compute(), "miss"
+
+        backend = self.backend
+        key = self.key(page, scope, version_token())
+        cached = backend.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached, "hit"
+
+        latest_key = self.key(page, scope, "latest")
+        if self.stale_while_revalidate:
+            latest = backend.get(latest_key)
+            if latest is not None:
+                # One refresh per key across workers; the others keep serving stale
+                if backend.add(f"{key}:refreshing", 1, timeout=self.ttl):
+                    run_in_background(lambda: self._compute(page, key, latest_key, compute))
+                with self._lock:
+                    self.stale_hits += 1
+                return latest, "stale"
+
+        payload = self._compute(page, key, latest_key, compute)
+        with self._lock:
+            self.misses += 1
+        return payload, "miss"
+
+    def _compute(self, page, key, latest_key, compute):
+        started = time.perf_counter()
+        payload = compute()
+        cost = time.perf_counter() - started
+
+        backend = self.backend
+        backend.set(key, payload, timeout=self.ttl)
+        if self.stale_while_revalidate:
+            backend.set(latest_key, payload, timeout=self.max_stale)
+        with self._lock:
+            self.compute_seconds += cost
+            self.last_compute_seconds[page] = cost
+        return payload
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+                "compute_ms": round(self.compute_seconds * 1000, 3),
+                "last_compute_ms": {
+                    page: round(seconds * 1000, 3) for page, seconds in self.last_compute_seconds.items()
+                },
+            }
+
+
+page_cache = PageCache()
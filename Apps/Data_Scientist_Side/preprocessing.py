@@ -0,0 +1,163 @@
+"""
+Conversion of model-test files (the user's CSV/Excel format) into the
+columns the ML pipelines expect.
+
+Every model column is described once in PREPROCESS_SPEC. Value mappings
+(slope, view quality, TRUE/FALSE flags) are applied to the distinct values
+of a column rather than to every row, so a million-row file with a handful
+of categories costs one hash pass per column plus a few dozen string ops.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Mapping from user-friendly slope values to ML model format
+SLOPE_MAPPING = {
+    'Flat (0-5%)': 'FLAT',
+    'FLAT': 'FLAT',
+    'Mild (5-15%)': 'MILD',
+    'MILD': 'MILD',
+    'Moderate (15-30%)': 'MODERATE',
+    'MODERATE': 'MODERATE',
+    'Steep (>30%)': 'STEEP',
+    'STEEP': 'STEEP',
+}
+
+# View quality mapping (handle typos like FANTACTIC)
+VIEW_QUALITY_MAPPING = {
+    'BAD': 'BAD',
+    'GOOD': 'GOOD',
+    'FANTASTIC': 'FANTASTIC',
+    'FANTACTIC': 'FANTASTIC',  # Common typo
+}
+
+TARGET_COLUMN = 'actual_price_per_m2'
+
+# Columns in user's file format
+USER_FILE_COLUMNS = [
+    'Area', 'Neighborhood', 'political_classification', 'slope', 'view_quality',
+    'area_m2', 'parcel_frontage (m)', 'parcel_shape', 'electricity', 'water', 'Sewage',
+    'road_status1', 'road_status2', 'road_status3',
+    'land_use_residential', 'land_use_commercial', 'land_use_agricultural', 'land_use_industrial',
+    'hospitals_facility', 'schools_facility', 'police_facility', 'municipality_facility',
+    'FACTORIES_NEARBY', 'NOISY_FACILITIES', 'ANIMAL_FARMS',
+    'actual_price_per_m2'
+]
+
+# How one model column is derived from the user's file:
+#   name     model column
+#   kind     'copy'     value as-is (source column required)
+#            'road'     as-is, with missing/empty values as 'FALSE'
+#            'mapped'   normalize(value) looked up in `mapping`, else `default`
+#            'flag'     1 if normalize(value) is in `mapping` (a set), else 0
+#            'numeric'  to_numeric, invalid/missing as 0 (required unless a default is given)
+#            'width'    n-th column whose name starts with 'width_m', numeric
+#   source   column in the user's file (defaults to `name`)
+#   default  value used when the source column is absent
+ColumnSpec = namedtuple(
+    'ColumnSpec', ['name', 'kind', 'source', 'default', 'mapping', 'normalize'],
+    defaults=[None, None, None, None],
+)
+
+TRUE_VALUES = frozenset(['TRUE', '1', 'YES'])
+YES_VALUES = frozenset(['YES'])
+
+BINARY_COLUMNS = [
+    'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
+    'land_use_industrial', 'hospitals_facility', 'schools_facility',
+    'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
+    'NOISY_FACILITIES', 'ANIMAL_FARMS'
+]
+
+
+def _strip(value):
+    return str(value).strip()
+
+
+def _strip_upper(value):
+    return str(value).strip().upper()
+
+
+def _upper(value):
+    return str(value).upper()
+
+
+PREPROCESS_SPEC = [
+    ColumnSpec('Area', 'copy'),
+    ColumnSpec('Neighborhood', 'copy'),
+    ColumnSpec('political_classification', 'copy'),
+    ColumnSpec('parcel_shape', 'copy'),
+    ColumnSpec('road_status1', 'road', default='FALSE'),
+    ColumnSpec('road_status2', 'road', default='FALSE'),
+    ColumnSpec('road_status3', 'road', default='FALSE'),
+    ColumnSpec('slope', 'mapped', default='FLAT', mapping=SLOPE_MAPPING, normalize=_strip),
+    ColumnSpec('view_quality', 'mapped', default='GOOD', mapping=VIEW_QUALITY_MAPPING, normalize=_strip_upper),
+    ColumnSpec('electricity', 'copy', default='NO'),
+    ColumnSpec('Sewage', 'copy', default='NO'),
+    ColumnSpec('area_m2', 'numeric'),
+    ColumnSpec('parcel_frontage (m)', 'numeric', default=0),
+    # The user file may repeat width_m, which pandas renames width_m.1, width_m.2
+    ColumnSpec('width_m', 'width', source=0, default=0),
+    ColumnSpec('width_m.1', 'width', source=1, default=0),
+    ColumnSpec('width_m.2', 'width', source=2, default=0),
+] + [
+    ColumnSpec(name, 'flag', default=0, mapping=TRUE_VALUES, normalize=_upper)
+    for name in BINARY_COLUMNS
+] + [
+    # Water - YES/NO to 1/0 for ML
+    ColumnSpec('water', 'flag', default=0, mapping=YES_VALUES, normalize=_upper),
+]
+
+
+# Part of the key of cached preprocessed datasets (dataset_cache.py): bump it
+# whenever PREPROCESS_SPEC or the mappings above change the output. (2: the
+# cache stores numeric features as float; entries of 1 may be truncated.)
+PREPROCESS_VERSION = 2
+
+
+def lookup_distinct(series, func, dtype=object):
+    """
+    func(value) for every element of `series`, calling func once per
+    distinct value. Returns an array aligned with the series.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # Missing values take the last slot (code -1)
+    values = [func(value) for value in uniques] + [func(np.nan)]
+    return np.asarray(values, dtype=dtype)[codes]
+
+
+def _build_column(spec, df, width_columns):
+    if spec.kind == 'width':
+        if spec.source >= len(width_columns):
+            return spec.default
+        return pd.to_numeric(df[width_columns[spec.source]], errors='coerce').fillna(0)
+
+    source = spec.source or spec.name
+    if source not in df.columns and spec.default is not None:
+        return spec.default
+    values = df[source]  # KeyError for a missing required column
+
+    if spec.kind == 'copy':
+        return values
+    if spec.kind == 'road':
+        return values.fillna('FALSE').replace('', 'FALSE')
+    if spec.kind == 'numeric':
+        return pd.to_numeric(values, errors='coerce').fillna(0)
+    if spec.kind == 'mapped':
+        mapping, normalize, default = spec.mapping, spec.normalize, spec.default
+        return lookup_distinct(values, lambda value: mapping.get(normalize(value), default))
+    if spec.kind == 'flag':
+        truthy, normalize = spec.mapping, spec.normalize
+        return lookup_distinct(values, lambda value: int(normalize(value) in truthy), dtype=np.int64)
+    raise ValueError(f"Unknown column kind: {spec.kind}")
+
+
+def preprocess_test_data(df, spec=PREPROCESS_SPEC):
+    """
+    Transform user's CSV/Excel data to match ML model's expected format.
+    Handles column renaming, value mappings, and data type conversions.
+    """
+    width_columns = [c for c in df.columns if c.startswith('width_m')]
+    columns = {column.name: _build_column(column, df, width_columns) for column in spec}
+    return pd.DataFrame(columns, index=df.index)
@@ -0,0 +1,131 @@
+"""
+Child process of profiling.profile_model_file.
+
+Loads an uploaded model the way the model cache would (compiled artifact if
+there's a fresh one, else the pickle), predicts the canonical sample and
+times it. Run as `python -m Apps.Data_Scientist_Side.profile_worker` with a
+JSON request on stdin; writes one JSON object to stdout. It never imports
+Django, so a model that crashes, hangs or eats memory while unpickling only
+takes this process down.
+"""
+import json
+import resource
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _import_estimators():
+    """
+    Import what a running server already has loaded, so load_ms is the
+    model's own cost rather than the first import of sklearn.
+    """
+    import joblib  # noqa: F401
+    import sklearn.compose  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.linear_model  # noqa: F401
+    import sklearn.pipeline  # noqa: F401
+    import sklearn.preprocessing  # noqa: F401
+    import sklearn.tree  # noqa: F401
+
+
+def load(model_path, compiled_inference):
+    """
+    (predictor, row predictor, input columns or None, loaded from artifact)
+    as served by the model cache.
+    """
+    from Apps.Normal_User_Side.ml.compiled import (
+        CompiledPipeline, compile_model, sidecar_is_fresh, sidecar_path
+    )
+    import joblib
+
+    compiled = None
+    from_artifact = compiled_inference and sidecar_is_fresh(model_path)
+    if from_artifact:
+        compiled = CompiledPipeline.load(sidecar_path(model_path), mmap_mode=None)
+    else:
+        model = joblib.load(model_path)
+        if compiled_inference:
+            compiled = compile_model(model)
+
+    if compiled is not None:
+        return compiled, compiled.predict_row, list(compiled.input_columns), from_artifact
+
+    def predict_row(row):
+        # Same as predict.predict_feature_row without a compiled form
+        return float(model.predict(pd.DataFrame([row]))[0])
+
+    columns = getattr(model, 'feature_names_in_', None)
+    return model, predict_row, None if columns is None else [str(c) for c in columns], False
+
+
+def profile(request):
+    from Apps.Data_Scientist_Side.preprocessing import preprocess_test_data
+
+    features = preprocess_test_data(pd.read_csv(request['sample_path']))
+    rows = features.to_dict('records')
+    _import_estimators()
+    baseline_rss = _peak_rss_bytes()
+
+    started = time.perf_counter()
+    predictor, predict_row, input_columns, from_artifact = load(
+        request['model_path'], request['compiled_inference']
+    )
+    load_seconds = time.perf_counter() - started
+
+    if input_columns is not None:
+        missing = sorted(set(input_columns) - set(request['expected_columns']))
+        if missing:
+            raise ValueError(f"Model expects columns the app does not provide: {', '.join(missing)}")
+
+    predictions = np.asarray(predictor.predict(features), dtype=np.float64)
+    if predictions.shape != (len(features),):
+        raise ValueError(f"Model returned {predictions.shape} predictions for {len(features)} rows.")
+    if not np.isfinite(predictions).all():
+        raise ValueError("Model returned non-finite predictions for the sample.")
+
+    timings = []
+    for i in range(request['single_row_repeats']):
+        started = time.perf_counter()
+        predict_row(rows[i % len(rows)])
+        timings.append(time.perf_counter() - started)
+
+    batch = features.iloc[np.arange(request['batch_rows']) % len(features)].reset_index(drop=True)
+    started = time.perf_counter()
+    predictor.predict(batch)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'load_ms': round(load_seconds * 1000, 3),
+        'single_row_ms': round(statistics.median(timings) * 1000, 4),
+        'batch_rows_per_second': round(len(batch) / max(batch_seconds, 1e-9)),
+        'memory_bytes': max(0, _peak_rss_bytes() - baseline_rss),
+        'from_artifact': from_artifact,
+        'sample_rows': len(features),
+        'sample_mean_prediction': round(float(predictions.mean()), 2),
+    }
+
+
+def main():
+    request = json.load(sys.stdin)
+    # Anything the model prints goes to stderr; stdout carries only the result
+    out, sys.stdout = sys.stdout, sys.stderr
+    try:
+        result = profile(request)
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    json.dump(result, out)
+    out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Upload-time validation and profiling of ML models.
+
+Each uploaded model is loaded in a separate Python process (profile_worker)
+with a timeout, asked to predict a canonical sample built from
+data/sample_data.csv, and timed. The figures (load time, single-row latency,
+batch throughput, artifact size, memory) are stored on the MLModel row, and
+model_activate refuses a model that failed or is over the latency budgets
+in settings (MODEL_PROFILE_*). The check runs as a job of `manage.py
+run_jobs` (jobs.enqueue_profile), not in the upload request.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.utils import timezone
+
+from Apps.Normal_User_Side.ml.compiled import directory_size, sidecar_path
+from Apps.Normal_User_Side.ml.predict import REQUIRED_ML_COLUMNS
+
+SAMPLE_DATA_PATH = os.path.join(settings.BASE_DIR, 'data', 'sample_data.csv')
+WORKER_MODULE = 'Apps.Data_Scientist_Side.profile_worker'
+
+DEFAULT_TIMEOUT_SECONDS = 60
+# Single-row calls timed (the median is reported) and rows in the throughput batch
+SINGLE_ROW_REPEATS = 200
+BATCH_ROWS = 10000
+
+# Profile fields stored on MLModel
+PROFILE_FIELDS = ['load_ms', 'single_row_ms', 'batch_rows_per_second', 'artifact_bytes', 'memory_bytes']
+
+
+class ProfileError(Exception):
+    """The model could not be loaded, failed on the sample, or timed out."""
+
+
+def profile_model_file(model_path, timeout=None):
+    """
+    Load and time the model at `model_path` in a child process.
+    Returns the worker's figures plus 'artifact_bytes'; raises ProfileError.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'MODEL_PROFILE_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)
+    request = {
+        'model_path': os.path.abspath(model_path),
+        'sample_path': SAMPLE_DATA_PATH,
+        'expected_columns': REQUIRED_ML_COLUMNS,
+        'compiled_inference': getattr(settings, 'ML_COMPILED_INFERENCE', True),
+        'single_row_repeats': SINGLE_ROW_REPEATS,
+        'batch_rows': BATCH_ROWS,
+    }
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', WORKER_MODULE],
+            input=json.dumps(request), capture_output=True, text=True,
+            cwd=settings.BASE_DIR, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise ProfileError(f"Model did not load and predict the sample within {timeout:g} seconds.")
+
+    try:
+        result = json.loads(completed.stdout)
+    except ValueError:
+        # Killed (e.g. out of memory) or crashed in native code
+        detail = completed.stderr.strip().splitlines()[-1:] or [f"exit status {completed.returncode}"]
+        raise ProfileError(f"Model check crashed: {detail[0]}")
+    if 'error' in result:
+        raise ProfileError(result['error'])
+
+    # Size of what the model cache reads from disk
+    if result['from_artifact']:
+        result['artifact_bytes'] = directory_size(sidecar_path(model_path))
+    else:
+        result['artifact_bytes'] = os.path.getsize(model_path)
+    return result
+
+
+def profile_model(ml_model):
+    """Profile an MLModel's file and store the outcome on the row. Returns True if it passed."""
+    path = os.path.join(settings.MEDIA_ROOT, ml_model.model_file_path)
+    try:
+        result = profile_model_file(path)
+    except ProfileError as e:
+        ml_model.profile_status = ml_model.ProfileStatus.FAILED
+        ml_model.profile_error = str(e)
+        for field in PROFILE_FIELDS:
+            setattr(ml_model, field, None)
+    else:
+        ml_model.profile_status = ml_model.ProfileStatus.PASSED
+        ml_model.profile_error = ''
+        for field in PROFILE_FIELDS:
+            setattr(ml_model, field, result[field])
+    ml_model.profiled_at = timezone.now()
+    ml_model.save(update_fields=['profile_status', 'profile_error', 'profiled_at', *PROFILE_FIELDS])
+    return ml_model.profile_status == ml_model.ProfileStatus.PASSED
+
+
+def budget_violations(ml_model):
+    """Reasons a profiled model is over the configured budgets (empty if within)."""
+    violations = []
+    limits = [
+        ('load_ms', 'MODEL_PROFILE_MAX_LOAD_MS', "Load time {value:g} ms exceeds {limit:g} ms"),
+        ('single_row_ms', 'MODEL_PROFILE_MAX_SINGLE_ROW_MS',
+         "Single-row latency {value:g} ms exceeds {limit:g} ms"),
+        ('memory_bytes', 'MODEL_PROFILE_MAX_MEMORY_BYTES',
+         "Memory {value:,.0f} bytes exceeds {limit:,.0f} bytes"),
+    ]
+    for field, setting, message in limits:
+        limit = getattr(settings, setting, None)
+        value = getattr(ml_model, field)
+        if limit is not None and value is not None and value > limit:
+            violations.append(message.format(value=value, limit=limit))
+
+    minimum = getattr(settings, 'MODEL_PROFILE_MIN_BATCH_ROWS_PER_SECOND', None)
+    throughput = ml_model.batch_rows_per_second
+    if minimum is not None and throughput is not None and throughput < minimum:
+        violations.append(f"Batch throughput {throughput:,.0f} rows/s is below {minimum:,.0f} rows/s")
+    return violations
+
+
+def activation_problems(ml_model):
+    """
+    Why a checked `ml_model` may not be activated (empty if it may). Models
+    uploaded before load checks existed (NOT_PROFILED) are not gated.
+    """
+    if ml_model.profile_status == ml_model.ProfileStatus.FAILED:
+        return [f"Model failed the upload check: {ml_model.profile_error}"]
+    return budget_violations(ml_model)
@@ -0,0 +1,367 @@
+"""
+On-disk columnar store for model test results.
+
+Each run is a directory under MEDIA_ROOT/test_results/<run id>/ holding one
+flat binary file per column plus schema.json (column names, dtypes and the
+vocabularies of text columns). Text columns are dictionary-encoded: the
+file holds int32 codes and the vocabulary maps them back, which keeps the
+repeated Area/Neighborhood/status strings of a test file small.
+
+Results are appended chunk by chunk while the evaluation runs, published
+by renaming the directory into place, and read back with np.memmap so a
+download streams from the page cache instead of loading the run.
+
+Browsing a run sorted by error uses a sort index (row order plus sorted
+keys) built on first use and saved next to the columns. Pages are found
+with a binary search on the keys from the last row of the previous page
+(keyset paging), so any page of a multi-million-row run costs a few page
+reads rather than a sort.
+"""
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+RESULTS_DIRNAME = 'test_results'
+SCHEMA_FILENAME = 'schema.json'
+FORMAT_VERSION = 1
+
+# Column kinds and their on-disk dtype
+BOOL = 'bool'
+INT = 'int64'
+FLOAT = 'float64'
+TEXT = 'text'  # int32 codes into the vocabulary, -1 for missing
+DTYPES = {BOOL: np.bool_, INT: np.int64, FLOAT: np.float64, TEXT: np.int32}
+# A column widens to the later kind when a chunk doesn't fit the stored one
+WIDENING_ORDER = [BOOL, INT, FLOAT, TEXT]
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+CSV_CHUNK_ROWS = 10000
+
+# Sort keys for browsing a run: row order, or the absolute value of a column
+SORT_KEYS = {
+    'row': None,
+    'abs_deviation': 'deviation',
+    'abs_deviation_percent': 'deviation_percent',
+}
+SORT_DIRECTIONS = ('asc', 'desc')
+# Rows of the sort index examined per step while filtering
+SCAN_BLOCK_ROWS = 65536
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+def run_path(run_id):
+    """Directory of a stored run (None if the id is malformed)."""
+    if not run_id or not re.fullmatch(r'[0-9a-f]{32}', run_id):
+        return None
+    return os.path.join(settings.MEDIA_ROOT, RESULTS_DIRNAME, run_id)
+
+
+def run_exists(run_id):
+    path = run_path(run_id)
+    return path is not None and os.path.isfile(os.path.join(path, SCHEMA_FILENAME))
+
+
+def _column_kind(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return BOOL
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return INT
+    if pd.api.types.is_float_dtype(series.dtype):
+        return FLOAT
+    return TEXT
+
+
+def _chunk_kind(values, stored):
+    """Kind one chunk's values need, given the column's stored kind."""
+    if len(values) and values.isna().all():
+        # No values: only needs a kind that can hold missing ones
+        return TEXT if stored == TEXT else FLOAT
+    kind = _column_kind(values)
+    if kind in (BOOL, INT) and values.hasnans:
+        return FLOAT
+    return kind
+
+
+class ResultWriter:
+    """
+    Append DataFrame chunks to a new run, then close() to publish it.
+
+    Column kinds come from `kinds` ({name: kind}) or else the first chunk.
+    A later chunk that doesn't fit a column widens it (bool < int < float
+    < text) and rewrites what was already written, so no value is
+    truncated. Nothing is visible to readers until close() succeeds.
+    `path` stores the columns in another directory instead of the run's.
+
+    Each writer builds the run in its own temporary directory, so a retry
+    of a run whose writer died (a re-queued job) isn't blocked by what the
+    dead one left; collect_garbage() removes those.
+    """
+
+    def __init__(self, run_id=None, path=None, kinds=None):
+        self.run_id = run_id
+        self.path = path or run_path(run_id)
+        self.tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        self.kinds = kinds or {}
+        self.rows = 0
+        self.columns = None
+        self._files = []
+        self._vocabularies = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(self, df):
+        if self.columns is None:
+            os.makedirs(self.tmp_path)
+            self.columns = [
+                (str(name), self.kinds.get(str(name)) or _column_kind(df.iloc[:, i]))
+                for i, name in enumerate(df.columns)
+            ]
+            self._files = [open(self._column_path(i), 'wb') for i in range(len(self.columns))]
+            self._vocabularies = [{} if kind == TEXT else None for _, kind in self.columns]
+
+        for i, (name, kind) in enumerate(self.columns):
+            values = df.iloc[:, i]
+            needed = _chunk_kind(values, kind)
+            if WIDENING_ORDER.index(needed) > WIDENING_ORDER.index(kind):
+                kind = self._widen(i, needed)
+            if kind == TEXT:
+                data = self._encode(values, self._vocabularies[i])
+            elif kind == BOOL:
+                data = values.fillna(False).to_numpy(dtype=bool)
+            elif kind == INT:
+                data = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+            else:
+                data = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+            self._files[i].write(np.ascontiguousarray(data, dtype=DTYPES[kind]).tobytes())
+        self.rows += len(df)
+
+    def _column_path(self, index):
+        return os.path.join(self.tmp_path, f"{index}.bin")
+
+    def _widen(self, index, kind):
+        """Rewrite a column's values written so far as `kind`. Returns `kind`."""
+        name, stored = self.columns[index]
+        self._files[index].close()
+        data = np.fromfile(self._column_path(index), dtype=DTYPES[stored])
+        if kind == TEXT:
+            self._vocabularies[index] = {}
+            data = self._encode(pd.Series(data), self._vocabularies[index])
+        with open(self._column_path(index), 'wb') as f:
+            f.write(np.ascontiguousarray(data, dtype=DTYPES[kind]).tobytes())
+        self._files[index] = open(self._column_path(index), 'ab')
+        self.columns[index] = (name, kind)
+        return kind
+
+    @staticmethod
+    def _encode(values, vocabulary):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        # Chunk-local codes -> run-wide codes (missing stays -1)
+        mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+        for local, value in enumerate(uniques):
+            mapping[local] = vocabulary.setdefault(str(value), len(vocabulary))
+        mapping[-1] = -1
+        return mapping[codes]
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        if self.columns is None:
+            os.makedirs(self.tmp_path)
+            self.columns = []
+        schema = {
+            'format_version': FORMAT_VERSION,
+            'rows': self.rows,
+            'columns': [
+                {
+                    'name': name,
+                    'kind': kind,
+                    **({'vocabulary': list(vocabulary)} if kind == TEXT else {}),
+                }
+                for (name, kind), vocabulary in zip(self.columns, self._vocabularies or [None] * len(self.columns))
+            ],
+        }
+        with open(os.path.join(self.tmp_path, SCHEMA_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False)
+        os.rename(self.tmp_path, self.path)
+
+    def abort(self):
+        for f in self._files:
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class ResultReader:
+    """Memory-mapped view of a published run (or of a ResultWriter `path`)."""
+
+    def __init__(self, run_id=None, path=None):
+        self.path = path or run_path(run_id)
+        if self.path is None:
+            raise FileNotFoundError(run_id)
+        with open(os.path.join(self.path, SCHEMA_FILENAME), encoding='utf-8') as f:
+            schema = json.load(f)
+        if schema.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported result store format: {schema.get('format_version')}")
+        self.rows = schema['rows']
+        self.columns = schema['columns']
+        self._positions = {column['name']: i for i, column in enumerate(self.columns)}
+
+    def column(self, name):
+        """Raw on-disk values of a column (codes for text columns)."""
+        i = self._positions[name]
+        return self._array(i, self.columns[i]['kind'])
+
+    def vocabulary(self, name):
+        """Distinct values of a text column, in code order."""
+        return self.columns[self._positions[name]].get('vocabulary', [])
+
+    def _array(self, index, kind):
+        path = os.path.join(self.path, f"{index}.bin")
+        if not self.rows:
+            return np.empty(0, dtype=DTYPES[kind])
+        return np.memmap(path, dtype=DTYPES[kind], mode='r', shape=(self.rows,))
+
+    def iter_frames(self, chunk_rows=CSV_CHUNK_ROWS, categorical=True):
+        """
+        Yield the run as DataFrames of at most chunk_rows rows, indexed by
+        row number. Text columns are Categoricals, or plain object arrays
+        with NaN for missing values when `categorical` is false.
+        """
+        arrays = [self._array(i, column['kind']) for i, column in enumerate(self.columns)]
+        vocabularies = [
+            pd.Index(column['vocabulary'], dtype=object) if column['kind'] == TEXT else None
+            for column in self.columns
+        ]
+        for start in range(0, self.rows, chunk_rows):
+            stop = min(start + chunk_rows, self.rows)
+            data = {}
+            for column, array, vocabulary in zip(self.columns, arrays, vocabularies):
+                values = np.asarray(array[start:stop])
+                if vocabulary is not None:
+                    values = pd.Categorical.from_codes(values, categories=vocabulary)
+                    if not categorical:
+                        values = np.asarray(values, dtype=object)
+                data[column['name']] = values
+            yield pd.DataFrame(data, index=pd.RangeIndex(start, stop), columns=[c['name'] for c in self.columns])
+
+    def take(self, indices):
+        """The rows at `indices` as a DataFrame indexed by row number."""
+        indices = np.asarray(indices, dtype=np.int64)
+        data = {}
+        for i, column in enumerate(self.columns):
+            values = np.asarray(self._array(i, column['kind'])[indices])
+            if column['kind'] == TEXT:
+                values = pd.Categorical.from_codes(
+                    values, categories=pd.Index(column['vocabulary'], dtype=object)
+                )
+            data[column['name']] = values
+        return pd.DataFrame(data, index=indices, columns=[c['name'] for c in self.columns])
+
+    def _sort_values(self, key, direction, rows=slice(None)):
+        # Ascending sort values for the key; NaN sorts last either way
+        if SORT_KEYS[key] is None:
+            values = np.arange(self.rows, dtype=np.float64)[rows]
+        else:
+            values = np.abs(np.asarray(self.column(SORT_KEYS[key])[rows], dtype=np.float64))
+        return -values if direction == 'desc' else values
+
+    def sort_index(self, key, direction):
+        """(row order, sorted keys) for a sort, built and saved on first use."""
+        if key not in SORT_KEYS or direction not in SORT_DIRECTIONS:
+            raise ValueError(f"Unsupported sort: {key} {direction}")
+        order_path = os.path.join(self.path, f"order-{key}-{direction}.npy")
+        keys_path = os.path.join(self.path, f"keys-{key}-{direction}.npy")
+        if not os.path.exists(keys_path):
+            values = self._sort_values(key, direction)
+            # Stable, so ties keep row order (the keyset tie-breaker)
+            order = np.argsort(values, kind='stable')
+            for path, array in ((order_path, order), (keys_path, values[order])):
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+                os.replace(tmp_path, path)
+        return np.load(order_path, mmap_mode='r'), np.load(keys_path, mmap_mode='r')
+
+    def page(self, sort='abs_deviation', direction='desc', filters=None, after=None, limit=50):
+        """
+        Row numbers of one page of the run, sorted and filtered.
+
+        `filters` maps text column names to the value they must equal;
+        `after` is the last row number of the previous page. Returns
+        (row numbers, whether more rows follow).
+        """
+        order, keys = self.sort_index(sort, direction)
+
+        start = 0
+        if after is not None and 0 <= after < self.rows:
+            value = self._sort_values(sort, direction, slice(after, after + 1))[0]
+            low = int(np.searchsorted(keys, value, side='left'))
+            high = int(np.searchsorted(keys, value, side='right'))
+            start = low + int(np.searchsorted(order[low:high], after, side='right'))
+
+        conditions = []
+        for name, value in (filters or {}).items():
+            vocabulary = self.vocabulary(name)
+            if value not in vocabulary:
+                return [], False
+            conditions.append((self.column(name), vocabulary.index(value)))
+
+        selected = []
+        position = start
+        while position < self.rows and len(selected) <= limit:
+            block = np.asarray(order[position:position + SCAN_BLOCK_ROWS])
+            mask = np.ones(len(block), dtype=bool)
+            for codes, code in conditions:
+                mask &= np.asarray(codes[block]) == code
+            selected.extend(block[mask][:limit + 1 - len(selected)].tolist())
+            position += len(block)
+
+        return selected[:limit], len(selected) > limit
+
+    def iter_csv(self, chunk_rows=CSV_CHUNK_ROWS):
+        """Yield the run as CSV text, header first, one chunk at a time."""
+        yield pd.DataFrame(columns=[c['name'] for c in self.columns]).to_csv(index=False)
+        for frame in self.iter_frames(chunk_rows):
+            yield frame.to_csv(index=False, header=False)
+
+
+def collect_garbage(ttl_seconds=None):
+    """Delete runs (and abandoned partial runs) older than the TTL. Returns how many."""
+    if ttl_seconds is None:
+        ttl_seconds = getattr(settings, 'MODEL_TEST_RESULTS_TTL', DEFAULT_TTL_SECONDS)
+    root = os.path.join(settings.MEDIA_ROOT, RESULTS_DIRNAME)
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return 0
+
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,1078 @@
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import patch
+from Apps.core.models import (
+    Project, Governorate, Town, Area, Neighborhood, MLModel, Setting, EvaluationJob,
+    FeatureHistogram, ModelDailyStats, Valuation
+)
+from Apps.core import model_stats
+from Apps.Normal_User_Side.ml.drift import DriftMonitor, drift_monitor, register_exit_flush
+from Apps.Normal_User_Side.ml.model_loader import FALLBACK_MODEL_PATH, load_model_file
+from Apps.Normal_User_Side.ml.prediction_cache import PredictionCache
+from Apps.Normal_User_Side.ml.predict import REQUIRED_ML_COLUMNS
+from Apps.Data_Scientist_Side.preprocessing import preprocess_test_data
+from Apps.Data_Scientist_Side import jobs
+from Apps.Data_Scientist_Side.jobs import claim_next_job, requeue_stale_jobs, run_job
+from Apps.Data_Scientist_Side.evaluation import (
+    EvaluationError, OnlineRegressionMetrics, evaluate_chunks, evaluate_prepared, prepare_chunks, read_chunks
+)
+from Apps.Data_Scientist_Side import dataset_cache
+from Apps.Data_Scientist_Side.analysis import analyze_run, bootstrap_intervals
+from Apps.Data_Scientist_Side.profiling import ProfileError, profile_model_file
+from Apps.Data_Scientist_Side.overview import statistics_overview
+from Apps.Data_Scientist_Side.page_cache import PageCache
+from Apps.Data_Scientist_Side.drift import drift_report, snapshot_reference_file
+from Apps.Data_Scientist_Side.comparison import load_dataset, predict_all
+from Apps.Data_Scientist_Side.result_store import (
+    ResultReader, ResultWriter, collect_garbage, new_run_id, run_exists, run_path
+)
+from django.contrib.auth import get_user_model
+User = get_user_model()
+
+SAMPLE_DATA_PATH = os.path.join(settings.BASE_DIR, 'data', 'sample_data.csv')
+
+
+class PreprocessTestDataTest(SimpleTestCase):
+    """preprocess_test_data normalizes the user's file format per PREPROCESS_SPEC."""
+
+    def test_value_mappings(self):
+        df = pd.DataFrame({
+            'Area': ['A', 'B', 'C'],
+            'Neighborhood': ['N1', 'N2', 'N3'],
+            'political_classification': ['AREA_A', 'AREA_B', 'AREA_C'],
+            'parcel_shape': ['RECTANGLE', 'SQUARE', 'IRREGULAR'],
+            'road_status1': ['PAVED', '', None],
+            'slope': [' Mild (5-15%) ', 'STEEP', None],
+            'view_quality': ['fantactic', ' bad', 'unknown'],
+            'area_m2': ['1000', 'n/a', 250],
+            'width_m': [10, None, 6],
+            'width_m.1': [4, 5, 'x'],
+            'land_use_residential': ['TRUE', 'yes', 'False'],
+            'schools_facility': [1, 0, True],
+            'water': ['yes', 'NO', None],
+        }, index=[5, 6, 7])
+        result = preprocess_test_data(df)
+
+        self.assertEqual(list(result.index), [5, 6, 7])
+        self.assertEqual(list(result['road_status1']), ['PAVED', 'FALSE', 'FALSE'])
+        self.assertEqual(list(result['road_status2']), ['FALSE'] * 3)
+        self.assertEqual(list(result['slope']), ['MILD', 'STEEP', 'FLAT'])
+        self.assertEqual(list(result['view_quality']), ['FANTASTIC', 'BAD', 'GOOD'])
+        self.assertEqual(list(result['area_m2']), [1000, 0, 250])
+        self.assertEqual(list(result['parcel_frontage (m)']), [0, 0, 0])
+        self.assertEqual(list(result['width_m']), [10, 0, 6])
+        self.assertEqual(list(result['width_m.1']), [4, 5, 0])
+        self.assertEqual(list(result['width_m.2']), [0, 0, 0])
+        self.assertEqual(list(result['land_use_residential']), [1, 1, 0])
+        self.assertEqual(list(result['schools_facility']), [1, 0, 1])
+        self.assertEqual(list(result['land_use_commercial']), [0, 0, 0])
+        self.assertEqual(list(result['water']), [1, 0, 0])
+        self.assertEqual(list(result['electricity']), ['NO'] * 3)
+
+    def test_missing_required_column(self):
+        with self.assertRaises(KeyError):
+            preprocess_test_data(pd.DataFrame({'Area': ['A']}))
+
+
+class StreamingEvaluationTest(TestCase):
+    """Chunked model evaluation matches a single pass and keeps results on disk."""
+
+    def test_online_metrics_match_sklearn(self):
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+        rng = np.random.default_rng(0)
+        y_true = rng.uniform(10, 500, 1000)
+        y_pred = y_true + rng.normal(0, 30, 1000)
+
+        metrics = OnlineRegressionMetrics()
+        for start in range(0, 1000, 37):
+            metrics.update(y_true[start:start + 37], y_pred[start:start + 37])
+
+        self.assertEqual(metrics.count, 1000)
+        self.assertAlmostEqual(metrics.mae, mean_absolute_error(y_true, y_pred))
+        self.assertAlmostEqual(metrics.rmse, mean_squared_error(y_true, y_pred) ** 0.5)
+        self.assertAlmostEqual(metrics.r2, r2_score(y_true, y_pred))
+        self.assertEqual(sum(b['count'] for b in metrics.histogram_buckets()), 1000)
+
+    def test_chunk_size_does_not_change_results(self):
+        model = joblib.load(FALLBACK_MODEL_PATH)
+        whole, whole_rows = evaluate_chunks([pd.read_csv(SAMPLE_DATA_PATH)], model)
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            upload = SimpleUploadedFile('sample.csv', f.read())
+        chunked, chunked_rows = evaluate_chunks(read_chunks(upload, chunk_rows=7), model)
+        self.assertAlmostEqual(whole.mae, chunked.mae)
+        self.assertAlmostEqual(whole.r2, chunked.r2)
+        self.assertEqual(
+            [(r['actual'], r['predicted']) for r in whole_rows],
+            [(r['actual'], r['predicted']) for r in chunked_rows],
+        )
+
+    def test_xlsx_is_read_in_chunks_as_text_like_csv(self):
+        buffer = io.BytesIO()
+        df = pd.read_csv(SAMPLE_DATA_PATH)
+        # The sample repeats width_m, which read_csv renamed width_m.1 and width_m.2
+        df.to_excel(buffer, index=False, header=[c.split('.')[0] for c in df.columns])
+
+        chunks = list(read_chunks(SimpleUploadedFile('sample.xlsx', buffer.getvalue()), chunk_rows=30))
+        self.assertEqual([len(c) for c in chunks], [30, 30, 30, 10])
+        pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_csv(SAMPLE_DATA_PATH, dtype=str))
+        self.assertIn('width_m.1', chunks[0].columns)
+
+    def test_xlsx_chunk_types_do_not_depend_on_values(self):
+        df = pd.read_csv(SAMPLE_DATA_PATH)
+        # Whole widths and no third road in the first chunk, then a fraction and a road
+        df['width_m'] = df['width_m'].astype(float).round()
+        df['road_status3'] = pd.Series(np.nan, index=df.index, dtype=object)
+        df.loc[40, 'width_m'] = 7.5
+        df.loc[40, 'road_status3'] = 'PUBLIC_EXISTING_PAVED'
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False, header=[c.split('.')[0] for c in df.columns])
+        csv = df.to_csv(index=False, header=[c.split('.')[0] for c in df.columns]).encode()
+
+        xlsx_chunks = list(read_chunks(SimpleUploadedFile('sample.xlsx', buffer.getvalue()), chunk_rows=30))
+        csv_chunks = list(read_chunks(SimpleUploadedFile('sample.csv', csv), chunk_rows=30))
+        self.assertEqual(xlsx_chunks[1].loc[40, 'width_m'], '7.5')
+        self.assertEqual(xlsx_chunks[1].loc[40, 'road_status3'], 'PUBLIC_EXISTING_PAVED')
+        pd.testing.assert_frame_equal(
+            pd.concat(preprocess_test_data(c) for c in xlsx_chunks),
+            pd.concat(preprocess_test_data(c) for c in csv_chunks),
+        )
+
+    def test_missing_target_column(self):
+        df = pd.read_csv(SAMPLE_DATA_PATH).drop(columns=['actual_price_per_m2'])
+        with self.assertRaisesMessage(EvaluationError, 'Missing target column'):
+            evaluate_chunks([df], joblib.load(FALLBACK_MODEL_PATH))
+
+    def test_model_test_view_and_download(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        os.makedirs(os.path.join(media_root, 'ml_models'))
+        shutil.copy(FALLBACK_MODEL_PATH, os.path.join(media_root, 'ml_models', 'eval.pkl'))
+        user = User.objects.create_user(email="eval@example.com", password="pass12345", type="scientist")
+        ml_model = MLModel.objects.create(
+            name='eval', version='1', description='', created_by=user,
+            model_file_path=os.path.join('ml_models', 'eval.pkl'),
+        )
+        self.client.force_login(user)
+
+        with override_settings(MEDIA_ROOT=media_root, MODEL_TEST_CHUNK_ROWS=30):
+            with open(SAMPLE_DATA_PATH, 'rb') as f:
+                response = self.client.post(
+                    reverse('data_scientist:model_test', args=[ml_model.id]), {'test_file': f}
+                )
+            self.assertEqual(response.context['sample_count'], 100)
+            self.assertEqual(len(response.context['results']), 100)
+
+            response = self.client.get(reverse('data_scientist:download_test_results'))
+            results = pd.read_csv(io.BytesIO(b''.join(response.streaming_content)))
+
+            page = self.client.get(reverse('data_scientist:test_results_rows'), {'limit': 10}).json()
+            response = self.client.get(reverse('data_scientist:test_results_browse'), {'sort': 'row'})
+        self.assertEqual(len(results), 100)
+        self.assertIn('predicted_price_per_m2', results.columns)
+
+        worst = results['deviation'].abs().nlargest(10)
+        self.assertEqual([r['row_num'] - 1 for r in page['results']], worst.index.tolist())
+        self.assertEqual(page['next_after'], worst.index[-1])
+        self.assertEqual([r['row_num'] for r in response.context['results']], list(range(1, 51)))
+
+
+class ResultStoreTest(SimpleTestCase):
+    """Test results round-trip through the columnar store and expire after the TTL."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_round_trip(self):
+        frame = pd.DataFrame({
+            'Area': ['Amman', 'Irbid', None, 'Amman'],
+            'count': np.array([1, 2, 3, 4], dtype=np.int64),
+            'price': [1.5, np.nan, 3.25, 4.0],
+        })
+        run_id = new_run_id()
+        with ResultWriter(run_id) as writer:
+            writer.append(frame.iloc[:3])
+            writer.append(frame.iloc[3:])
+        self.assertTrue(run_exists(run_id))
+
+        reader = ResultReader(run_id)
+        self.assertEqual(reader.rows, 4)
+        restored = pd.concat(reader.iter_frames(chunk_rows=3), ignore_index=True)
+        self.assertEqual(restored['Area'].tolist()[:2], ['Amman', 'Irbid'])
+        self.assertTrue(pd.isna(restored['Area'][2]))
+        self.assertEqual(restored['count'].tolist(), [1, 2, 3, 4])
+        self.assertTrue(np.isnan(restored['price'][1]))
+
+        csv = pd.read_csv(io.StringIO(''.join(reader.iter_csv(chunk_rows=3))))
+        self.assertEqual(list(csv.columns), ['Area', 'count', 'price'])
+        self.assertEqual(len(csv), 4)
+
+    def test_later_chunks_widen_columns(self):
+        run_id = new_run_id()
+        with ResultWriter(run_id) as writer:
+            writer.append(pd.DataFrame({
+                'area': np.array([500, 700], dtype=np.int64),
+                'road': [np.nan, np.nan],
+                'flag': [True, False],
+            }))
+            writer.append(pd.DataFrame({
+                'area': [500.5, np.nan],
+                'road': ['PAVED', None],
+                'flag': np.array([3, 4], dtype=np.int64),
+            }))
+
+        restored = next(ResultReader(run_id).iter_frames(categorical=False))
+        self.assertEqual(restored['area'].tolist()[:3], [500.0, 700.0, 500.5])
+        self.assertTrue(np.isnan(restored['area'][3]))
+        self.assertEqual(restored['road'].tolist()[2], 'PAVED')
+        self.assertTrue(restored['road'].drop(2).isna().all())
+        self.assertEqual(restored['flag'].tolist(), [1, 0, 3, 4])
+
+    def test_failed_run_is_not_published(self):
+        run_id = new_run_id()
+        with self.assertRaises(RuntimeError):
+            with ResultWriter(run_id) as writer:
+                writer.append(pd.DataFrame({'x': [1.0]}))
+                raise RuntimeError()
+        self.assertFalse(run_exists(run_id))
+        self.assertFalse(run_exists('../not-a-run'))
+
+    def test_keyset_pages_match_full_sort(self):
+        rng = np.random.default_rng(1)
+        frame = pd.DataFrame({
+            'Area': rng.choice(['A', 'B', 'C'], 500),
+            'deviation': np.round(rng.normal(0, 50, 500)),  # plenty of ties
+        })
+        frame.loc[7, 'deviation'] = np.nan
+        run_id = new_run_id()
+        with ResultWriter(run_id) as writer:
+            writer.append(frame)
+        reader = ResultReader(run_id)
+
+        for direction in ('desc', 'asc'):
+            for filters in (None, {'Area': 'B'}):
+                rows, after, has_more = [], None, True
+                while has_more:
+                    page, has_more = reader.page('abs_deviation', direction, filters, after, limit=37)
+                    rows.extend(page)
+                    after = page[-1] if page else None
+                expected = frame if filters is None else frame[frame['Area'] == 'B']
+                expected = expected.assign(key=expected['deviation'].abs()).sort_values(
+                    'key', ascending=direction == 'asc', kind='stable', na_position='last'
+                )
+                # Ties are broken by row number
+                expected = expected.reset_index().sort_values(
+                    ['key', 'index'], ascending=[direction == 'asc', True], na_position='last'
+                )
+                self.assertEqual(rows, expected['index'].tolist())
+
+        self.assertEqual(reader.page(filters={'Area': 'missing'}), ([], False))
+
+    def test_collect_garbage(self):
+        old, new = new_run_id(), new_run_id()
+        for run_id in (old, new):
+            with ResultWriter(run_id) as writer:
+                writer.append(pd.DataFrame({'x': [1.0]}))
+        stale = timezone.now().timestamp() - 7200
+        os.utime(run_path(old), (stale, stale))
+
+        self.assertEqual(collect_garbage(ttl_seconds=3600), 1)
+        self.assertFalse(run_exists(old))
+        self.assertTrue(run_exists(new))
+
+
+class ModelTestAnalysisTest(SimpleTestCase):
+    """Bootstrap intervals bracket the point metrics; segment errors match a groupby."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, MODEL_TEST_CHUNK_ROWS=30)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_intervals_bracket_point_metrics(self):
+        rng = np.random.default_rng(0)
+        actual = rng.normal(500, 100, 2000)
+        predicted = actual + rng.normal(0, 40, 2000)
+        metrics = OnlineRegressionMetrics()
+        metrics.update(actual, predicted)
+
+        intervals = bootstrap_intervals(actual, predicted, resamples=100, workers=1)
+        for name in ('mae', 'rmse', 'r2'):
+            low, high = intervals[name]
+            self.assertLess(low, getattr(metrics, name))
+            self.assertGreater(high, getattr(metrics, name))
+        self.assertEqual(intervals, bootstrap_intervals(actual, predicted, resamples=100, workers=1))
+
+    def test_pooled_intervals_match_in_process(self):
+        rng = np.random.default_rng(1)
+        actual = rng.normal(500, 100, 2000)
+        predicted = actual + rng.normal(0, 40, 2000)
+        with patch('Apps.Data_Scientist_Side.analysis.PARALLEL_MIN_ROWS', 0):
+            pooled = bootstrap_intervals(actual, predicted, resamples=32, workers=2)
+        # Each worker draws from its own seed, split the same way in process
+        with patch('Apps.Data_Scientist_Side.fork_pool.mp.get_all_start_methods', return_value=[]), \
+                patch('Apps.Data_Scientist_Side.analysis.PARALLEL_MIN_ROWS', 0):
+            serial = bootstrap_intervals(actual, predicted, resamples=32, workers=2)
+        self.assertEqual(pooled, serial)
+
+    def test_segment_breakdown_matches_groupby(self):
+        run_id = new_run_id()
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            upload = SimpleUploadedFile('sample.csv', f.read())
+        with ResultWriter(run_id) as writer:
+            evaluate_chunks(read_chunks(upload), joblib.load(FALLBACK_MODEL_PATH), writer)
+        analysis = analyze_run(run_id, resamples=50)
+
+        results = pd.read_csv(io.StringIO(''.join(ResultReader(run_id).iter_csv())))
+        breakdowns = {b['column']: b['segments'] for b in analysis['segment_breakdown']}
+        self.assertEqual(list(breakdowns), ['Area', 'Neighborhood', 'political_classification', 'parcel_shape'])
+        expected = results['deviation'].abs().groupby(results['Area']).agg(['mean', 'count'])
+        for segment in breakdowns['Area']:
+            self.assertEqual(segment['count'], expected.loc[segment['value'], 'count'])
+            self.assertAlmostEqual(segment['mae'], expected.loc[segment['value'], 'mean'], places=2)
+        maes = [segment['mae'] for segment in breakdowns['Area']]
+        self.assertEqual(maes, sorted(maes, reverse=True))
+
+
+class DatasetCacheTest(TestCase):
+    """Re-testing a file replays its cached preprocessed chunks instead of parsing it."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, MODEL_TEST_CHUNK_ROWS=30)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.model = joblib.load(FALLBACK_MODEL_PATH)
+
+    def upload(self, name='sample.csv', rows=None):
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            lines = f.read().splitlines(keepends=True)
+        return SimpleUploadedFile(name, b''.join(lines[:rows + 1] if rows else lines))
+
+    def test_replay_matches_parsed_file(self):
+        parsed, parsed_rows = evaluate_prepared(dataset_cache.open_dataset(self.upload()), self.model)
+        key = dataset_cache.content_key(self.upload())
+        self.assertTrue(dataset_cache.has_dataset(key))
+
+        with patch('Apps.Data_Scientist_Side.evaluation.preprocess_test_data') as preprocess:
+            replayed, replayed_rows = evaluate_prepared(dataset_cache.open_dataset(self.upload()), self.model)
+        preprocess.assert_not_called()
+        self.assertAlmostEqual(parsed.mae, replayed.mae)
+        self.assertEqual(parsed_rows, replayed_rows)
+
+        [recent] = dataset_cache.recent_datasets()
+        self.assertEqual((recent['key'], recent['name'], recent['rows']), (key, 'sample.csv', 100))
+
+    def test_replay_keeps_values_of_later_chunks(self):
+        # Whole-number measurements in the first chunk, fractions later
+        frame = pd.read_csv(SAMPLE_DATA_PATH, dtype=str)
+        frame.loc[40, 'area_m2'] = '500.5'
+        frame.loc[70, 'width_m'] = '7.5'
+        upload = SimpleUploadedFile('fractions.csv', frame.to_csv(index=False).encode())
+
+        parsed = pd.concat(X for _, X, _ in dataset_cache.open_dataset(upload))
+        key = dataset_cache.content_key(upload)
+        replayed = pd.concat(X for _, X, _ in dataset_cache.replay(key))
+        self.assertEqual(replayed['area_m2'].iloc[40], 500.5)
+        self.assertEqual(replayed['width_m'].iloc[70], 7.5)
+        pd.testing.assert_frame_equal(
+            replayed.reset_index(drop=True), parsed.reset_index(drop=True), check_dtype=False,
+        )
+
+    def test_failed_evaluation_is_not_cached(self):
+        prepared = dataset_cache.open_dataset(self.upload())
+        next(prepared)
+        prepared.close()
+        self.assertEqual(dataset_cache.recent_datasets(), [])
+        self.assertEqual(os.listdir(dataset_cache.cache_root()), [])
+
+    def test_eviction_keeps_most_recent(self):
+        for rows in (40, 60):
+            evaluate_prepared(dataset_cache.open_dataset(self.upload(rows=rows)), self.model)
+        self.assertEqual(len(dataset_cache.recent_datasets()), 2)
+
+        self.assertEqual(dataset_cache.evict(max_bytes=1), 2)
+        self.assertEqual(dataset_cache.recent_datasets(), [])
+
+    def test_model_test_with_recent_dataset(self):
+        user = User.objects.create_user(email="cache@example.com", password="pass12345", type="scientist")
+        os.makedirs(os.path.join(self.media_root, 'ml_models'))
+        shutil.copy(FALLBACK_MODEL_PATH, os.path.join(self.media_root, 'ml_models', 'cache.pkl'))
+        ml_model = MLModel.objects.create(
+            name='cache', version='1', description='', created_by=user,
+            model_file_path=os.path.join('ml_models', 'cache.pkl'),
+        )
+        self.client.force_login(user)
+        url = reverse('data_scientist:model_test', args=[ml_model.id])
+
+        response = self.client.post(url, {'test_file': self.upload()})
+        self.assertEqual(response.context['sample_count'], 100)
+
+        key = dataset_cache.content_key(self.upload())
+        self.assertContains(self.client.get(url), key)
+        response = self.client.post(url, {'dataset': key})
+        self.assertEqual(response.context['sample_count'], 100)
+        download = self.client.get(reverse('data_scientist:download_test_results'))
+        results = pd.read_csv(io.BytesIO(b''.join(download.streaming_content)))
+        self.assertIn('Neighborhood', results.columns)
+        self.assertEqual(len(results), 100)
+
+        response = self.client.post(url, {})
+        self.assertFormError(
+            response.context['form'], None, "Upload a test file or pick a recently tested dataset."
+        )
+
+
+class ModelComparisonTest(TestCase):
+    """Several models are evaluated on one parsed dataset, in a process pool."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'ml_models'))
+        self.user = User.objects.create_user(email="compare@example.com", password="pass12345", type="scientist")
+        self.models = []
+        for name in ('first', 'second'):
+            shutil.copy(FALLBACK_MODEL_PATH, os.path.join(self.media_root, 'ml_models', f'{name}.pkl'))
+            self.models.append(MLModel.objects.create(
+                name=name, version='1', description='', created_by=self.user,
+                model_file_path=os.path.join('ml_models', f'{name}.pkl'),
+            ))
+        joblib.dump('not a model', os.path.join(self.media_root, 'ml_models', 'broken.pkl'))
+        self.broken = MLModel.objects.create(
+            name='broken', version='1', description='', created_by=self.user,
+            model_file_path=os.path.join('ml_models', 'broken.pkl'),
+        )
+
+    def dataset(self):
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            return load_dataset(prepare_chunks(read_chunks(SimpleUploadedFile('sample.csv', f.read()))))
+
+    def test_pool_matches_in_process(self):
+        features = self.dataset().features
+        pooled = predict_all(self.models + [self.broken], features, workers=2)
+        serial = predict_all(self.models + [self.broken], features, workers=1)
+        for ml_model in self.models:
+            np.testing.assert_allclose(pooled[ml_model.id], serial[ml_model.id])
+        self.assertIsInstance(pooled[self.broken.id], str)
+
+    def test_workers_never_touch_the_model_cache(self):
+        # A worker forked while another thread holds the cache lock would hang on it
+        features = self.dataset().features
+        parent = os.getpid()
+
+        def load(path, model_id=None):
+            if os.getpid() != parent:
+                raise RuntimeError("model cache used in a worker")
+            return load_model_file(path, model_id)
+
+        with patch('Apps.Data_Scientist_Side.comparison.load_model_file', side_effect=load):
+            pooled = predict_all(self.models, features, workers=2)
+        for ml_model in self.models:
+            self.assertNotIsInstance(pooled[ml_model.id], str)
+
+    def test_concurrent_pools_keep_their_own_features(self):
+        features = self.dataset().features
+        halves = [features.iloc[:50], features.iloc[50:]]
+        results = [None, None]
+
+        def run(i):
+            results[i] = predict_all(self.models, halves[i], workers=2)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for half, result in zip(halves, results):
+            expected = predict_all(self.models[:1], half, workers=1)[self.models[0].id]
+            for ml_model in self.models:
+                np.testing.assert_allclose(result[ml_model.id], expected)
+
+    def test_compare_view(self):
+        self.client.force_login(self.user)
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            response = self.client.post(reverse('data_scientist:model_compare'), {
+                'test_file': f,
+                'models': [m.id for m in self.models + [self.broken]],
+            })
+        self.assertEqual(response.status_code, 200)
+        results = {m['name']: m for m in response.context['models']}
+        first, second, broken = results['first'], results['second'], results['broken']
+        self.assertEqual(first['sample_count'], 100)
+        self.assertEqual(first['mae'], second['mae'])
+        self.assertIn('error', broken)
+        # Copies of the same model never disagree
+        self.assertEqual(response.context['mean_spread'], 0)
+        self.assertEqual(len(response.context['disagreements']), 50)
+
+    def test_needs_two_models(self):
+        self.client.force_login(self.user)
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            response = self.client.post(reverse('data_scientist:model_compare'), {
+                'test_file': f, 'models': [self.models[0].id],
+            })
+        self.assertFormError(response.context['form'], 'models', "Select at least two models to compare.")
+
+
+class EvaluationJobTest(TestCase):
+    """Large model tests are queued, run by `manage.py run_jobs` and report progress."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, MODEL_TEST_SYNC_MAX_BYTES=0,
+                                     MODEL_TEST_CHUNK_ROWS=30)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'ml_models'))
+        shutil.copy(FALLBACK_MODEL_PATH, os.path.join(self.media_root, 'ml_models', 'job.pkl'))
+        self.user = User.objects.create_user(email="jobs@example.com", password="pass12345", type="scientist")
+        self.ml_model = MLModel.objects.create(
+            name='job', version='1', description='', created_by=self.user,
+            model_file_path=os.path.join('ml_models', 'job.pkl'),
+        )
+        self.client.force_login(self.user)
+
+    def enqueue(self):
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            response = self.client.post(
+                reverse('data_scientist:model_test', args=[self.ml_model.id]), {'test_file': f}
+            )
+        job = EvaluationJob.objects.latest('id')
+        self.assertRedirects(response, reverse('data_scientist:evaluation_job', args=[job.id]))
+        return job
+
+    def test_queued_job_runs_in_worker(self):
+        job = self.enqueue()
+        progress = self.client.get(reverse('data_scientist:evaluation_job_progress', args=[job.id])).json()
+        self.assertEqual(progress['status'], 'QUEUED')
+
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.SUCCEEDED)
+        self.assertEqual(job.rows_processed, 100)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, job.input_path)))
+
+        response = self.client.get(reverse('data_scientist:evaluation_job', args=[job.id]))
+        self.assertEqual(response.context['sample_count'], 100)
+        response = self.client.get(reverse('data_scientist:download_test_results'))
+        self.assertEqual(len(pd.read_csv(io.BytesIO(b''.join(response.streaming_content)))), 100)
+
+    def test_cancel(self):
+        queued = self.enqueue()
+        self.client.post(reverse('data_scientist:evaluation_job_cancel', args=[queued.id]))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EvaluationJob.Status.CANCELLED)
+
+        job = self.enqueue()
+        claimed = claim_next_job('test-worker')
+        self.assertEqual(claimed.pk, job.pk)
+        self.client.post(reverse('data_scientist:evaluation_job_cancel', args=[job.id]))
+        run_job(claimed)  # stops after the first chunk
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.CANCELLED)
+        self.assertEqual(job.rows_processed, 30)
+        # The partial run is discarded
+        self.assertFalse(run_exists(job.results_token))
+        self.assertEqual(os.listdir(os.path.dirname(run_path(job.results_token))), [])
+
+    def test_xlsx_progress_counts_rows(self):
+        buffer = io.BytesIO()
+        pd.read_csv(SAMPLE_DATA_PATH).to_excel(buffer, index=False)
+        response = self.client.post(
+            reverse('data_scientist:model_test', args=[self.ml_model.id]),
+            {'test_file': SimpleUploadedFile('sample.xlsx', buffer.getvalue())},
+        )
+        job = EvaluationJob.objects.latest('id')
+        self.assertRedirects(response, reverse('data_scientist:evaluation_job', args=[job.id]))
+
+        claimed = claim_next_job('test-worker')
+        self.client.post(reverse('data_scientist:evaluation_job_cancel', args=[job.id]))
+        run_job(claimed)  # stops after the first chunk
+        job.refresh_from_db()
+        self.assertEqual(job.rows_processed, 30)
+        # openpyxl reads the whole file up front; the position would say 100%
+        self.assertEqual(job.bytes_processed, job.input_bytes * 30 // 100)
+
+    def test_heartbeat_is_kept_during_analysis(self):
+        job = self.enqueue()
+        beaten = threading.Event()
+
+        def slow_analysis(run_id):
+            self.assertTrue(beaten.wait(5))
+            return {}
+
+        with patch.object(jobs, 'HEARTBEAT_SECONDS', 0.01), \
+                patch.object(jobs, '_beat', side_effect=lambda job: beaten.set()), \
+                patch.object(jobs, 'analyze_run', side_effect=slow_analysis):
+            run_job(claim_next_job('test-worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.SUCCEEDED)
+
+    def test_stale_running_job_is_requeued(self):
+        job = self.enqueue()
+        claim_next_job('dead-worker')
+        EvaluationJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.QUEUED)
+
+        # The dead worker's partial run is still on disk
+        stale_tmp = f"{run_path(job.results_token)}.tmp"
+        os.makedirs(stale_tmp)
+        with open(os.path.join(stale_tmp, '0.bin'), 'wb') as f:
+            f.write(b'\0' * 16)
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.SUCCEEDED)
+        self.assertEqual(job.rows_processed, 100)
+        self.assertTrue(run_exists(job.results_token))
+
+
+class ModelProfilingTest(TestCase):
+    """Uploads are loaded and timed in a subprocess; activation is gated on the outcome."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(email="profile@example.com", password="pass12345", type="scientist")
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='profiled', run_jobs=True):
+        self.client.post(reverse('data_scientist:model_upload'), {
+            'name': name, 'version': '1', 'description': 'test',
+            'model_file': SimpleUploadedFile('model.pkl', content),
+        })
+        if run_jobs:
+            call_command('run_jobs', '--once', stdout=io.StringIO())
+        return MLModel.objects.get(name=name)
+
+    def activate(self, ml_model):
+        self.client.get(reverse('data_scientist:model_activate', args=[ml_model.id]))
+        setting = Setting.objects.first()
+        return setting is not None and setting.active_ml_model_id == ml_model.id
+
+    def test_upload_records_profile(self):
+        with open(FALLBACK_MODEL_PATH, 'rb') as f:
+            ml_model = self.upload(f.read())
+        self.assertEqual(ml_model.profile_status, MLModel.ProfileStatus.PASSED)
+        self.assertGreater(ml_model.load_ms, 0)
+        self.assertGreater(ml_model.single_row_ms, 0)
+        self.assertGreater(ml_model.batch_rows_per_second, 0)
+        self.assertGreater(ml_model.artifact_bytes, 0)
+        self.assertIsNotNone(ml_model.memory_bytes)
+        # Drift reference from the canonical sample (no training file given)
+        self.assertEqual(
+            FeatureHistogram.objects.filter(model=ml_model, source=FeatureHistogram.Source.REFERENCE).count(),
+            len(REQUIRED_ML_COLUMNS),
+        )
+        self.assertTrue(self.activate(ml_model))
+
+    def test_broken_model_cannot_be_activated(self):
+        ml_model = self.upload(b'not a pickle')
+        self.assertEqual(ml_model.profile_status, MLModel.ProfileStatus.FAILED)
+        self.assertTrue(ml_model.profile_error)
+        self.assertFalse(self.activate(ml_model))
+
+    def test_upload_queues_the_check(self):
+        with open(FALLBACK_MODEL_PATH, 'rb') as f:
+            ml_model = self.upload(f.read(), run_jobs=False)
+        self.assertEqual(ml_model.profile_status, MLModel.ProfileStatus.PENDING)
+        job = EvaluationJob.objects.get(model=ml_model)
+        self.assertEqual((job.kind, job.status), (EvaluationJob.Kind.PROFILE, EvaluationJob.Status.QUEUED))
+
+        # Activation doesn't wait for the worker
+        with patch('Apps.Data_Scientist_Side.jobs.time.sleep', side_effect=AssertionError):
+            self.assertFalse(self.activate(ml_model))
+        self.assertEqual(EvaluationJob.objects.filter(model=ml_model).count(), 1)
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, EvaluationJob.Status.SUCCEEDED)
+        self.assertTrue(self.activate(ml_model))
+
+    def test_activation_queues_a_missing_check(self):
+        with open(FALLBACK_MODEL_PATH, 'rb') as f:
+            ml_model = self.upload(f.read(), run_jobs=False)
+        EvaluationJob.objects.all().delete()
+        self.assertFalse(self.activate(ml_model))
+        self.assertEqual(EvaluationJob.objects.filter(model=ml_model, kind=EvaluationJob.Kind.PROFILE).count(), 1)
+
+    def test_model_uploaded_before_checks_can_be_activated(self):
+        os.makedirs(os.path.join(self.media_root, 'ml_models'))
+        shutil.copy(FALLBACK_MODEL_PATH, os.path.join(self.media_root, 'ml_models', 'legacy.pkl'))
+        ml_model = MLModel.objects.create(
+            name='legacy', version='1', description='', created_by=self.user,
+            model_file_path=os.path.join('ml_models', 'legacy.pkl'),
+        )
+        self.assertEqual(ml_model.profile_status, MLModel.ProfileStatus.NOT_PROFILED)
+        self.assertTrue(self.activate(ml_model))
+        self.assertFalse(EvaluationJob.objects.exists())
+
+    def test_model_over_budget_cannot_be_activated(self):
+        with open(FALLBACK_MODEL_PATH, 'rb') as f:
+            ml_model = self.upload(f.read())
+        with override_settings(MODEL_PROFILE_MIN_BATCH_ROWS_PER_SECOND=10 ** 12):
+            self.assertFalse(self.activate(ml_model))
+
+    def test_timeout(self):
+        with self.assertRaisesMessage(ProfileError, 'within'):
+            profile_model_file(FALLBACK_MODEL_PATH, timeout=0.01)
+
+
+class ModelDailyStatsTest(TestCase):
+    """
+    The daily rollup follows valuation writes and matches a rebuild from
+    scratch; the pages reading it are cached until the next write.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        governorate = Governorate.objects.create(name_ar="Hebron")
+        town = Town.objects.create(governorate=governorate, name_ar="Bani Naim")
+        area = Area.objects.create(town=town, name_ar="Rollup Area")
+        neighborhood = Neighborhood.objects.create(area=area, name_ar="Rollup Basin")
+        cls.user = User.objects.create_user(email="rollup@example.com", password="pass12345", type="scientist")
+        cls.ml_model = MLModel.objects.create(
+            name='rollup', version='1', description='', created_by=cls.user, model_file_path='ml_models/x.pkl',
+        )
+        cls.projects = [
+            Project.objects.create(
+                created_by=cls.user, project_name=f"Rollup {i}", status="COMPLETED", parcel_no=str(i),
+                area_m2=500, governorate=governorate, town=town, area=area, neighborhood=neighborhood,
+                neighborhood_no="1", land_type="PRIVATE", political_classification="AREA_A", slope="FLAT",
+                view_quality="GOOD", parcel_shape="SQUARE", electricity="YES_3PHASE", water="YES",
+                sewage="YES_PUBLIC", ownership_document_type="TABU",
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        # Version files live under MEDIA_ROOT; cached pages outlive a test
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        caches['default'].clear()
+
+    def valuation(self, project, predicted, expected=None):
+        return Valuation.objects.create(
+            project=project, model=self.ml_model, predicted_price_per_m2=predicted,
+            user_expected_price=expected, created_by=self.user,
+        )
+
+    def rollup(self):
+        return list(ModelDailyStats.objects.values('model_id', 'day', *model_stats.STAT_FIELDS).order_by('day'))
+
+    def test_rollup_follows_writes(self):
+        first = self.valuation(self.projects[0], 100)
+        [row] = self.rollup()
+        self.assertEqual((row['valuation_count'], row['feedback_count']), (1, 0))
+
+        first.user_expected_price = Decimal('80')
+        first.save(update_fields=['user_expected_price'])
+        self.valuation(self.projects[1], 50, expected=Decimal('100'))
+        [row] = self.rollup()
+        self.assertEqual((row['valuation_count'], row['feedback_count']), (2, 2))
+        self.assertAlmostEqual(row['abs_error_sum'], 70)
+        self.assertAlmostEqual(row['deviation_percent_sum'], 25 + 50)
+        self.assertAlmostEqual(row['squared_error_sum'], 400 + 2500)
+        self.assertAlmostEqual(row['predicted_sum'], 150)
+
+        self.assertEqual(Valuation.objects.filter(project=self.projects[0]).soft_delete(), 1)
+        self.assertEqual(Valuation.objects.filter(project=self.projects[0]).soft_delete(), 0)
+        self.valuation(self.projects[2], 70)
+        Valuation.objects.filter(project=self.projects[2]).delete()
+        [row] = self.rollup()
+        self.assertEqual((row['valuation_count'], row['feedback_count']), (1, 1))
+        self.assertAlmostEqual(row['abs_error_sum'], 50)
+
+        incremental = self.rollup()
+        call_command('backfill_model_stats', stdout=io.StringIO())
+        for maintained, rebuilt in zip(incremental, self.rollup(), strict=True):
+            for field in ['model_id', 'day', *model_stats.STAT_FIELDS]:
+                self.assertAlmostEqual(maintained[field], rebuilt[field])
+
+    def test_statistics_reads_rollup(self):
+        self.valuation(self.projects[0], 100, expected=Decimal('80'))
+        self.valuation(self.projects[1], 60)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('data_scientist:statistics'))
+        self.assertEqual(response.context['total_valuations'], 2)
+        self.assertEqual(response.context['feedback_count'], 1)
+        self.assertEqual(response.context['mae'], 20)
+        self.assertEqual(response.context['avg_deviation'], 25)
+        self.assertEqual(json.loads(response.context['chart_counts_json'])[-1], 2)
+
+    def test_overview_is_one_query(self):
+        self.valuation(self.projects[0], 100, expected=Decimal('80'))
+        self.valuation(self.projects[1], 60, expected=Decimal('60'))
+        with self.assertNumQueries(1):
+            overview = statistics_overview(self.ml_model)
+        self.assertEqual(overview['total_models'], 1)
+        self.assertEqual(overview['total_projects'], 3)
+        self.assertEqual((overview['total_valuations'], overview['feedback_count']), (2, 2))
+        self.assertEqual(overview['mae'], 10)
+        self.assertEqual(overview['rmse'], round(math.sqrt(200), 2))
+        self.assertEqual(overview['avg_deviation'], 12.5)
+
+        # No rollup rows at all still yields one row of counts
+        ModelDailyStats.objects.all().delete()
+        with self.assertNumQueries(1):
+            overview = statistics_overview()
+        self.assertEqual((overview['total_projects'], overview['total_valuations'], overview['mae']), (3, 0, 0))
+
+    def test_timeseries_buckets_in_database(self):
+        # Monday 2026-03-02 and Sunday 2026-03-08 share a week; 2026-03-09 starts the next
+        for project, day, predicted, expected in [
+            (self.projects[0], 2, 100, Decimal('80')), (self.projects[1], 8, 60, None),
+            (self.projects[2], 9, 90, Decimal('100')),
+        ]:
+            valuation = self.valuation(project, predicted, expected)
+            valuation.created_at = timezone.make_aware(datetime(2026, 3, day, 12))
+            valuation.save(update_fields=['created_at'])
+
+        self.client.force_login(self.user)
+        url = reverse('data_scientist:valuation_timeseries')
+        with self.assertNumQueries(4):  # session, user, series, model names
+            response = self.client.get(url, {'start': '2026-03-01', 'end': '2026-03-20', 'bucket': 'week'})
+        series = response.json()
+        self.assertEqual(series['buckets'], ['2026-02-23', '2026-03-02', '2026-03-09', '2026-03-16'])
+        self.assertEqual(series['total']['valuation_count'], [0, 2, 1, 0])
+        self.assertEqual(series['total']['mae'], [None, 20, 10, None])
+        [model] = series['models']
+        self.assertEqual(model['name'], 'rollup v1')
+        self.assertEqual(model['feedback_count'], [0, 1, 1, 0])
+
+        monthly = self.client.get(url, {'start': '2026-01-15', 'end': '2026-03-31', 'bucket': 'month'}).json()
+        self.assertEqual(monthly['buckets'], ['2026-01-01', '2026-02-01', '2026-03-01'])
+        self.assertEqual(monthly['total']['valuation_count'], [0, 0, 3])
+        other = self.client.get(url, {'start': '2026-03-01', 'end': '2026-03-31', 'model': self.ml_model.id + 1})
+        self.assertEqual(other.json()['models'], [])
+
+        self.assertEqual(self.client.get(url, {'bucket': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2026-03-02', 'end': '2026-03-01'}).status_code, 400)
+
+    def test_timeseries_conditional_get(self):
+        self.client.force_login(self.user)
+        url = reverse('data_scientist:valuation_timeseries')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(2):  # session and user only
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.valuation(self.projects[0], 100)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total']['valuation_count'][-1], 1)
+
+    def test_pages_cached_until_valuation_written(self):
+        cache = PageCache()
+        compute = lambda: statistics_overview()['total_valuations']
+        self.assertEqual(cache.get_or_compute('statistics', 'all', compute), (0, 'miss'))
+        self.assertEqual(cache.get_or_compute('statistics', 'all', compute), (0, 'hit'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.valuation(self.projects[0], 100)
+        self.assertEqual(cache.get_or_compute('statistics', 'all', compute), (1, 'miss'))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+        self.client.force_login(self.user)
+        with override_settings(DEBUG=True):
+            self.client.get(reverse('data_scientist:statistics'))
+            response = self.client.get(reverse('data_scientist:statistics'))
+        self.assertEqual(response.context['page_cache']['status'], 'hit')
+        self.assertEqual(response.context['total_valuations'], 1)
+        self.assertContains(response, 'Page cache: hit')
+
+    def test_stale_payload_served_while_recomputing(self):
+        cache = PageCache(stale_while_revalidate=True)
+        cache.get_or_compute('dashboard', 'all', lambda: 'old')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.valuation(self.projects[0], 100)
+
+        refreshes = []
+        with patch('Apps.Data_Scientist_Side.page_cache.run_in_background', side_effect=refreshes.append):
+            self.assertEqual(cache.get_or_compute('dashboard', 'all', lambda: 'new'), ('old', 'stale'))
+            # The refresh is already claimed
+            self.assertEqual(cache.get_or_compute('dashboard', 'all', lambda: 'new'), ('old', 'stale'))
+        self.assertEqual(len(refreshes), 1)
+        refreshes[0]()
+        self.assertEqual(cache.get_or_compute('dashboard', 'all', lambda: 'newer'), ('new', 'hit'))
+
+
+class DriftMonitorTest(TestCase):
+    """Served rows are buffered, flushed in batches and scored against the upload-time reference."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="drift@example.com", password="pass12345", type="scientist")
+        cls.ml_model = MLModel.objects.create(
+            name='drift', version='1', description='', created_by=cls.user, model_file_path='ml_models/x.pkl',
+        )
+        with open(SAMPLE_DATA_PATH, 'rb') as f:
+            snapshot_reference_file(cls.ml_model, f)
+        cls.rows = preprocess_test_data(pd.read_csv(SAMPLE_DATA_PATH))[REQUIRED_ML_COLUMNS].to_dict('records')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_flushes_in_batches(self):
+        monitor = DriftMonitor(flush_rows=150, flush_seconds=3600, max_pending_rows=250)
+        flushes = []
+        with patch('Apps.Normal_User_Side.ml.drift.run_in_background', side_effect=flushes.append):
+            monitor.record(None, self.rows)  # fallback model
+            monitor.record(self.ml_model.id, self.rows)
+            self.assertEqual(flushes, [])
+            monitor.record(self.ml_model.id, self.rows)
+            monitor.record(self.ml_model.id, self.rows)  # over max_pending_rows
+            self.assertEqual(len(flushes), 1)
+        flushes[0]()
+        self.assertEqual(monitor.stats(), {'pending': 0, 'recorded': 200, 'flushed': 200, 'dropped': 100})
+
+        live = FeatureHistogram.objects.get(model=self.ml_model, source=FeatureHistogram.Source.LIVE, feature='Area')
+        reference = FeatureHistogram.objects.get(
+            model=self.ml_model, source=FeatureHistogram.Source.REFERENCE, feature='Area',
+        )
+        self.assertEqual(live.total, 200)
+        self.assertEqual(live.counts, {value: 2 * count for value, count in reference.counts.items()})
+
+    def test_repeated_prediction_is_counted_once(self):
+        from Apps.Normal_User_Side.ml import predict
+        monitor = DriftMonitor()
+        entry = load_model_file(FALLBACK_MODEL_PATH, self.ml_model.id)
+        with patch.object(predict, 'drift_monitor', monitor), \
+                patch.object(predict, 'prediction_cache', PredictionCache(max_entries=10, ttl=60)), \
+                patch.object(predict, 'get_model_entry', return_value=entry), \
+                patch.object(predict, 'build_feature_row', return_value=self.rows[0]):
+            # Submission, resubmission and the confirm step
+            for _ in range(3):
+                predict.predict_land_price(None)
+        monitor.flush()
+        live = FeatureHistogram.objects.get(model=self.ml_model, source=FeatureHistogram.Source.LIVE, feature='Area')
+        self.assertEqual(live.total, 1)
+
+    def test_idle_worker_flushes_at_exit(self):
+        monitor = DriftMonitor(flush_rows=1000, flush_seconds=3600)
+        monitor.record(self.ml_model.id, self.rows)
+        self.assertEqual(monitor.stats()['pending'], 100)
+        monitor.flush_at_exit()
+        self.assertEqual(monitor.stats()['flushed'], 100)
+        live = FeatureHistogram.objects.get(model=self.ml_model, source=FeatureHistogram.Source.LIVE, feature='Area')
+        self.assertEqual(live.total, 100)
+
+        with patch('Apps.Normal_User_Side.ml.drift.flush_rows', side_effect=RuntimeError('database gone')):
+            monitor.record(self.ml_model.id, self.rows)
+            with self.assertLogs('Apps.Normal_User_Side.ml.drift', 'ERROR'):
+                monitor.flush_at_exit()
+
+    def test_exit_hook_is_registered_by_serving_processes_only(self):
+        with patch('Apps.Normal_User_Side.ml.drift.atexit.register') as register:
+            register_exit_flush()
+            register.assert_called_once_with(drift_monitor.flush_at_exit)
+            register.reset_mock()
+            with self.settings(DRIFT_MONITORING=False):
+                register_exit_flush()
+            register.assert_not_called()
+
+    def test_report_flags_shifted_features(self):
+        monitor = DriftMonitor()
+        monitor.record(self.ml_model.id, self.rows)
+        monitor.flush()
+        report = {entry['feature']: entry for entry in drift_report(self.ml_model)}
+        self.assertEqual(len(report), len(REQUIRED_ML_COLUMNS))
+        self.assertEqual(report['area_m2']['psi'], 0)
+        self.assertEqual(report['area_m2']['ks'], 0)
+        self.assertEqual({entry['status'] for entry in report.values()}, {'ok'})
+
+        shifted = [{**row, 'area_m2': row['area_m2'] * 10, 'Area': 'New Area'} for row in self.rows]
+        monitor.record(self.ml_model.id, shifted * 3)
+        monitor.flush()
+        report = drift_report(self.ml_model)
+        self.assertEqual({report[0]['feature'], report[1]['feature']}, {'area_m2', 'Area'})
+        by_feature = {entry['feature']: entry for entry in report}
+        self.assertEqual(by_feature['area_m2']['status'], 'alert')
+        self.assertGreater(by_feature['area_m2']['ks'], 0.5)
+        self.assertEqual(by_feature['Area']['unseen'], ['New Area'])
+        self.assertEqual(by_feature['slope']['psi'], 0)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('data_scientist:model_drift', args=[self.ml_model.id]))
+        self.assertContains(response, 'New Area')
+
+
+class BenchModelsCommandTest(TestCase):
+    """manage.py bench_models reports every model as a table and as JSON."""
+
+    def test_bench_model_files(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        os.makedirs(os.path.join(media_root, 'ml_models'))
+        shutil.copy(FALLBACK_MODEL_PATH, os.path.join(media_root, 'ml_models', 'bench.pkl'))
+        json_path = os.path.join(media_root, 'bench.json')
+
+        out = io.StringIO()
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command('bench_models', '--files', '--no-fork', '--iterations', '20',
+                         '--json', json_path, stdout=out)
+
+        self.assertIn('bench', out.getvalue())
+        with open(json_path) as f:
+            [result] = json.load(f)['models']
+        self.assertTrue(result['compiled'])
+        self.assertLessEqual(result['single_p50_us'], result['single_p99_us'])
+        self.assertIn('batch_10000_rows_per_s', result)
+
+    def test_forked_benchmark_that_dies_or_hangs(self):
+        from Apps.Data_Scientist_Side.management.commands.bench_models import Command
+        bench_args = ('crash', FALLBACK_MODEL_PATH, None, [], 1)
+        with patch('Apps.Data_Scientist_Side.management.commands.bench_models.bench_model',
+                   side_effect=lambda *args: os._exit(3)):
+            result = Command().run_forked(bench_args, timeout=30)
+        self.assertEqual(result, {'name': 'crash', 'error': 'benchmark exited with code 3'})
+
+        with patch('Apps.Data_Scientist_Side.management.commands.bench_models.bench_model',
+                   side_effect=lambda *args: time.sleep(30)):
+            result = Command().run_forked(bench_args, timeout=0.5)
+        self.assertEqual(result['error'], 'timed out after 0.5 s')
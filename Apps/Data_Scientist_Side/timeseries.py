@@ -0,0 +1,180 @@
+"""
+Valuation time series for the statistics charts (the valuation_timeseries view).
+
+Series are read from the ModelDailyStats rollup (Apps/core/model_stats.py)
+and bucketed by the database (Trunc on the rollup day), so a year of weekly
+points is one grouped query over at most a row per model and day however
+many valuations there are. Every bucket of the range is returned, empty
+ones included, as arrays aligned with 'buckets' so charts can plot them
+directly.
+
+The series only change when STATS_VERSION_NAME is bumped or, for ranges
+ending today by default, when the day changes; series_etag() and
+series_last_modified() derive the validators from those alone (a stat() of
+the version file), so a chart reload that gets a 304 runs no SQL.
+"""
+import hashlib
+import math
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from Apps.core.model_stats import STAT_FIELDS, STATS_VERSION_NAME
+from Apps.core.models import MLModel, ModelDailyStats
+from Apps.core.versioning import read_version
+
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_DAYS = 30
+# Longest series one request may ask for
+MAX_BUCKETS = 1000
+# Series of every model and of the total, one value per bucket
+METRICS = ['valuation_count', 'feedback_count', 'mean_predicted', 'mae', 'rmse', 'avg_deviation']
+
+
+class TimeSeriesError(ValueError):
+    """Invalid range, bucket or model in a time-series request."""
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise TimeSeriesError(f"'{name}' must be a date in YYYY-MM-DD format.")
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing `day` (weeks start on Monday, like the database's)."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_range(start, end, bucket):
+    """Starts of every bucket overlapping start..end."""
+    current = bucket_start(start, bucket)
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if bucket == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == 'week' else 1)
+    return buckets
+
+
+def parse_query(params, today):
+    """
+    (start, end, bucket, model ids or None) from request.GET. The range
+    defaults to the last DEFAULT_DAYS days up to `today`, the bucket to day.
+    """
+    end = _parse_date(params['end'], 'end') if params.get('end') else today
+    if params.get('start'):
+        start = _parse_date(params['start'], 'start')
+    else:
+        start = end - timedelta(days=DEFAULT_DAYS)
+    if start > end:
+        raise TimeSeriesError("'start' must not be after 'end'.")
+
+    bucket = params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise TimeSeriesError(f"'bucket' must be one of: {', '.join(BUCKETS)}.")
+    # Cheap upper bound before building the bucket list
+    days_per_bucket = {'day': 1, 'week': 7, 'month': 28}[bucket]
+    if (end - start).days // days_per_bucket + 1 > MAX_BUCKETS:
+        raise TimeSeriesError(f"Range has more than {MAX_BUCKETS} {bucket} buckets.")
+
+    model_ids = None
+    if params.getlist('model'):
+        try:
+            model_ids = sorted({int(value) for value in params.getlist('model')})
+        except ValueError:
+            raise TimeSeriesError("'model' must be a model id.")
+    return start, end, bucket, model_ids
+
+
+def _metrics(sums):
+    """Counts and error metrics of one bucket from its rollup sums (None without feedback)."""
+    valuations = sums['valuation_count']
+    feedback = sums['feedback_count']
+    metrics = {
+        'valuation_count': valuations,
+        'feedback_count': feedback,
+        'mean_predicted': round(sums['predicted_sum'] / valuations, 2) if valuations else None,
+        'mae': None,
+        'rmse': None,
+        'avg_deviation': None,
+    }
+    if feedback:
+        metrics['mae'] = round(sums['abs_error_sum'] / feedback, 2)
+        metrics['rmse'] = round(math.sqrt(max(sums['squared_error_sum'], 0) / feedback), 2)
+        metrics['avg_deviation'] = round(sums['deviation_percent_sum'] / feedback, 1)
+    return metrics
+
+
+def _series(buckets, sums_by_bucket):
+    """{metric: [value per bucket]} with empty buckets counted as zero valuations."""
+    empty = dict.fromkeys(STAT_FIELDS, 0)
+    points = [_metrics(sums_by_bucket.get(b, empty)) for b in buckets]
+    return {metric: [point[metric] for point in points] for metric in METRICS}
+
+
+def valuation_series(start, end, bucket, model_ids=None):
+    """
+    Per-model and total series of live models' valuations created start..end
+    (inclusive), bucketed by day, week or month.
+    """
+    stats = ModelDailyStats.objects.filter(
+        day__gte=start, day__lte=end, model__deleted_at__isnull=True,
+    )
+    if model_ids is not None:
+        stats = stats.filter(model_id__in=model_ids)
+    rows = stats.annotate(
+        bucket=Trunc('day', bucket, output_field=DateField()),
+    ).values('model_id', 'bucket').annotate(
+        # Aliases may not shadow the summed fields
+        **{f'sum_{field}': Sum(field) for field in STAT_FIELDS}
+    ).order_by()
+
+    by_model = {}
+    totals = {}
+    for row in rows:
+        sums = {field: row[f'sum_{field}'] for field in STAT_FIELDS}
+        by_model.setdefault(row['model_id'], {})[row['bucket']] = sums
+        total = totals.setdefault(row['bucket'], dict.fromkeys(STAT_FIELDS, 0))
+        for field in STAT_FIELDS:
+            total[field] += sums[field]
+
+    buckets = bucket_range(start, end, bucket)
+    names = MLModel.objects.filter(pk__in=list(by_model)).order_by('pk').values_list('pk', 'name', 'version')
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket': bucket,
+        'buckets': [b.isoformat() for b in buckets],
+        'total': _series(buckets, totals),
+        'models': [
+            {'id': pk, 'name': f"{name} v{version}", **_series(buckets, by_model[pk])}
+            for pk, name, version in names
+        ],
+    }
+
+
+def series_etag(query_string):
+    """ETag of the series for `query_string` as of now."""
+    version = read_version(STATS_VERSION_NAME)
+    key = f"{version}:{timezone.localdate()}:{query_string}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def series_last_modified():
+    """Last bump of the statistics version, or the start of today if that's later."""
+    midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    version = read_version(STATS_VERSION_NAME)
+    if not version:
+        return midnight
+    bumped = datetime.fromtimestamp(version[1] / 1e9, tz=dt_timezone.utc)
+    return max(bumped, midnight)
@@ -11,13 +11,22 @@ urlpatterns = [
     # ML Model Management
     path('models/', views.model_list, name='model_list'),
     path('models/upload/', views.model_upload, name='model_upload'),
+    path('models/compare/', views.model_compare, name='model_compare'),
     path('models/<int:model_id>/', views.model_detail, name='model_detail'),
     path('models/<int:model_id>/activate/', views.model_activate, name='model_activate'),
     path('models/<int:model_id>/test/', views.model_test, name='model_test'),
+    path('models/<int:model_id>/drift/', views.model_drift, name='model_drift'),
+    # Queued model tests
+    path('jobs/<int:job_id>/', views.evaluation_job, name='evaluation_job'),
+    path('jobs/<int:job_id>/progress/', views.evaluation_job_progress, name='evaluation_job_progress'),
+    path('jobs/<int:job_id>/cancel/', views.evaluation_job_cancel, name='evaluation_job_cancel'),
     # Model Testing Results
+    path('results/', views.test_results_browse, name='test_results_browse'),
+    path('results/rows/', views.test_results_rows, name='test_results_rows'),
     path('download-results/', views.download_test_results, name='download_test_results'),
     # Valuation History
     path('valuations/', views.valuation_list, name='valuation_list'),
     # Statistics & Analytics
     path('statistics/', views.statistics, name='statistics'),
+    path('statistics/timeseries/', views.valuation_timeseries, name='valuation_timeseries'),
 ]
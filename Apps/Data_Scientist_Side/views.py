@@ -1,24 +1,41 @@
 import os
-import io
 import pandas as pd
-import joblib
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponseForbidden, HttpResponse
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
 from django.conf import settings
 from django.utils import timezone
 from django.db import models
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
 from django.core.paginator import Paginator
 from Apps.Normal_User_Side.forms import UserForm
-from Apps.core.models import MLModel, Setting, Valuation, Project
-from .forms import MLModelUploadForm, ModelTestForm
+from Apps.Normal_User_Side.ml.compiled import write_artifact, artifact_report
+from Apps.Normal_User_Side.ml.model_loader import load_ml_model
+from Apps.core.models import MLModel, ModelDailyStats, Setting, Valuation, Project, EvaluationJob
+from .forms import MLModelUploadForm, ModelTestForm, ModelCompareForm, ReferenceSnapshotForm
+from .comparison import compare_models, load_dataset
+from .jobs import enqueue_evaluation, enqueue_profile, job_progress, queue_profile, request_cancel
+from .dataset_cache import open_dataset
+from .analysis import analyze_run
+from .drift import drift_report, snapshot_reference_file
+from .overview import statistics_overview
+from .page_cache import page_cache
+from .timeseries import (
+    TimeSeriesError, parse_query, series_etag, series_last_modified, valuation_series
+)
+from .profiling import activation_problems, budget_violations
+from .evaluation import EvaluationError, evaluate_prepared, result_display_rows
+from .result_store import (
+    ResultReader, ResultWriter, SORT_DIRECTIONS, SORT_KEYS, collect_garbage, new_run_id, run_exists
+)
+from .preprocessing import USER_FILE_COLUMNS
 from datetime import timedelta
 from django.utils import timezone
 from collections import defaultdict
 import json
-from sklearn.metrics import mean_absolute_error, r2_score
 
 
 def scientist_required(view_func):
@@ -36,15 +53,27 @@ def scientist_required(view_func):
 @scientist_required
 def dashboard(request):
     """Data Scientist dashboard view."""
+    setting = Setting.objects.select_related('active_ml_model').first()
+    active_model = setting.active_ml_model if setting else None
+    
+    # Same for every scientist until valuations/models are written (page_cache.py)
+    payload, cache_status = page_cache.get_or_compute(
+        'dashboard', active_model.id if active_model else 'none', _dashboard_payload
+    )
+    
+    context = {
+        'user': request.user,
+        'active_model': active_model,
+        **payload,
+        **_page_cache_debug(cache_status),
+    }
+    return render(request, 'Data_Scientist_Side/dashboard.html', context)
+
+
+def _dashboard_payload():
+    """Model and valuation figures of the dashboard (cacheable: plain values and model instances)."""
     # Get model statistics
     total_models = MLModel.objects.filter(deleted_at__isnull=True).count()
-    active_model = None
-    try:
-        setting = Setting.objects.first()
-        if setting:
-            active_model = setting.active_ml_model
-    except Setting.DoesNotExist:
-        pass
     
     # Get valuation statistics
     total_valuations = Valuation.objects.filter(deleted_at__isnull=True).count()
@@ -59,15 +88,19 @@ def dashboard(request):
         valuation_count=Count('valuation', filter=models.Q(valuation__deleted_at__isnull=True))
     ).order_by('-valuation_count')[:5]
     
-    context = {
-        'user': request.user,
+    return {
         'total_models': total_models,
-        'active_model': active_model,
         'total_valuations': total_valuations,
-        'recent_valuations': recent_valuations,
-        'models_with_stats': models_with_stats,
+        'recent_valuations': list(recent_valuations),
+        'models_with_stats': list(models_with_stats),
     }
-    return render(request, 'Data_Scientist_Side/dashboard.html', context)
+
+
+def _page_cache_debug(status):
+    """Page cache outcome and counters for the debug footer (DEBUG only)."""
+    if not settings.DEBUG:
+        return {}
+    return {'page_cache': {'status': status, **page_cache.stats()}}
 
 
 @login_required(login_url='users:login')
@@ -154,6 +187,30 @@ def model_upload(request):
             model.save()
             
             messages.success(request, f'Model "{model.name}" v{model.version} uploaded successfully!')
+            
+            # Pickle-free artifact that model_loader prefers over the .pkl
+            try:
+                report = write_artifact(file_path)
+            except Exception as e:
+                report = None
+                messages.warning(request, f'Could not read the model file: {str(e)}')
+            else:
+                if report:
+                    messages.info(request, format_artifact_report(report))
+                else:
+                    messages.info(request, 'Model is not a supported pipeline; it will be served from the pickle.')
+            
+            # Loaded and timed by a job worker; activation checks the outcome
+            enqueue_profile(model, request.user)
+            messages.info(request, 'Load check queued; the model can be activated once it passes.')
+            
+            # Reference distribution the drift page compares live traffic with
+            try:
+                rows = snapshot_reference_file(model, form.cleaned_data.get('reference_file'))
+            except (EvaluationError, ValueError) as e:
+                messages.warning(request, f"No drift reference taken: {e}")
+            else:
+                messages.info(request, f"Drift reference taken from {rows:,} rows.")
             return redirect('data_scientist:model_list')
     else:
         form = MLModelUploadForm()
@@ -162,12 +219,35 @@ def model_upload(request):
     return render(request, 'Data_Scientist_Side/model_upload.html', context)
 
 
+def format_artifact_report(report):
+    """One-line summary of a compiled artifact vs. its pickle."""
+    return (
+        f"Compact artifact: {report['artifact_bytes'] / 1024:.1f} KB, "
+        f"loads in {report['artifact_load_ms']:.2f} ms "
+        f"(pickle: {report['pickle_bytes'] / 1024:.1f} KB, {report['pickle_load_ms']:.2f} ms)."
+    )
+
+
 @login_required(login_url='users:login')
 @scientist_required
 def model_activate(request, model_id):
     """Set a model as the active model for predictions."""
     model = get_object_or_404(MLModel, pk=model_id, deleted_at__isnull=True)
     
+    # The load check runs in the job worker; the model detail page shows its outcome
+    if model.profile_status == MLModel.ProfileStatus.PENDING:
+        queue_profile(model, request.user)
+        messages.info(
+            request, f'The load check of "{model.name}" v{model.version} is pending; activate it once it has passed.'
+        )
+        return redirect('data_scientist:model_detail', model_id=model.id)
+    
+    # Models that failed the load check or are over the latency budgets stay inactive
+    problems = activation_problems(model)
+    if problems:
+        messages.error(request, f'Model "{model.name}" v{model.version} can\'t be activated: {"; ".join(problems)}.')
+        return redirect('data_scientist:model_detail', model_id=model.id)
+    
     # Get or create settings
     setting, created = Setting.objects.get_or_create(pk=1)
     setting.active_ml_model = model
@@ -200,15 +280,49 @@ def model_detail(request, model_id):
         model=model, deleted_at__isnull=True
     ).select_related('project', 'created_by').order_by('-created_at')[:10]
     
+    artifact = artifact_report(os.path.join(settings.MEDIA_ROOT, model.model_file_path))
+    
     context = {
         'model': model,
         'is_active': is_active,
+        'artifact': artifact,
+        'budget_violations': budget_violations(model),
         'valuation_count': valuation_count,
         'recent_valuations': recent_valuations,
     }
     return render(request, 'Data_Scientist_Side/model_detail.html', context)
 
 
+@login_required(login_url='users:login')
+@scientist_required
+def model_drift(request, model_id):
+    """Drift of a model's live inputs against its reference data."""
+    model_obj = get_object_or_404(MLModel, pk=model_id, deleted_at__isnull=True)
+    if request.method == 'POST':
+        form = ReferenceSnapshotForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = snapshot_reference_file(model_obj, form.cleaned_data['reference_file'])
+            except (EvaluationError, ValueError) as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f"Drift reference retaken from {rows:,} rows; live counts restart.")
+            return redirect('data_scientist:model_drift', model_id=model_id)
+    else:
+        form = ReferenceSnapshotForm()
+    
+    report = drift_report(model_obj)
+    context = {
+        'model': model_obj,
+        'report': report,
+        'form': form,
+        'live_total': max((entry['live_total'] for entry in report), default=0),
+        'psi_warn': getattr(settings, 'DRIFT_PSI_WARN', None),
+        'psi_alert': getattr(settings, 'DRIFT_PSI_ALERT', None),
+    }
+    return render(request, 'Data_Scientist_Side/model_drift.html', context)
+
+
 @login_required(login_url='users:login')
 @scientist_required
 def valuation_list(request):
@@ -252,65 +366,48 @@ def statistics(request):
     """Comprehensive statistics dashboard for Data Scientists."""
     
     # ─── Get Active Model ───
-    active_model = None
-    try:
-        setting = Setting.objects.first()
-        if setting:
-            active_model = setting.active_ml_model
-    except Setting.DoesNotExist:
-        pass
+    setting = Setting.objects.select_related('active_ml_model').first()
+    active_model = setting.active_ml_model if setting else None
+    
+    # Computed once per active model and day until valuations/models are written
+    today = timezone.now().date()
+    scope = f"{active_model.id if active_model else 'none'}:{today}"
+    payload, cache_status = page_cache.get_or_compute(
+        'statistics', scope, lambda: _statistics_payload(active_model, today)
+    )
     
+    context = {
+        # Active Model Info
+        'active_model': active_model,
+        **payload,
+        **_page_cache_debug(cache_status),
+    }
+    return render(request, 'Data_Scientist_Side/statistics.html', context)
+
+
+def _statistics_payload(active_model, today):
+    """Everything the statistics page shows for `active_model` (all models if None)."""
     # ─── Overview Statistics (filtered by active model) ───
-    total_models = MLModel.objects.filter(deleted_at__isnull=True).count()
-    total_projects = Project.objects.filter(deleted_at__isnull=True).count()
+    # Totals, feedback and accuracy in one aggregate over the daily rollup
+    overview = statistics_overview(active_model)
     
-    # Base queryset filtered by active model
+    # Base querysets filtered by active model
     if active_model:
         base_valuations = Valuation.objects.filter(deleted_at__isnull=True, model=active_model)
+        base_stats = ModelDailyStats.objects.filter(model=active_model)
     else:
         base_valuations = Valuation.objects.filter(deleted_at__isnull=True)
-    
-    total_valuations = base_valuations.count()
-    
-    # Valuations with feedback (user_expected_price provided)
-    valuations_with_feedback = base_valuations.filter(
-        user_expected_price__isnull=False
-    ).count()
-    feedback_rate = round((valuations_with_feedback / total_valuations * 100), 1) if total_valuations > 0 else 0
-    
-    # ─── Model Accuracy Metrics (filtered by active model) ───
-    # Get valuations where we have both predicted and expected prices
-    feedback_valuations = base_valuations.filter(
-        user_expected_price__isnull=False
-    ).values('predicted_price_per_m2', 'user_expected_price')
-    
-    # Calculate Mean Absolute Error and Average Deviation
-    total_error = 0
-    total_deviation_percent = 0
-    feedback_count = len(feedback_valuations)
-    
-    for v in feedback_valuations:
-        predicted = float(v['predicted_price_per_m2'])
-        expected = float(v['user_expected_price'])
-        error = abs(predicted - expected)
-        total_error += error
-        if expected > 0:
-            total_deviation_percent += (error / expected) * 100
-    
-    mae = round(total_error / feedback_count, 2) if feedback_count > 0 else 0
-    avg_deviation = round(total_deviation_percent / feedback_count, 1) if feedback_count > 0 else 0
-    accuracy_score = max(0, round(100 - avg_deviation, 1)) if feedback_count > 0 else None
+        base_stats = ModelDailyStats.objects.all()
     
     # ─── Valuations Over Time (Last 30 Days, filtered by active model) ───
-    today = timezone.now().date()
     thirty_days_ago = today - timedelta(days=30)
     
-    daily_valuations = base_valuations.filter(
-        created_at__date__gte=thirty_days_ago
-    ).values('created_at__date').annotate(count=Count('id')).order_by('created_at__date')
+    daily_valuations = base_stats.filter(
+        day__gte=thirty_days_ago
+    ).values('day').annotate(count=Sum('valuation_count')).order_by('day')
     
     # Build complete date range with zeros for missing days
-    date_counts = {str(item['created_at__date']): item['count'] for item in daily_valuations}
+    date_counts = {str(item['day']): item['count'] for item in daily_valuations}
     chart_dates = []
     chart_counts = []
     for i in range(31):  # Include today (30 days ago through today = 31 days)
@@ -331,12 +428,8 @@ def statistics(request):
     
     # ─── Model Performance Comparison ───
     model_stats = MLModel.objects.filter(deleted_at__isnull=True).annotate(
-        valuation_count=Count('valuation', filter=Q(valuation__deleted_at__isnull=True)),
-        feedback_count=Count('valuation', filter=Q(
-            valuation__deleted_at__isnull=True,
-            valuation__user_expected_price__isnull=False
-        )),
-        avg_predicted=Avg('valuation__predicted_price_per_m2', filter=Q(valuation__deleted_at__isnull=True))
+        valuation_count=Coalesce(Sum('modeldailystats__valuation_count'), 0),
+        feedback_count=Coalesce(Sum('modeldailystats__feedback_count'), 0),
     ).order_by('-valuation_count')
     
     model_names = []
@@ -372,22 +465,9 @@ def statistics(request):
         user_expected_price__isnull=False
     ).select_related('project', 'model', 'created_by').order_by('-created_at')[:10]
     
-    context = {
-        # Active Model Info
-        'active_model': active_model,
-        
-        # Overview Stats
-        'total_valuations': total_valuations,
-        'total_models': total_models,
-        'total_projects': total_projects,
-        'valuations_with_feedback': valuations_with_feedback,
-        'feedback_rate': feedback_rate,
-        
-        # Accuracy Metrics
-        'mae': mae,
-        'avg_deviation': avg_deviation,
-        'accuracy_score': accuracy_score,
-        'feedback_count': feedback_count,
+    return {
+        # Overview Stats and Accuracy Metrics
+        **overview,
         
         # Chart Data (JSON for JavaScript)
         'chart_dates_json': json.dumps(chart_dates),
@@ -402,137 +482,31 @@ def statistics(request):
         'expected_values_json': json.dumps(expected_values),
         
         # Recent feedback for table
-        'recent_feedback': recent_feedback,
+        'recent_feedback': list(recent_feedback),
     }
-    return render(request, 'Data_Scientist_Side/statistics.html', context)
-
 
-# ============================================
-# Model Testing Views
-# ============================================
 
-# Mapping from user-friendly slope values to ML model format
-SLOPE_MAPPING = {
-    'Flat (0-5%)': 'FLAT',
-    'FLAT': 'FLAT',
-    'Mild (5-15%)': 'MILD',
-    'MILD': 'MILD',
-    'Moderate (15-30%)': 'MODERATE',
-    'MODERATE': 'MODERATE',
-    'Steep (>30%)': 'STEEP',
-    'STEEP': 'STEEP',
-}
-
-# View quality mapping (handle typos like FANTACTIC)
-VIEW_QUALITY_MAPPING = {
-    'BAD': 'BAD',
-    'GOOD': 'GOOD',
-    'FANTASTIC': 'FANTASTIC',
-    'FANTACTIC': 'FANTASTIC',  # Common typo
-}
-
-# Required columns for ML model (must match predict.py)
-REQUIRED_ML_COLUMNS = [
-    'Area', 'Neighborhood', 'political_classification', 'parcel_shape',
-    'road_status1', 'road_status2', 'road_status3', 'slope', 'view_quality',
-    'electricity', 'Sewage', 'area_m2', 'parcel_frontage (m)',
-    'width_m', 'width_m.1', 'width_m.2',
-    'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
-    'land_use_industrial', 'hospitals_facility', 'schools_facility',
-    'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
-    'NOISY_FACILITIES', 'ANIMAL_FARMS', 'water',
-]
-TARGET_COLUMN = 'actual_price_per_m2'
-
-# Columns in user's file format
-USER_FILE_COLUMNS = [
-    'Area', 'Neighborhood', 'political_classification', 'slope', 'view_quality',
-    'area_m2', 'parcel_frontage (m)', 'parcel_shape', 'electricity', 'water', 'Sewage',
-    'road_status1', 'road_status2', 'road_status3',
-    'land_use_residential', 'land_use_commercial', 'land_use_agricultural', 'land_use_industrial',
-    'hospitals_facility', 'schools_facility', 'police_facility', 'municipality_facility',
-    'FACTORIES_NEARBY', 'NOISY_FACILITIES', 'ANIMAL_FARMS',
-    'actual_price_per_m2'
-]
-
-
-def preprocess_test_data(df):
+@login_required(login_url='users:login')
+@scientist_required
+@condition(
+    etag_func=lambda request: series_etag(request.GET.urlencode()),
+    last_modified_func=lambda request: series_last_modified(),
+)
+def valuation_timeseries(request):
     """
-    Transform user's CSV/Excel data to match ML model's expected format.
-    Handles column renaming, value mappings, and data type conversions.
+    JSON valuation counts and error metrics per model over ?start=&end=
+    (YYYY-MM-DD), bucketed by ?bucket=day|week|month; ?model= narrows it.
     """
-    result = pd.DataFrame()
-    
-    # Copy location columns directly
-    result['Area'] = df['Area']
-    result['Neighborhood'] = df['Neighborhood']
-    result['political_classification'] = df['political_classification']
-    result['parcel_shape'] = df['parcel_shape']
-    
-    # Handle road statuses - convert FALSE to proper ML format
-    for i, col_name in enumerate(['road_status1', 'road_status2', 'road_status3']):
-        if col_name in df.columns:
-            result[col_name] = df[col_name].fillna('FALSE').replace('', 'FALSE')
-        else:
-            result[col_name] = 'FALSE'
-    
-    # Map slope values to ML format
-    if 'slope' in df.columns:
-        result['slope'] = df['slope'].map(lambda x: SLOPE_MAPPING.get(str(x).strip(), 'FLAT'))
-    else:
-        result['slope'] = 'FLAT'
-    
-    # Map view_quality values (handle typos)
-    if 'view_quality' in df.columns:
-        result['view_quality'] = df['view_quality'].map(
-            lambda x: VIEW_QUALITY_MAPPING.get(str(x).strip().upper(), 'GOOD')
-        )
-    else:
-        result['view_quality'] = 'GOOD'
-    
-    # Copy electricity and Sewage
-    result['electricity'] = df['electricity'] if 'electricity' in df.columns else 'NO'
-    result['Sewage'] = df['Sewage'] if 'Sewage' in df.columns else 'NO'
-    
-    # Numeric columns
-    result['area_m2'] = pd.to_numeric(df['area_m2'], errors='coerce').fillna(0)
-    
-    if 'parcel_frontage (m)' in df.columns:
-        result['parcel_frontage (m)'] = pd.to_numeric(df['parcel_frontage (m)'], errors='coerce').fillna(0)
-    else:
-        result['parcel_frontage (m)'] = 0
-    
-    # Handle width_m columns - user file may have multiple columns with same name
-    # or may have them as width_m, width_m, width_m (which pandas renames to width_m, width_m.1, width_m.2)
-    width_cols = [c for c in df.columns if c.startswith('width_m')]
-    for i, ml_col in enumerate(['width_m', 'width_m.1', 'width_m.2']):
-        if i < len(width_cols):
-            result[ml_col] = pd.to_numeric(df[width_cols[i]], errors='coerce').fillna(0)
-        else:
-            result[ml_col] = 0
-    
-    # Binary columns - convert TRUE/FALSE strings to 1/0
-    binary_columns = [
-        'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
-        'land_use_industrial', 'hospitals_facility', 'schools_facility',
-        'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
-        'NOISY_FACILITIES', 'ANIMAL_FARMS'
-    ]
-    
-    for col in binary_columns:
-        if col in df.columns:
-            result[col] = df[col].map(lambda x: 1 if str(x).upper() in ['TRUE', '1', 'YES'] else 0)
-        else:
-            result[col] = 0
-    
-    # Water - convert YES/NO to 1/0 for ML
-    if 'water' in df.columns:
-        result['water'] = df['water'].map(lambda x: 1 if str(x).upper() == 'YES' else 0)
-    else:
-        result['water'] = 0
-    
-    return result
+    try:
+        start, end, bucket, model_ids = parse_query(request.GET, timezone.localdate())
+    except TimeSeriesError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(valuation_series(start, end, bucket, model_ids))
+
 
+# ============================================
+# Model Testing Views
+# ============================================
 
 @login_required(login_url='users:login')
 @scientist_required
@@ -543,145 +517,56 @@ def model_test(request, model_id):
     if request.method == 'POST':
         form = ModelTestForm(request.POST, request.FILES)
         if form.is_valid():
-            uploaded_file = request.FILES['test_file']
+            uploaded_file = form.cleaned_data['test_file']
+            dataset_key = form.cleaned_data['dataset']
+            
+            # Load the specific model
+            model_path = os.path.join(settings.MEDIA_ROOT, model_obj.model_file_path)
+            if not os.path.exists(model_path):
+                messages.error(request, "Model file not found on server.")
+                return redirect('data_scientist:model_detail', model_id=model_id)
+            
+            # Large files are evaluated by a `manage.py run_jobs` worker;
+            # cached datasets skip parsing, so they always run here
+            if uploaded_file and uploaded_file.size > settings.MODEL_TEST_SYNC_MAX_BYTES:
+                job = enqueue_evaluation(model_obj, uploaded_file, request.user)
+                messages.info(request, "Your test file is queued for evaluation.")
+                return redirect('data_scientist:evaluation_job', job_id=job.id)
+            
+            # Drop result runs past their TTL
+            collect_garbage()
+            run_id = new_run_id()
             
             try:
-                # Read the file based on extension
-                file_ext = uploaded_file.name.split('.')[-1].lower()
-                
-                if file_ext == 'csv':
-                    # Try to detect delimiter (comma or semicolon)
-                    content = uploaded_file.read().decode('utf-8')
-                    uploaded_file.seek(0)  # Reset file pointer
-                    
-                    # Count occurrences of potential delimiters in first line
-                    first_line = content.split('\n')[0]
-                    semicolon_count = first_line.count(';')
-                    comma_count = first_line.count(',')
-                    
-                    delimiter = ';' if semicolon_count > comma_count else ','
-                    df = pd.read_csv(io.StringIO(content), delimiter=delimiter)
-                else:
-                    df = pd.read_excel(uploaded_file)
+                # Shared model cache: only unpickles if not already resident
+                ml_model = load_ml_model(model_obj).predictor
                 
-                # Check for empty dataframe
-                if df.empty:
-                    messages.error(request, "The uploaded file is empty.")
-                    return render(request, 'Data_Scientist_Side/model_test.html', {
-                        'form': form,
-                        'model': model_obj,
-                        'user_columns': USER_FILE_COLUMNS,
-                    })
-                
-                # Check for target column
-                if TARGET_COLUMN not in df.columns:
-                    messages.error(
-                        request,
-                        f"Missing target column: '{TARGET_COLUMN}'. This column is required for evaluation."
-                    )
-                    return render(request, 'Data_Scientist_Side/model_test.html', {
-                        'form': form,
-                        'model': model_obj,
-                        'user_columns': USER_FILE_COLUMNS,
-                    })
-                
-                # Check for minimum required columns
-                required_base = ['Area', 'Neighborhood', 'area_m2']
-                missing = [c for c in required_base if c not in df.columns]
-                if missing:
-                    messages.error(
-                        request,
-                        f"Missing required columns: {', '.join(missing)}"
+                # Parse (or replay from the dataset cache), predict and score chunk by chunk
+                with ResultWriter(run_id) as results_writer:
+                    metrics, display_results = evaluate_prepared(
+                        open_dataset(uploaded_file, dataset_key), ml_model, results_writer
                     )
-                    return render(request, 'Data_Scientist_Side/model_test.html', {
-                        'form': form,
-                        'model': model_obj,
-                        'user_columns': USER_FILE_COLUMNS,
-                    })
                 
-                # Extract actual prices before preprocessing
-                y_actual = pd.to_numeric(df[TARGET_COLUMN], errors='coerce').fillna(0).values
-                
-                # Preprocess data to match ML model format
-                try:
-                    X = preprocess_test_data(df)
-                except Exception as prep_error:
-                    messages.error(
-                        request,
-                        f"Data preprocessing error: {str(prep_error)}"
-                    )
-                    return render(request, 'Data_Scientist_Side/model_test.html', {
-                        'form': form,
-                        'model': model_obj,
-                        'user_columns': USER_FILE_COLUMNS,
-                    })
+                # Confidence intervals and per-segment errors, from the stored run
+                analysis = analyze_run(run_id)
                 
-                # Load the specific model
-                model_path = os.path.join(settings.MEDIA_ROOT, model_obj.model_file_path)
-                if not os.path.exists(model_path):
-                    messages.error(request, "Model file not found on server.")
-                    return redirect('data_scientist:model_detail', model_id=model_id)
-                
-                ml_model = joblib.load(model_path)
-                
-                # Ensure columns are in correct order for model
-                X = X[REQUIRED_ML_COLUMNS]
-                
-                # Run batch predictions
-                try:
-                    y_predicted = ml_model.predict(X)
-                except Exception as pred_error:
-                    messages.error(
-                        request,
-                        f"Prediction error: {str(pred_error)}. Please check your data format."
-                    )
-                    return render(request, 'Data_Scientist_Side/model_test.html', {
-                        'form': form,
-                        'model': model_obj,
-                        'user_columns': USER_FILE_COLUMNS,
-                    })
-                
-                # Calculate metrics
-                mae = mean_absolute_error(y_actual, y_predicted)
-                r2 = r2_score(y_actual, y_predicted)
-                
-                # Build results DataFrame
-                results_df = df.copy()
-                results_df['predicted_price_per_m2'] = y_predicted
-                results_df['deviation'] = y_predicted - y_actual
-                results_df['deviation_percent'] = ((y_predicted - y_actual) / y_actual * 100).round(2)
-                
-                # Store results in session for download
-                request.session['test_results'] = results_df.to_json()
+                # Full results stay in the result store; the session only holds the run id
+                request.session['test_run_id'] = run_id
                 request.session['test_model_id'] = model_id
                 request.session['test_model_name'] = f"{model_obj.name} v{model_obj.version}"
                 
-                # Prepare display data (limit to first 100 rows for display)
-                display_results = []
-                for idx, row in results_df.head(100).iterrows():
-                    display_results.append({
-                        'row_num': idx + 1,
-                        'area': row.get('Area', 'N/A'),
-                        'neighborhood': row.get('Neighborhood', 'N/A'),
-                        'area_m2': row.get('area_m2', 0),
-                        'actual': round(float(row[TARGET_COLUMN]), 2),
-                        'predicted': round(float(row['predicted_price_per_m2']), 2),
-                        'deviation': round(float(row['deviation']), 2),
-                        'deviation_percent': round(float(row['deviation_percent']), 1),
-                    })
-                
                 context = {
                     'model': model_obj,
-                    'mae': round(mae, 2),
-                    'r2': round(r2, 4),
-                    'r2_percent': round(r2 * 100, 1),
-                    'sample_count': len(df),
-                    'display_count': min(100, len(df)),
+                    **metrics.summary(),
+                    **analysis,
+                    'display_count': len(display_results),
                     'results': display_results,
-                    'has_more': len(df) > 100,
+                    'has_more': metrics.count > len(display_results),
                 }
                 return render(request, 'Data_Scientist_Side/model_test_results.html', context)
                 
+            except EvaluationError as e:
+                messages.error(request, str(e))
             except pd.errors.EmptyDataError:
                 messages.error(request, "The uploaded file is empty or corrupted.")
             except pd.errors.ParserError:
@@ -695,30 +580,193 @@ def model_test(request, model_id):
         'form': form,
         'model': model_obj,
         'user_columns': USER_FILE_COLUMNS,
+        'max_upload_bytes': settings.MODEL_TEST_MAX_UPLOAD_BYTES,
     }
     return render(request, 'Data_Scientist_Side/model_test.html', context)
 
 
+@login_required(login_url='users:login')
+@scientist_required
+def model_compare(request):
+    """Evaluate several ML models side by side on one uploaded dataset."""
+    if request.method == 'POST':
+        form = ModelCompareForm(request.POST, request.FILES)
+        if form.is_valid():
+            ml_models = list(form.cleaned_data['models'])
+            missing = [
+                m for m in ml_models
+                if not os.path.exists(os.path.join(settings.MEDIA_ROOT, m.model_file_path))
+            ]
+            if missing:
+                messages.error(request, f"Model file not found on server: {', '.join(m.name for m in missing)}")
+                return redirect('data_scientist:model_compare')
+            
+            try:
+                # Parsed and preprocessed once (or replayed from the dataset cache),
+                # then predicted by every model
+                prepared = open_dataset(form.cleaned_data['test_file'], form.cleaned_data['dataset'])
+                dataset = load_dataset(prepared)
+                context = compare_models(ml_models, dataset)
+                return render(request, 'Data_Scientist_Side/model_compare_results.html', context)
+                
+            except EvaluationError as e:
+                messages.error(request, str(e))
+            except pd.errors.EmptyDataError:
+                messages.error(request, "The uploaded file is empty or corrupted.")
+            except pd.errors.ParserError:
+                messages.error(request, "Could not parse the file. Please check the format.")
+            except Exception as e:
+                messages.error(request, f"Error processing file: {str(e)}")
+    else:
+        form = ModelCompareForm()
+    
+    context = {
+        'form': form,
+        'user_columns': USER_FILE_COLUMNS,
+        'max_upload_bytes': settings.MODEL_COMPARE_MAX_BYTES,
+    }
+    return render(request, 'Data_Scientist_Side/model_compare.html', context)
+
+
+@login_required(login_url='users:login')
+@scientist_required
+def evaluation_job(request, job_id):
+    """Progress page of a queued model test; shows the results once it's done."""
+    job = get_object_or_404(
+        EvaluationJob.objects.select_related('model'),
+        pk=job_id, created_by=request.user, kind=EvaluationJob.Kind.EVALUATE,
+    )
+    
+    if job.status == EvaluationJob.Status.SUCCEEDED:
+        request.session['test_run_id'] = job.results_token
+        request.session['test_model_id'] = job.model_id
+        request.session['test_model_name'] = f"{job.model.name} v{job.model.version}"
+        context = {
+            'model': job.model,
+            **job.metrics,
+            **job.result,
+        }
+        return render(request, 'Data_Scientist_Side/model_test_results.html', context)
+    
+    context = {
+        'job': job,
+        'model': job.model,
+        'progress': job_progress(job),
+    }
+    return render(request, 'Data_Scientist_Side/model_test_job.html', context)
+
+
+@login_required(login_url='users:login')
+@scientist_required
+def evaluation_job_progress(request, job_id):
+    """JSON progress of a queued model test, polled by the progress page."""
+    job = get_object_or_404(EvaluationJob, pk=job_id, created_by=request.user, kind=EvaluationJob.Kind.EVALUATE)
+    return JsonResponse(job_progress(job))
+
+
+@login_required(login_url='users:login')
+@scientist_required
+@require_POST
+def evaluation_job_cancel(request, job_id):
+    """Cancel a queued or running model test."""
+    job = get_object_or_404(EvaluationJob, pk=job_id, created_by=request.user, kind=EvaluationJob.Kind.EVALUATE)
+    request_cancel(job)
+    return JsonResponse(job_progress(job))
+
+
+RESULTS_PAGE_SIZE = 50
+RESULTS_MAX_PAGE_SIZE = 500
+# Query parameter -> result column usable as an equality filter
+RESULTS_FILTERS = {'area': 'Area', 'neighborhood': 'Neighborhood'}
+
+
+def _results_page(request, run_id):
+    """One page of a stored test run, sorted and filtered from the query string."""
+    reader = ResultReader(run_id)
+    sort = request.GET.get('sort')
+    sort = sort if sort in SORT_KEYS else 'abs_deviation'
+    direction = request.GET.get('direction')
+    if direction not in SORT_DIRECTIONS:
+        # Worst errors first, but rows in file order
+        direction = 'asc' if sort == 'row' else 'desc'
+    filters = {
+        column: request.GET[param] for param, column in RESULTS_FILTERS.items() if request.GET.get(param)
+    }
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        after = None
+    try:
+        limit = min(max(int(request.GET.get('limit', RESULTS_PAGE_SIZE)), 1), RESULTS_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = RESULTS_PAGE_SIZE
+
+    rows, has_next = reader.page(sort, direction, filters, after, limit)
+    return {
+        'sort': sort,
+        'direction': direction,
+        'filters': {param: request.GET.get(param, '') for param in RESULTS_FILTERS},
+        'limit': limit,
+        'total_rows': reader.rows,
+        'results': result_display_rows(reader.take(rows)),
+        'next_after': rows[-1] if has_next else None,
+        'choices': {param: sorted(reader.vocabulary(column)) for param, column in RESULTS_FILTERS.items()},
+    }
+
+
+@login_required(login_url='users:login')
+@scientist_required
+def test_results_browse(request):
+    """Browse the full results of the last model test, sorted by error."""
+    run_id = request.session.get('test_run_id')
+    if not run_exists(run_id):
+        messages.error(request, "No test results available. Please run a test first.")
+        return redirect('data_scientist:model_list')
+
+    page = _results_page(request, run_id)
+    query = request.GET.copy()
+    query.pop('after', None)
+    if page['next_after'] is not None:
+        query['after'] = page['next_after']
+    context = {
+        **page,
+        'model_name': request.session.get('test_model_name', ''),
+        'model_id': request.session.get('test_model_id'),
+        'sort_keys': list(SORT_KEYS),
+        'next_query': query.urlencode() if page['next_after'] is not None else None,
+        'is_first_page': 'after' not in request.GET,
+    }
+    return render(request, 'Data_Scientist_Side/model_test_results_browse.html', context)
+
+
+@login_required(login_url='users:login')
+@scientist_required
+def test_results_rows(request):
+    """JSON page of the last model test's results (same parameters as the browse page)."""
+    run_id = request.session.get('test_run_id')
+    if not run_exists(run_id):
+        return JsonResponse({'error': 'No test results available.'}, status=404)
+
+    page = _results_page(request, run_id)
+    page.pop('choices')
+    return JsonResponse(page)
+
+
 @login_required(login_url='users:login')
 @scientist_required
 def download_test_results(request):
-    """Download the test results as CSV."""
-    results_json = request.session.get('test_results')
+    """Download the test results as CSV, encoded from the result store chunk by chunk."""
+    run_id = request.session.get('test_run_id')
     model_name = request.session.get('test_model_name', 'model')
     
-    if not results_json:
+    if not run_exists(run_id):
         messages.error(request, "No test results available. Please run a test first.")
         return redirect('data_scientist:model_list')
     
     try:
-        df = pd.read_json(results_json)
-        
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
         filename = f"test_results_{model_name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        response = StreamingHttpResponse(ResultReader(run_id).iter_csv(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        df.to_csv(response, index=False)
         return response
         
     except Exception as e:
@@ -0,0 +1,445 @@
+"""
+Compiled (pure NumPy) inference for fitted land price pipelines.
+
+The uploaded models are sklearn pipelines of the form:
+
+    Pipeline([
+        ('preprocessor', ColumnTransformer([
+            ('num', StandardScaler(), [...]),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), [...]),
+            ('bin', 'passthrough', [...]),
+        ])),
+        ('regressor', DecisionTreeRegressor(...)),
+    ])
+
+compile_model() lowers such a pipeline into flat NumPy arrays (scaler
+offsets/scales, one-hot vocabularies and the tree node arrays) so a
+prediction is a short walk over those arrays instead of a pandas/sklearn
+round trip. A missing (NaN) value goes to the side the tree recorded in
+missing_go_to_left at each split, as in sklearn. Anything it cannot lower returns None and callers keep using
+the sklearn model.
+
+write_artifact() runs at upload time and stores the compiled arrays next to
+the .pkl as a pickle-free artifact, so loading a model is a handful of
+array reads that don't depend on the installed sklearn version.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+# Kinds of encoded features the tree can split on
+AFFINE = 0      # (x - offset) / scale  (StandardScaler and passthrough)
+ONE_HOT = 1     # 1.0 if category == code else 0.0
+
+TREE_LEAF = -1
+
+# On-disk layout of a compiled model: one .npy per array (so each can be
+# memory-mapped) plus schema.json for column names and vocabularies.
+SIDECAR_SUFFIX = ".compiled"
+SCHEMA_FILENAME = "schema.json"
+REPORT_FILENAME = "report.json"
+# 2: missing_go_to_left added; older artifacts count as stale
+FORMAT_VERSION = 2
+ARRAY_NAMES = [
+    'feature_kind', 'feature_column', 'feature_offset', 'feature_scale', 'feature_code',
+    'children_left', 'children_right', 'feature', 'threshold', 'missing_go_to_left', 'value',
+]
+
+
+class CompiledPipeline:
+    """
+    Flat-array equivalent of a fitted ColumnTransformer + DecisionTreeRegressor.
+
+    Every encoded feature f (the columns the tree sees) is described by:
+        feature_kind[f]    AFFINE or ONE_HOT
+        feature_column[f]  index into numeric_columns / categorical_columns
+        feature_offset[f]  scaler mean (0 for passthrough)
+        feature_scale[f]   scaler scale (1 for passthrough)
+        feature_code[f]    category index inside vocabularies[column]
+    """
+
+    def __init__(self, numeric_columns, categorical_columns, vocabularies,
+                 feature_kind, feature_column, feature_offset, feature_scale, feature_code,
+                 children_left, children_right, feature, threshold, missing_go_to_left, value):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.vocabularies = [np.asarray(v, dtype=object) for v in vocabularies]
+
+        self.feature_kind = feature_kind
+        self.feature_column = feature_column
+        self.feature_offset = feature_offset
+        self.feature_scale = feature_scale
+        self.feature_code = feature_code
+
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+
+        # Category -> code lookups for the single-row path
+        self._lookups = []
+        self._missing_codes = []
+        for vocab in self.vocabularies:
+            lookup = {}
+            missing_code = -1
+            for code, category in enumerate(vocab):
+                if pd.isna(category):
+                    missing_code = code
+                else:
+                    lookup[category] = code
+            self._lookups.append(lookup)
+            self._missing_codes.append(missing_code)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, directory, metadata=None):
+        """
+        Write the arrays and schema to `directory` atomically (written to a
+        temporary sibling first, then renamed into place). `metadata` is
+        stored in the schema as-is (provenance only, never read back).
+        """
+        tmp_dir = f"{directory}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            for name in ARRAY_NAMES:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+            schema = {
+                'format_version': FORMAT_VERSION,
+                'numeric_columns': self.numeric_columns,
+                'categorical_columns': self.categorical_columns,
+                'vocabularies': [
+                    [None if pd.isna(c) else c for c in vocab.tolist()]
+                    for vocab in self.vocabularies
+                ],
+                'metadata': metadata or {},
+            }
+            with open(os.path.join(tmp_dir, SCHEMA_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump(schema, f, ensure_ascii=False)
+            try:
+                os.rename(tmp_dir, directory)
+            except OSError:
+                # Another worker got there first; its copy is equivalent
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Load a saved model. With mmap_mode='r' the arrays stay in the page
+        cache and are shared by every process that maps the same files.
+        """
+        with open(os.path.join(directory, SCHEMA_FILENAME), encoding='utf-8') as f:
+            schema = json.load(f)
+        if schema.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format: {schema.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        return cls(
+            numeric_columns=schema['numeric_columns'],
+            categorical_columns=schema['categorical_columns'],
+            vocabularies=[[np.nan if c is None else c for c in v] for v in schema['vocabularies']],
+            **arrays,
+        )
+
+    @property
+    def input_columns(self):
+        """Columns a feature row must provide."""
+        return self.numeric_columns + self.categorical_columns
+
+    # ----------------------------
+    # Single row
+    # ----------------------------
+    def _category_code(self, column, value):
+        if value is None or value != value:  # None or NaN
+            return self._missing_codes[column]
+        return self._lookups[column].get(value, -1)
+
+    def predict_row(self, row):
+        """Predict a single feature dict (keys as in REQUIRED_ML_COLUMNS)."""
+        left = self.children_left
+        right = self.children_right
+        node = 0
+        while left[node] != TREE_LEAF:
+            f = self.feature[node]
+            column = self.feature_column[f]
+            if self.feature_kind[f] == ONE_HOT:
+                name = self.categorical_columns[column]
+                code = self._category_code(column, row[name])
+                x = 1.0 if code == self.feature_code[f] else 0.0
+            else:
+                name = self.numeric_columns[column]
+                value = np.nan if row[name] is None else float(row[name])
+                # sklearn scales in float64, then the tree casts to float32
+                x = np.float32((value - self.feature_offset[f]) / self.feature_scale[f])
+            if x != x:  # NaN
+                go_left = self.missing_go_to_left[node]
+            else:
+                go_left = x <= self.threshold[node]
+            node = left[node] if go_left else right[node]
+        return float(self.value[node])
+
+    # ----------------------------
+    # Batch
+    # ----------------------------
+    def _encode(self, X):
+        """Split X (DataFrame or dict of columns) into a numeric matrix and a code matrix."""
+        numeric = np.column_stack([
+            np.asarray(X[name], dtype=np.float64) for name in self.numeric_columns
+        ]) if self.numeric_columns else None
+
+        codes = []
+        for column, name in enumerate(self.categorical_columns):
+            values = pd.Series(np.asarray(X[name], dtype=object))
+            vocab = self.vocabularies[column]
+            known = [c for c in vocab if not pd.isna(c)]
+            column_codes = pd.Categorical(values, categories=known).codes.astype(np.int32)
+            missing_code = self._missing_codes[column]
+            if missing_code != -1:
+                column_codes[values.isna().to_numpy()] = missing_code
+            codes.append(column_codes)
+        codes = np.column_stack(codes) if codes else None
+        return numeric, codes
+
+    def predict(self, X):
+        """Vectorised prediction for a DataFrame or a dict of equal-length columns."""
+        numeric, codes = self._encode(X)
+        n_rows = (numeric if numeric is not None else codes).shape[0]
+
+        left = self.children_left
+        right = self.children_right
+        node = np.zeros(n_rows, dtype=np.intp)
+        rows = np.arange(n_rows)
+
+        while True:
+            internal = left[node] != TREE_LEAF
+            if not internal.any():
+                break
+            r = rows[internal]
+            n = node[internal]
+            f = self.feature[n]
+            column = self.feature_column[f]
+            x = np.empty(len(n), dtype=np.float32)
+
+            affine = self.feature_kind[f] == AFFINE
+            if affine.any():
+                a_rows, a_feat = r[affine], f[affine]
+                x[affine] = (
+                    (numeric[a_rows, column[affine]] - self.feature_offset[a_feat])
+                    / self.feature_scale[a_feat]
+                ).astype(np.float32)
+            one_hot = ~affine
+            if one_hot.any():
+                x[one_hot] = codes[r[one_hot], column[one_hot]] == self.feature_code[f[one_hot]]
+
+            go_left = x <= self.threshold[n]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left[missing] = self.missing_go_to_left[n[missing]] != 0
+            node[internal] = np.where(go_left, left[n], right[n])
+
+        return self.value[node]
+
+
+def _column_names(columns):
+    """Return column names as a list, or None if they aren't plain strings."""
+    if isinstance(columns, str):
+        columns = [columns]
+    columns = list(columns)
+    if not all(isinstance(c, str) for c in columns):
+        return None
+    return columns
+
+
+def compile_model(model):
+    """
+    Lower a fitted Pipeline(ColumnTransformer, DecisionTreeRegressor) into a
+    CompiledPipeline. Returns None for any estimator shape it doesn't support.
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+    from sklearn.tree import DecisionTreeRegressor
+
+    if not isinstance(model, Pipeline) or len(model.steps) != 2:
+        return None
+    preprocessor = model.steps[0][1]
+    regressor = model.steps[1][1]
+    if not isinstance(preprocessor, ColumnTransformer) or not hasattr(preprocessor, 'transformers_'):
+        return None
+    if type(regressor) is not DecisionTreeRegressor or not hasattr(regressor, 'tree_'):
+        return None
+    if regressor.n_outputs_ != 1:
+        return None
+
+    numeric_columns = []
+    categorical_columns = []
+    vocabularies = []
+    kind, column, offset, scale, code = [], [], [], [], []
+
+    def numeric_index(name):
+        if name not in numeric_columns:
+            numeric_columns.append(name)
+        return numeric_columns.index(name)
+
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == 'drop':
+            continue
+        names = _column_names(columns)
+        if names is None:
+            return None
+        if not names:
+            continue
+
+        if isinstance(transformer, StandardScaler):
+            # mean_ is fitted even with with_mean=False, but not subtracted
+            if transformer.with_mean and transformer.mean_ is not None:
+                means = transformer.mean_
+            else:
+                means = np.zeros(len(names))
+            if transformer.with_std and transformer.scale_ is not None:
+                scales = transformer.scale_
+            else:
+                scales = np.ones(len(names))
+            for i, col in enumerate(names):
+                kind.append(AFFINE)
+                column.append(numeric_index(col))
+                offset.append(float(means[i]))
+                scale.append(float(scales[i]))
+                code.append(-1)
+
+        elif transformer == 'passthrough' or (
+            isinstance(transformer, FunctionTransformer) and transformer.func is None
+        ):
+            for col in names:
+                kind.append(AFFINE)
+                column.append(numeric_index(col))
+                offset.append(0.0)
+                scale.append(1.0)
+                code.append(-1)
+
+        elif isinstance(transformer, OneHotEncoder):
+            if transformer.handle_unknown != 'ignore' or transformer.drop_idx_ is not None:
+                return None
+            if getattr(transformer, '_infrequent_enabled', False):
+                return None
+            for col, categories in zip(names, transformer.categories_):
+                col_index = len(categorical_columns)
+                categorical_columns.append(col)
+                vocabularies.append(categories)
+                for category_code in range(len(categories)):
+                    kind.append(ONE_HOT)
+                    column.append(col_index)
+                    offset.append(0.0)
+                    scale.append(1.0)
+                    code.append(category_code)
+        else:
+            return None
+
+    tree = regressor.tree_
+    if len(kind) != regressor.n_features_in_:
+        return None
+
+    return CompiledPipeline(
+        numeric_columns=numeric_columns,
+        categorical_columns=categorical_columns,
+        vocabularies=vocabularies,
+        feature_kind=np.asarray(kind, dtype=np.int8),
+        feature_column=np.asarray(column, dtype=np.int32),
+        feature_offset=np.asarray(offset, dtype=np.float64),
+        feature_scale=np.asarray(scale, dtype=np.float64),
+        feature_code=np.asarray(code, dtype=np.int32),
+        children_left=np.asarray(tree.children_left, dtype=np.int32),
+        children_right=np.asarray(tree.children_right, dtype=np.int32),
+        feature=np.asarray(tree.feature, dtype=np.int32),
+        threshold=np.asarray(tree.threshold, dtype=np.float64),
+        missing_go_to_left=np.asarray(tree.missing_go_to_left, dtype=np.uint8),
+        value=np.asarray(tree.value[:, 0, 0], dtype=np.float64),
+    )
+
+
+def sidecar_path(model_path):
+    """Directory holding the compiled arrays for a .pkl model file."""
+    return os.path.splitext(str(model_path))[0] + SIDECAR_SUFFIX
+
+
+def sidecar_is_fresh(model_path):
+    """True if a compiled sidecar of the current format exists and is at least as new as the .pkl."""
+    directory = sidecar_path(model_path)
+    try:
+        if os.path.getmtime(directory) < os.path.getmtime(model_path):
+            return False
+        with open(os.path.join(directory, SCHEMA_FILENAME), encoding='utf-8') as f:
+            return json.load(f).get('format_version') == FORMAT_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def directory_size(directory):
+    """Total bytes of the files in a compiled model directory."""
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
+
+
+def write_artifact(model_path):
+    """
+    Compile the pickled model at `model_path` and write its artifact next to
+    it, replacing any existing one. Returns the size/load-time report (also
+    saved in the artifact as report.json), or None if the model isn't a
+    supported pipeline and has to be served from the pickle.
+    """
+    started = time.perf_counter()
+    model = joblib.load(model_path)
+    pickle_load_seconds = time.perf_counter() - started
+
+    compiled = compile_model(model)
+    if compiled is None:
+        return None
+
+    directory = sidecar_path(model_path)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+    compiled.save(directory, metadata={
+        'source': os.path.basename(str(model_path)),
+        'sklearn_version': sklearn.__version__,
+    })
+
+    started = time.perf_counter()
+    CompiledPipeline.load(directory, mmap_mode=None)
+    artifact_load_seconds = time.perf_counter() - started
+
+    report = {
+        'format_version': FORMAT_VERSION,
+        'pickle_bytes': os.path.getsize(model_path),
+        'pickle_load_ms': round(pickle_load_seconds * 1000, 3),
+        'artifact_bytes': directory_size(directory),
+        'artifact_load_ms': round(artifact_load_seconds * 1000, 3),
+    }
+    with open(os.path.join(directory, REPORT_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f)
+    return report
+
+
+def artifact_report(model_path):
+    """The report written by write_artifact(), or None if there's no fresh artifact."""
+    if not sidecar_is_fresh(model_path):
+        return None
+    try:
+        with open(os.path.join(sidecar_path(model_path), REPORT_FILENAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
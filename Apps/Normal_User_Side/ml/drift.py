@@ -0,0 +1,245 @@
+"""
+Streaming feature distributions of the served models, for drift monitoring.
+
+Every MLModel has a reference snapshot (FeatureHistogram rows with source
+REFERENCE), taken at upload from its training data: per feature in
+REQUIRED_ML_COLUMNS, the counts over quantile bins for numeric features and
+per value for categorical ones. Live traffic is counted into matching LIVE
+rows with the reference's bin edges, and the scientist side compares the
+two (Apps/Data_Scientist_Side/drift.py).
+
+The prediction path only hands its feature rows to drift_monitor.record(),
+which appends them to an in-process buffer. Once DRIFT_FLUSH_ROWS rows are
+pending or DRIFT_FLUSH_SECONDS have passed, a background thread bins the
+buffered rows with NumPy and adds the counts to the LIVE rows in one
+transaction per model; counts from several workers simply add up. Rows of
+the fallback model, of models without a reference, and past
+DRIFT_MAX_PENDING_ROWS (if flushing falls behind) are not counted. A
+worker that goes idle keeps its last rows buffered until the drift report
+flushes them or the serving process exits: the WSGI/ASGI entry points
+call register_exit_flush(), so tests and management commands, which never
+record rows, don't get the hook.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from Apps.core.background import run_in_background
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_SECONDS = 60
+DEFAULT_MAX_PENDING_ROWS = 100000
+# Quantile bins of a numeric feature's reference
+NUMERIC_BINS = 20
+
+
+def numeric_edges(values, bins=NUMERIC_BINS):
+    """Inner bin edges at the reference's quantiles (ties collapse, so 0/1 flags get a few bins)."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return []
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+
+
+def numeric_counts(values, edges):
+    """Counts of `values` in the len(edges) + 1 bins split at `edges` (NaN in the last)."""
+    positions = np.searchsorted(edges, np.asarray(values, dtype=np.float64), side='right')
+    return np.bincount(positions, minlength=len(edges) + 1).tolist()
+
+
+def category_counts(values):
+    return dict(Counter(str(value) for value in values))
+
+
+def add_counts(histogram, counts):
+    """Add a numeric_counts() list or category_counts() dict to a FeatureHistogram."""
+    if isinstance(histogram.counts, dict):
+        merged = dict(histogram.counts)
+        for value, count in counts.items():
+            merged[value] = merged.get(value, 0) + count
+        histogram.counts = merged
+    else:
+        histogram.counts = [a + b for a, b in zip(histogram.counts, counts, strict=True)]
+
+
+def snapshot_reference(ml_model, features):
+    """
+    Store the reference distribution of `features` (a DataFrame with the
+    REQUIRED_ML_COLUMNS) for `ml_model`, discarding its earlier reference
+    and live counts. Returns the number of rows it was taken from.
+    """
+    from Apps.core.models import FeatureHistogram
+    from .predict import NUMERIC_ML_COLUMNS, REQUIRED_ML_COLUMNS
+
+    histograms = []
+    for feature in REQUIRED_ML_COLUMNS:
+        values = features[feature].to_numpy()
+        if feature in NUMERIC_ML_COLUMNS:
+            edges = numeric_edges(values)
+            counts = numeric_counts(values, edges)
+        else:
+            edges, counts = None, category_counts(values)
+        histograms.append(FeatureHistogram(
+            model=ml_model, source=FeatureHistogram.Source.REFERENCE, feature=feature,
+            edges=edges, counts=counts, total=len(values),
+        ))
+    with transaction.atomic():
+        FeatureHistogram.objects.filter(model=ml_model).delete()
+        FeatureHistogram.objects.bulk_create(histograms)
+    return len(features)
+
+
+def flush_rows(model_id, rows):
+    """Add buffered feature rows of one model to its LIVE histograms. Returns the rows counted."""
+    from Apps.core.models import FeatureHistogram
+
+    Source = FeatureHistogram.Source
+    reference = list(FeatureHistogram.objects.filter(model_id=model_id, source=Source.REFERENCE))
+    if not reference:
+        return 0
+
+    counts = {}
+    for histogram in reference:
+        values = [row.get(histogram.feature) for row in rows]
+        if histogram.edges is None:
+            counts[histogram.feature] = category_counts(values)
+        else:
+            counts[histogram.feature] = numeric_counts(values, histogram.edges)
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Another worker may create them first
+        FeatureHistogram.objects.bulk_create([
+            FeatureHistogram(
+                model_id=model_id, source=Source.LIVE, feature=histogram.feature, edges=histogram.edges,
+                counts={} if histogram.edges is None else [0] * (len(histogram.edges) + 1),
+            )
+            for histogram in reference
+        ], ignore_conflicts=True)
+        live = list(FeatureHistogram.objects.select_for_update().filter(
+            model_id=model_id, source=Source.LIVE, feature__in=counts,
+        ))
+        for histogram in live:
+            add_counts(histogram, counts[histogram.feature])
+            histogram.total += len(rows)
+            histogram.updated_at = now
+        FeatureHistogram.objects.bulk_update(live, ['counts', 'total', 'updated_at'])
+    return len(rows)
+
+
+class DriftMonitor:
+    """Per-process buffer of served feature rows, flushed to FeatureHistogram in batches."""
+
+    def __init__(self, flush_rows=None, flush_seconds=None, max_pending_rows=None):
+        self._flush_rows = flush_rows
+        self._flush_seconds = flush_seconds
+        self._max_pending_rows = max_pending_rows
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_rows = 0
+        self._flushing = False
+        self._last_flush = time.monotonic()
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'DRIFT_MONITORING', True)
+
+    @property
+    def flush_rows(self):
+        if self._flush_rows is not None:
+            return self._flush_rows
+        return getattr(settings, 'DRIFT_FLUSH_ROWS', DEFAULT_FLUSH_ROWS)
+
+    @property
+    def flush_seconds(self):
+        if self._flush_seconds is not None:
+            return self._flush_seconds
+        return getattr(settings, 'DRIFT_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+
+    @property
+    def max_pending_rows(self):
+        if self._max_pending_rows is not None:
+            return self._max_pending_rows
+        return getattr(settings, 'DRIFT_MAX_PENDING_ROWS', DEFAULT_MAX_PENDING_ROWS)
+
+    def record(self, model_id, rows):
+        """Buffer feature rows served by `model_id` (None: the fallback model, not monitored)."""
+        if model_id is None or not self.enabled:
+            return
+        with self._lock:
+            if self._pending_rows + len(rows) > self.max_pending_rows:
+                self.dropped += len(rows)
+                return
+            self._pending.setdefault(model_id, []).extend(rows)
+            self._pending_rows += len(rows)
+            self.recorded += len(rows)
+            due = (
+                self._pending_rows >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+            if not due or self._flushing:
+                return
+            self._flushing = True
+        run_in_background(self._flush_in_background)
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, {}, 0
+            self._last_flush = time.monotonic()
+        return pending
+
+    def flush(self):
+        """Write the buffered rows now, in this thread. Returns the rows counted."""
+        counted = 0
+        for model_id, rows in self._take().items():
+            counted += flush_rows(model_id, rows)
+        with self._lock:
+            self.flushed += counted
+        return counted
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def flush_at_exit(self):
+        """Write rows still buffered when the process exits (nothing else would)."""
+        if not self._pending_rows:
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write buffered drift counts at exit")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending_rows,
+                'recorded': self.recorded,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+            }
+
+
+drift_monitor = DriftMonitor()
+
+
+def register_exit_flush():
+    """Have this process write its buffered drift rows when it exits; for serving processes only."""
+    if getattr(settings, 'DRIFT_MONITORING', True):
+        atexit.register(drift_monitor.flush_at_exit)
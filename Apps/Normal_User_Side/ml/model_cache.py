@@ -0,0 +1,221 @@
+"""
+Process-wide cache of loaded ML models.
+
+Entries are keyed by (MLModel id, file path) and evicted least-recently-used
+first once the resident size exceeds a byte budget. Each entry remembers the
+(inode, mtime) of the file it was loaded from; a file replaced in place is
+reloaded on its next lookup, and the entry's fingerprint changes with it. Every consumer that
+needs a model artifact (get_model, model_test, comparison tooling) goes
+through the shared instance in model_loader so an artifact is unpickled at
+most once per worker while it stays resident.
+
+Models that have a compiled artifact (written at upload time, see
+compiled.write_artifact) are loaded from it instead of the pickle; the
+pickle is then only unpickled if something asks for the sklearn object, and
+from then on counts towards the entry's size as well.
+With ML_MODEL_SHARED_MEMORY enabled the artifact is memory-mapped, so the
+arrays live in the OS page cache once and every worker maps the same pages,
+and it is written on first load for models uploaded before artifacts existed.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+from django.conf import settings
+from .compiled import (
+    CompiledPipeline, compile_model, directory_size, sidecar_path, sidecar_is_fresh, write_artifact
+)
+
+logger = logging.getLogger(__name__)
+
+# Default budget for resident models (bytes on disk as the size estimate)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def file_token(path):
+    """(inode, mtime) of a model file, or None if it can't be stat'ed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+class CacheEntry:
+    """A loaded model plus its load-time bookkeeping."""
+
+    def __init__(self, model_id, path, model, compiled, size_bytes, load_seconds, shared=False):
+        self.model_id = model_id
+        self.path = path
+        # Set by ModelCache.get: the file_token() the entry was loaded at
+        self.file_token = None
+        self._model = model
+        self.compiled = compiled
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.shared = shared
+        self.loaded_at = time.time()
+        self.hits = 0
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The sklearn estimator; unpickled on first access for artifact entries."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = joblib.load(self.path)
+                    # The cache evicts down to its budget again on its next lookup
+                    self.size_bytes += os.path.getsize(self.path)
+        return self._model
+
+    @property
+    def model_loaded(self):
+        return self._model is not None
+
+    @property
+    def fingerprint(self):
+        """Short identifier of this model (id + file version) for cache keys."""
+        digest = hashlib.blake2b(f"{self.path}|{self.file_token}".encode('utf-8'), digest_size=6).hexdigest()
+        return f"{self.model_id or 'fallback'}-{digest}"
+
+    @property
+    def predictor(self):
+        """The fastest object with a predict(X) method for this model."""
+        return self.compiled if self.compiled is not None else self.model
+
+
+class ModelCache:
+    """LRU cache of CacheEntry objects bounded by total size in bytes."""
+
+    def __init__(self, max_bytes=None):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'ML_MODEL_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    @property
+    def total_bytes(self):
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def get(self, path, model_id=None):
+        """Return the CacheEntry for a model file, loading it on a miss."""
+        key = (model_id, str(path))
+        token = file_token(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.file_token == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                entry.hits += 1
+                # An entry grows when its pickle is unpickled after the artifact
+                self._evict(keep=key)
+                return entry
+
+            self.misses += 1
+            entry = self._load(path, model_id)
+            entry.file_token = token
+            # Replaces an entry loaded from an earlier version of the file
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+            return entry
+
+    def _load(self, path, model_id):
+        if getattr(settings, 'ML_COMPILED_INFERENCE', True):
+            shared = getattr(settings, 'ML_MODEL_SHARED_MEMORY', False)
+            if sidecar_is_fresh(path) or (shared and write_artifact(path) is not None):
+                try:
+                    return self._load_artifact(path, model_id, shared)
+                except (OSError, ValueError, KeyError):
+                    logger.exception("Unreadable compiled artifact for %s; using the pickle", path)
+
+        started = time.perf_counter()
+        model = joblib.load(path)
+        compiled = None
+        if getattr(settings, 'ML_COMPILED_INFERENCE', True):
+            compiled = compile_model(model)
+        load_seconds = time.perf_counter() - started
+        return CacheEntry(
+            model_id=model_id,
+            path=str(path),
+            model=model,
+            compiled=compiled,
+            size_bytes=os.path.getsize(path),
+            load_seconds=load_seconds,
+        )
+
+    def _load_artifact(self, path, model_id, shared):
+        """
+        Load the compiled artifact next to `path`; memory-mapped when `shared`,
+        otherwise read into private memory.
+        """
+        started = time.perf_counter()
+        directory = sidecar_path(path)
+        compiled = CompiledPipeline.load(directory, mmap_mode='r' if shared else None)
+        load_seconds = time.perf_counter() - started
+        return CacheEntry(
+            model_id=model_id,
+            path=str(path),
+            model=None,
+            compiled=compiled,
+            size_bytes=directory_size(directory),
+            load_seconds=load_seconds,
+            shared=shared,
+        )
+
+    def _evict(self, keep):
+        """Drop least-recently-used entries until within budget (never `keep`)."""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.evictions += 1
+
+    def discard(self, path, model_id=None):
+        with self._lock:
+            self._entries.pop((model_id, str(path)), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Counters and per-entry bookkeeping, most recently used last."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'entries': [
+                    {
+                        'model_id': entry.model_id,
+                        'path': entry.path,
+                        'size_bytes': entry.size_bytes,
+                        'load_seconds': round(entry.load_seconds, 4),
+                        'loaded_at': entry.loaded_at,
+                        'hits': entry.hits,
+                        'compiled': entry.compiled is not None,
+                        'shared': entry.shared,
+                    }
+                    for entry in self._entries.values()
+                ],
+            }
@@ -1,6 +1,8 @@
-import joblib
 import os
 from django.conf import settings
+from Apps.core.versioning import read_version, bump_version
+from .model_cache import ModelCache, file_token
+from .prediction_cache import prediction_cache
 
 # Fallback path for original hardcoded model
 FALLBACK_MODEL_PATH = os.path.join(
@@ -11,8 +13,105 @@ FALLBACK_MODEL_PATH = os.path.join(
     "land_price_model.pkl"
 )
 
-_model = None
-_model_path = None
+# Bumped whenever the active model pointer changes. Every worker compares
+# the version it resolved the pointer at, so a warm prediction finds its
+# model without any SQL (see Apps/core/versioning.py).
+VERSION_NAME = "active_model"
+
+# Shared by every consumer of model artifacts (predictions, model_test, ...)
+model_cache = ModelCache()
+
+# Cache entry currently serving predictions
+_entry = None
+
+# Cached active-model pointer
+_active_version = None
+_active_model_id = None
+_active_model_path = None
+
+
+def bump_model_version():
+    """
+    Invalidate the cached active-model pointer in every worker.
+    Called when Setting (or an MLModel) is saved.
+    """
+    global _active_version
+    _active_version = None
+    prediction_cache.clear()
+    bump_version(VERSION_NAME)
+
+
+def _resolve_active_model(version):
+    """Read the active model pointer from the database and cache it for `version`."""
+    global _active_version, _active_model_id, _active_model_path
+    from Apps.core.models import Setting
+
+    setting = Setting.objects.select_related("active_ml_model").first()
+    if setting and setting.active_ml_model:
+        _active_model_id = setting.active_ml_model.id
+        # Build full path from media root
+        _active_model_path = os.path.join(
+            settings.MEDIA_ROOT,
+            setting.active_ml_model.model_file_path
+        )
+    else:
+        _active_model_id = None
+        _active_model_path = None
+    _active_version = version
+
+
+def load_model_file(path, model_id=None):
+    """Return the cache entry (model, compiled form, bookkeeping) for a model file."""
+    return model_cache.get(path, model_id)
+
+
+def load_ml_model(ml_model):
+    """Return the cache entry for an MLModel row."""
+    path = os.path.join(settings.MEDIA_ROOT, ml_model.model_file_path)
+    return load_model_file(path, ml_model.id)
+
+
+def _use(path, model_id=None):
+    """Point predictions at a model file (again if it was replaced), going through the shared cache."""
+    global _entry
+    if (_entry is None or _entry.path != str(path) or _entry.model_id != model_id
+            or _entry.file_token != file_token(path)):
+        _entry = load_model_file(path, model_id)
+
+
+def get_model_entry():
+    """
+    Return the model cache entry serving predictions (active model, or the
+    hardcoded fallback if no active model is set).
+
+    The active model pointer is cached per process and only re-read from the
+    database after bump_model_version() has been called somewhere.
+    """
+    # Try to get active model from database
+    version = read_version(VERSION_NAME)
+    if version != _active_version:
+        try:
+            _resolve_active_model(version)
+        except Exception:
+            # Database not ready or other error, fall through to fallback
+            pass
+
+    if _active_model_path and os.path.exists(_active_model_path):
+        # Switches model only when a different one was selected
+        _use(_active_model_path, _active_model_id)
+        return _entry
+
+    # Fallback to original hardcoded model
+    if os.path.exists(FALLBACK_MODEL_PATH):
+        _use(FALLBACK_MODEL_PATH)
+    elif _entry is None:
+        raise FileNotFoundError(
+            f"No ML model available. "
+            f"No active model is set in the database, and the fallback model "
+            f"was not found at: {FALLBACK_MODEL_PATH}"
+        )
+
+    return _entry
 
 
 def get_model():
@@ -20,39 +119,17 @@ def get_model():
     Load the active ML model from database settings.
     Falls back to the hardcoded model if no active model is set.
     """
-    global _model, _model_path
-    
-    # Try to get active model from database
-    try:
-        from core.models import Setting
-        setting = Setting.objects.first()
-        if setting and setting.active_ml_model:
-            # Build full path from media root
-            db_model_path = os.path.join(
-                settings.MEDIA_ROOT,
-                setting.active_ml_model.model_file_path
-            )
-            
-            # Check if we need to reload (different model selected)
-            if _model is None or _model_path != db_model_path:
-                if os.path.exists(db_model_path):
-                    _model = joblib.load(db_model_path)
-                    _model_path = db_model_path
-                    return _model
-    except Exception:
-        # Database not ready or other error, fall through to fallback
-        pass
-    
-    # Fallback to original hardcoded model
-    if _model is None:
-        if os.path.exists(FALLBACK_MODEL_PATH):
-            _model = joblib.load(FALLBACK_MODEL_PATH)
-            _model_path = FALLBACK_MODEL_PATH
-        else:
-            raise FileNotFoundError(
-                f"No ML model available. "
-                f"No active model is set in the database, and the fallback model "
-                f"was not found at: {FALLBACK_MODEL_PATH}"
-            )
-
-    return _model
+    return get_model_entry().model
+
+
+def get_active_model_id():
+    """Id of the active MLModel, or None when the fallback model is in use."""
+    return get_model_entry().model_id
+
+
+def get_compiled_model():
+    """
+    Return the compiled (NumPy) form of the active model, or None when the
+    loaded estimator could not be lowered and the sklearn path must be used.
+    """
+    return get_model_entry().compiled
@@ -1,16 +1,68 @@
+from collections import defaultdict
+from itertools import islice
 import pandas as pd
-from .model_loader import get_model
+from django.db.models import QuerySet
+from Apps.core.gazetteer import gazetteer
+from .drift import drift_monitor
+from .model_loader import get_model_entry
+from .prediction_cache import prediction_cache
 
-def predict_land_price(project, road_formset=None):
-    model = get_model()  # your joblib-loaded model
+# Rows per model invocation in predict_land_prices()
+BATCH_SIZE = 5000
+
+# Required columns for ML model (must match build_feature_row)
+REQUIRED_ML_COLUMNS = [
+    'Area', 'Neighborhood', 'political_classification', 'parcel_shape',
+    'road_status1', 'road_status2', 'road_status3', 'slope', 'view_quality',
+    'electricity', 'Sewage', 'area_m2', 'parcel_frontage (m)',
+    'width_m', 'width_m.1', 'width_m.2',
+    'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
+    'land_use_industrial', 'hospitals_facility', 'schools_facility',
+    'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
+    'NOISY_FACILITIES', 'ANIMAL_FARMS', 'water',
+]
+
+# Subset of REQUIRED_ML_COLUMNS that are numeric (measurements and 0/1 flags)
+NUMERIC_ML_COLUMNS = [
+    'area_m2', 'parcel_frontage (m)', 'width_m', 'width_m.1', 'width_m.2',
+    'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
+    'land_use_industrial', 'hospitals_facility', 'schools_facility',
+    'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
+    'NOISY_FACILITIES', 'ANIMAL_FARMS', 'water',
+]
+
+
+def location_name(project, field):
+    """name_ar of project.area / project.neighborhood without a lazy FK query."""
+    pk = getattr(project, f"{field}_id")
+    lookup = gazetteer.area_name if field == "area" else gazetteer.neighborhood_name
+    name = lookup(pk)
+    if name is None:
+        # Unsaved related object (e.g. a payload's in-memory instance)
+        name = getattr(project, field).name_ar
+    return name
 
+
+def build_feature_row(project, road_formset=None, roads=None):
+    """
+    Build the model input row for a project as a plain dict keyed by the
+    training column names.
+
+    Roads come from the formset when given, else from `roads` (an already
+    fetched list of ProjectRoad), else from the project's saved roads (use
+    prefetch_related('projectroad_set') to avoid the query). Area and
+    Neighborhood names come from the in-process gazetteer, not the FKs.
+    """
     # ----------------------------
     # Roads (default = FALSE for ML model when no road exists)
     # ----------------------------
     road_statuses = ["FALSE", "FALSE", "FALSE"]  # ML expects 'FALSE' for no road
     road_widths = [0, 0, 0]
 
-    roads = road_formset.forms if road_formset else project.projectroad_set.all()
+    if road_formset:
+        roads = road_formset.forms
+    elif roads is None:
+        roads = project.projectroad_set.all()
 
     for i, road in enumerate(roads[:3]):
         # If coming from a formset
@@ -29,8 +81,8 @@ def predict_land_price(project, road_formset=None):
     # ----------------------------
     row = {
         # categorical
-        "Area": project.area.name_ar,
-        "Neighborhood": project.neighborhood.name_ar,
+        "Area": location_name(project, "area"),
+        "Neighborhood": location_name(project, "neighborhood"),
         "political_classification": project.political_classification,
         "parcel_shape": project.parcel_shape,
         "road_status1": road_statuses[0],
@@ -69,8 +121,131 @@ def predict_land_price(project, road_formset=None):
         "water": int(project.water == "YES"),
     }
 
+    return row
+
+
+def predict_feature_row(row, entry=None):
+    """
+    Predict one feature row (keys as in REQUIRED_ML_COLUMNS) with `entry`,
+    a model cache entry, or the active model. Not memoized.
+    """
+    if entry is None:
+        entry = get_model_entry()
+
+    # Fast path: walk the lowered tree directly from the feature dict
+    if entry.compiled is not None:
+        return entry.compiled.predict_row(row)
+
     df = pd.DataFrame([row])
-    prediction = model.predict(df)
+    prediction = entry.model.predict(df)
     return float(prediction[0])
 
 
+def predict_land_price(project, road_formset=None):
+    row = build_feature_row(project, road_formset)
+
+    # Memoized per (model, feature row): repeated submissions of the same
+    # parcel and the confirm step reuse the earlier prediction
+    entry = get_model_entry()
+
+    def compute():
+        # Counted for drift once per distinct row, not per resubmission;
+        # only buffered here, written to the histograms in the background
+        drift_monitor.record(entry.model_id, [row])
+        return predict_feature_row(row, entry)
+
+    return prediction_cache.get_or_compute(entry.fingerprint, row, compute)
+
+
+def _payload_to_project(payload):
+    """
+    Turn a cleaned form payload (ProjectForm.cleaned_data, optionally with a
+    'roads' list of {'road_status', 'width_m'} dicts) into unsaved model
+    instances the row builder understands.
+    """
+    from Apps.core.models import Project, ProjectRoad
+
+    field_names = {f.name for f in Project._meta.concrete_fields}
+    project = Project(**{k: v for k, v in payload.items() if k in field_names})
+    roads = [
+        ProjectRoad(road_status=road.get('road_status'), width_m=road.get('width_m'))
+        for road in payload.get('roads') or []
+        if not road.get('DELETE', False)
+    ]
+    return project, roads
+
+
+def predict_feature_rows(rows, entry=None):
+    """Run one model call over a list of feature rows (active model by default)."""
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+
+    if entry is None:
+        entry = get_model_entry()
+    if entry.compiled is not None:
+        return entry.compiled.predict(columns).tolist()
+
+    return [float(p) for p in entry.model.predict(pd.DataFrame(columns))]
+
+
+def _predict_chunk(items):
+    from Apps.core.models import ProjectRoad
+
+    projects = []
+    roads_by_item = []
+    saved = []
+    for item in items:
+        if isinstance(item, dict):
+            project, roads = _payload_to_project(item)
+        else:
+            project, roads = item, None
+            if project.pk is not None:
+                saved.append(project)
+        projects.append(project)
+        roads_by_item.append(roads)
+
+    # Roads for saved projects: one query for the whole chunk
+    saved_roads = defaultdict(list)
+    if saved:
+        for road in ProjectRoad.objects.filter(
+            project_id__in=[p.pk for p in saved]
+        ).order_by('project_id', 'id'):
+            saved_roads[road.project_id].append(road)
+
+    rows = []
+    for project, roads in zip(projects, roads_by_item):
+        if roads is None:
+            roads = saved_roads.get(project.pk, [])
+        rows.append(build_feature_row(project, roads=roads))
+
+    entry = get_model_entry()
+    drift_monitor.record(entry.model_id, rows)
+    return predict_feature_rows(rows, entry)
+
+
+def predict_land_prices(projects, batch_size=BATCH_SIZE):
+    """
+    Predict prices for many projects with one model call per batch.
+
+    `projects` may be a queryset or list of Project instances, or of cleaned
+    form payloads (dicts of Project field values plus an optional 'roads'
+    list). Returns the predicted prices per m² in input order.
+    """
+    if isinstance(projects, QuerySet):
+        projects = projects.iterator(chunk_size=batch_size)
+
+    iterator = iter(projects)
+    predictions = []
+    while True:
+        chunk = list(islice(iterator, batch_size))
+        if not chunk:
+            break
+        predictions.extend(_predict_chunk(chunk))
+    return predictions
+
+
+def synthetic_feature_row():
+    """A valid placeholder row (zeros / 'FALSE') covering REQUIRED_ML_COLUMNS."""
+    return {
+        column: 0 if column in NUMERIC_ML_COLUMNS else "FALSE"
+        for column in REQUIRED_ML_COLUMNS
+    }
@@ -0,0 +1,151 @@
+"""
+Memoization of single-parcel predictions.
+
+Appraisers re-submit the same parcel while tweaking the form, and
+api_confirm_prediction recomputes the prediction api_predict_price just
+returned. Predictions are cached under a canonical hash of the feature row
+plus the identity of the model that produced them, so activating another
+model naturally stops serving the old values (and clear() drops them).
+
+Entries live in a per-process LRU with a TTL; set
+ML_PREDICTION_CACHE_BACKEND to a Django cache alias to also share them
+between workers.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 60 * 60
+KEY_PREFIX = "land_price:prediction"
+
+
+def _canonical(value):
+    """Normalise values so equal rows hash equally (Decimal('10.00') == 10.0 == 10)."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    if value is None:
+        return None
+    return str(value)
+
+
+def row_hash(row):
+    """Stable hash of a feature row dict."""
+    payload = json.dumps(
+        sorted((name, _canonical(value)) for name, value in row.items()),
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """LRU + TTL cache of predictions with hit/miss/saved-time counters."""
+
+    def __init__(self, max_entries=None, ttl=None, backend=None):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, "ML_PREDICTION_CACHE_SIZE", DEFAULT_MAX_ENTRIES)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "ML_PREDICTION_CACHE_TTL", DEFAULT_TTL_SECONDS)
+
+    @property
+    def backend(self):
+        alias = self._backend or getattr(settings, "ML_PREDICTION_CACHE_BACKEND", None)
+        return caches[alias] if alias else None
+
+    def key(self, model_key, row):
+        return f"{KEY_PREFIX}:{model_key}:{row_hash(row)}"
+
+    def get_or_compute(self, model_key, row, compute):
+        """
+        Return the cached prediction for (model_key, row), or call compute(),
+        cache its result and return it.
+        """
+        if self.max_entries <= 0:
+            return compute()
+
+        key = self.key(model_key, row)
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                value, cost, expires_at = cached
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_seconds += cost
+                    return value
+                del self._entries[key]
+
+        backend = self.backend
+        if backend is not None:
+            shared = backend.get(key)
+            if shared is not None:
+                value, cost = shared
+                self._store(key, value, cost, now)
+                with self._lock:
+                    self.hits += 1
+                    self.saved_seconds += cost
+                return value
+
+        started = time.perf_counter()
+        value = compute()
+        cost = time.perf_counter() - started
+
+        self._store(key, value, cost, now)
+        if backend is not None:
+            backend.set(key, (value, cost), timeout=self.ttl)
+        with self._lock:
+            self.misses += 1
+        return value
+
+    def _store(self, key, value, cost, now):
+        with self._lock:
+            self._entries[key] = (value, cost, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the local entries (shared entries expire with their TTL)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "saved_seconds": round(self.saved_seconds, 6),
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+prediction_cache = PredictionCache()
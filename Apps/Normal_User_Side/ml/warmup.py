@@ -0,0 +1,60 @@
+"""
+Startup preloading of the active ML model.
+
+The first prediction after a worker boots otherwise pays for joblib.load and
+for the sklearn/pandas first-call overhead. preload_active_model() moves that
+cost to startup; it is called from CoreConfig.ready() when
+ML_PRELOAD_ON_STARTUP is enabled.
+"""
+import logging
+import time
+
+import pandas as pd
+from django.db import connection
+
+from .model_loader import get_model_entry
+from .predict import synthetic_feature_row
+
+logger = logging.getLogger(__name__)
+
+
+def preload_active_model():
+    """
+    Load the active model through model_loader and run a synthetic warm-up
+    prediction. Returns a dict of timings, or None if no model could be loaded.
+    Never raises: a failed preload just means the first request loads lazily.
+    """
+    timings = {}
+    try:
+        started = time.perf_counter()
+        entry = get_model_entry()  # falls back to the bundled model if the DB isn't ready
+        timings['load_seconds'] = time.perf_counter() - started
+        timings['model_id'] = entry.model_id
+
+        row = synthetic_feature_row()
+
+        # Warm the sklearn/pandas path used by batch evaluation (skipped for
+        # memory-mapped models, which would otherwise unpickle a private copy)...
+        started = time.perf_counter()
+        if entry.model_loaded:
+            entry.model.predict(pd.DataFrame([row]))
+        timings['warmup_seconds'] = time.perf_counter() - started
+
+        # ...and the compiled single-row path used by predict_land_price
+        if entry.compiled is not None:
+            started = time.perf_counter()
+            entry.compiled.predict_row(row)
+            timings['compiled_warmup_seconds'] = time.perf_counter() - started
+    except Exception:
+        logger.warning("ML model preload failed; the model will load on first use.", exc_info=True)
+        return None
+    finally:
+        # Don't carry a connection opened at startup into forked workers
+        if not connection.in_atomic_block:
+            connection.close()
+
+    logger.info(
+        "Preloaded ML model %s in %.3fs (warm-up %.3fs)",
+        timings['model_id'] or 'fallback', timings['load_seconds'], timings['warmup_seconds'],
+    )
+    return timings
@@ -1,10 +1,41 @@
-from django.test import TestCase, Client
+import glob
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import OperationalError
+from django.core.cache import caches
+from django.test import TestCase, SimpleTestCase, Client, override_settings
 from django.urls import reverse
 from unittest.mock import patch
-from Apps.core.models import Project, Governorate, Town, Area, Neighborhood
+from Apps.core.gazetteer import gazetteer
+from Apps.core.models import (
+    Project, ProjectRoad, Governorate, Town, Area, Neighborhood, MLModel, Setting
+)
+from Apps.Normal_User_Side.ml.compiled import (
+    CompiledPipeline, compile_model, sidecar_path, sidecar_is_fresh, write_artifact, artifact_report
+)
+from Apps.Normal_User_Side.ml.predict import (
+    NUMERIC_ML_COLUMNS, REQUIRED_ML_COLUMNS, predict_land_price, predict_land_prices, location_name
+)
+from Apps.Normal_User_Side.ml import model_loader
+from Apps.Normal_User_Side.ml.model_cache import ModelCache
+from Apps.Normal_User_Side.ml.warmup import preload_active_model
+from Apps.Normal_User_Side.ml.prediction_cache import PredictionCache
+from Apps.Normal_User_Side.ml.model_loader import (
+    FALLBACK_MODEL_PATH, get_model, get_compiled_model, get_active_model_id
+)
+from Apps.Data_Scientist_Side.preprocessing import preprocess_test_data
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
+SAMPLE_DATA_PATH = os.path.join(settings.BASE_DIR, 'data', 'sample_data.csv')
+
 
 class ProjectModelTest(TestCase):
     """Tests for the Project model."""
@@ -228,3 +259,436 @@ class ProjectIntegrationTest(TestCase):
         project = Project.objects.get(project_name="Test Project")
         self.assertEqual(project.status, "COMPLETED", "Project status should be 'COMPLETED'")
         self.assertEqual(project.estimated_price, 50.0, "Estimated price should match mocked ML value")
+
+
+class CompiledModelParityTest(SimpleTestCase):
+    """The compiled NumPy predictor must match sklearn's model.predict exactly."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        df = pd.read_csv(SAMPLE_DATA_PATH)
+        cls.X = preprocess_test_data(df)[REQUIRED_ML_COLUMNS]
+        cls.model_paths = [FALLBACK_MODEL_PATH] + sorted(
+            glob.glob(os.path.join(settings.MEDIA_ROOT, 'ml_models', '*.pkl'))
+        )
+
+    def test_batch_predict_matches_sklearn(self):
+        for path in self.model_paths:
+            with self.subTest(model=os.path.basename(path)):
+                model = joblib.load(path)
+                compiled = compile_model(model)
+                self.assertIsNotNone(compiled)
+                np.testing.assert_array_equal(compiled.predict(self.X), model.predict(self.X))
+
+    def test_predict_row_matches_sklearn(self):
+        model = joblib.load(FALLBACK_MODEL_PATH)
+        compiled = compile_model(model)
+        expected = model.predict(self.X)
+        for i, row in enumerate(self.X.to_dict('records')):
+            self.assertEqual(compiled.predict_row(row), expected[i])
+
+    def test_unknown_category_is_ignored_like_sklearn(self):
+        model = joblib.load(FALLBACK_MODEL_PATH)
+        compiled = compile_model(model)
+        X = self.X.head(5).copy()
+        X['Area'] = 'Unknown Area'
+        X['Neighborhood'] = 'Unknown Neighborhood'
+        np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+        self.assertEqual(compiled.predict_row(X.iloc[0].to_dict()), model.predict(X)[0])
+
+    def test_scaler_flags_match_sklearn(self):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+        from sklearn.tree import DecisionTreeRegressor
+        categorical = [c for c in REQUIRED_ML_COLUMNS if c not in NUMERIC_ML_COLUMNS]
+        y = self.X['area_m2'] * 10 + np.arange(len(self.X))
+        for with_mean, with_std in ((False, True), (True, False), (False, False)):
+            with self.subTest(with_mean=with_mean, with_std=with_std):
+                model = Pipeline([
+                    ('preprocessor', ColumnTransformer([
+                        ('num', StandardScaler(with_mean=with_mean, with_std=with_std), NUMERIC_ML_COLUMNS),
+                        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical),
+                    ])),
+                    ('regressor', DecisionTreeRegressor(random_state=0)),
+                ]).fit(self.X, y)
+                compiled = compile_model(model)
+                self.assertIsNotNone(compiled)
+                np.testing.assert_array_equal(compiled.predict(self.X), model.predict(self.X))
+
+    def test_missing_values_take_the_trees_side(self):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+        from sklearn.tree import DecisionTreeRegressor
+        X = self.X.copy()
+        for i, column in enumerate(NUMERIC_ML_COLUMNS):
+            X.loc[X.index[i::len(NUMERIC_ML_COLUMNS) + 1], column] = np.nan
+        categorical = [c for c in REQUIRED_ML_COLUMNS if c not in NUMERIC_ML_COLUMNS]
+        # Fitted on rows with gaps, so the splits learn where missing values go
+        fitted_with_gaps = Pipeline([
+            ('preprocessor', ColumnTransformer([
+                ('num', StandardScaler(), NUMERIC_ML_COLUMNS),
+                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical),
+            ])),
+            ('regressor', DecisionTreeRegressor(random_state=0)),
+        ]).fit(X, self.X['area_m2'] * 10 + np.arange(len(X)))
+        for name, model in (('fallback', joblib.load(FALLBACK_MODEL_PATH)), ('fitted', fitted_with_gaps)):
+            with self.subTest(model=name):
+                compiled = compile_model(model)
+                expected = model.predict(X)
+                np.testing.assert_array_equal(compiled.predict(X), expected)
+                for i, row in enumerate(X.to_dict('records')):
+                    self.assertEqual(compiled.predict_row(row), expected[i])
+
+    def test_unsupported_estimator_is_not_compiled(self):
+        from sklearn.linear_model import LinearRegression
+        from sklearn.pipeline import Pipeline
+        model = Pipeline([('regressor', LinearRegression().fit([[0.0], [1.0]], [0.0, 1.0]))])
+        self.assertIsNone(compile_model(model))
+
+
+class BatchPredictionTest(TestCase):
+    """predict_land_prices must agree with predict_land_price and batch its queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.governorate = Governorate.objects.create(name_ar="Hebron")
+        cls.town = Town.objects.create(governorate=cls.governorate, name_ar="Bani Naim")
+        cls.area = Area.objects.create(town=cls.town, name_ar="Wadi Al-Joz - Industrial Zone Link")
+        cls.neighborhood = Neighborhood.objects.create(area=cls.area, name_ar="Wadi Al-Joz Basin")
+        cls.user = User.objects.create_user(email="batch@example.com", password="pass12345", type="normal")
+
+        cls.fields = {
+            "governorate": cls.governorate,
+            "town": cls.town,
+            "area": cls.area,
+            "neighborhood": cls.neighborhood,
+            "neighborhood_no": "37",
+            "land_type": "PRIVATE",
+            "political_classification": "AREA_A",
+            "slope": "FLAT",
+            "view_quality": "GOOD",
+            "parcel_shape": "RECTANGLE",
+            "electricity": "YES_3PHASE",
+            "water": "YES",
+            "sewage": "YES_PRIVATE",
+            "ownership_document_type": "TABU",
+            "land_use_residential": True,
+            "schools_facility": True,
+        }
+        for i, (area_m2, width) in enumerate([(1010, 10), (1562, 16), (608, 6), (2500, 0)]):
+            project = Project.objects.create(
+                created_by=cls.user, project_name=f"Batch {i}", status="DRAFT",
+                parcel_no=str(i), area_m2=area_m2, parcel_frontage=25, **cls.fields
+            )
+            if width:
+                ProjectRoad.objects.create(
+                    project=project, road_status="PUBLIC_EXISTING_UNPAVED",
+                    road_ownership="PUBLIC", width_m=width
+                )
+
+    def test_batch_matches_single_predictions(self):
+        projects = list(Project.objects.order_by('id'))
+        expected = [predict_land_price(p) for p in projects]
+        self.assertEqual(predict_land_prices(Project.objects.order_by('id')), expected)
+        self.assertEqual(predict_land_prices(projects, batch_size=3), expected)
+
+    def test_batch_issues_constant_queries(self):
+        predict_land_prices(Project.objects.all())  # warm the model cache
+        with self.assertNumQueries(2):  # projects and roads
+            predict_land_prices(Project.objects.all())
+
+    def test_single_prediction_runs_no_location_queries(self):
+        predict_land_price(Project.objects.first())  # warm the model and gazetteer
+        project = Project.objects.prefetch_related('projectroad_set').get(parcel_no="0")
+        with self.assertNumQueries(0):
+            predict_land_price(project)
+
+    def test_renamed_location_refreshes_gazetteer(self):
+        project = Project.objects.get(parcel_no="0")
+        self.assertEqual(location_name(project, "area"), self.area.name_ar)
+        Area.objects.filter(pk=self.area.pk).update(name_ar="Renamed")  # no signal
+        self.assertEqual(location_name(project, "area"), self.area.name_ar)
+        area = Area.objects.get(pk=self.area.pk)
+        area.save()
+        self.assertEqual(location_name(project, "area"), "Renamed")
+
+    def test_unknown_location_reloads_once_per_version(self):
+        gazetteer.invalidate()
+        self.assertEqual(gazetteer.area_name(self.area.pk), self.area.name_ar)
+        with self.assertNumQueries(2):  # one reload: areas and neighborhoods
+            self.assertIsNone(gazetteer.area_name(-1))
+            self.assertIsNone(gazetteer.area_name(-2))
+            self.assertIsNone(gazetteer.neighborhood_name(-1))
+        area = Area.objects.create(town=self.town, name_ar="New Area")
+        self.assertEqual(gazetteer.area_name(area.pk), "New Area")  # its signal invalidated the maps
+
+    def test_cleaned_payloads(self):
+        project = Project.objects.get(parcel_no="0")
+        payload = {
+            **self.fields,
+            "area_m2": project.area_m2,
+            "parcel_frontage": project.parcel_frontage,
+            "roads": [{"road_status": "PUBLIC_EXISTING_UNPAVED", "width_m": 10}],
+        }
+        self.assertEqual(predict_land_prices([payload]), [predict_land_price(project)])
+
+
+class ModelResolutionTest(TestCase):
+    """get_model() caches the active model pointer and re-reads it only after a bump."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="scientist@example.com", password="pass12345", type="scientist")
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'ml_models'))
+        self.models = []
+        for name in ('first', 'second'):
+            shutil.copy(FALLBACK_MODEL_PATH, os.path.join(self.media_root, 'ml_models', f'{name}.pkl'))
+            self.models.append(MLModel.objects.create(
+                name=name, version='1.0', description='', created_by=self.user,
+                model_file_path=os.path.join('ml_models', f'{name}.pkl'),
+            ))
+        model_loader._active_version = None
+
+    def activate(self, ml_model):
+        with self.captureOnCommitCallbacks(execute=True):
+            setting, _ = Setting.objects.get_or_create(pk=1)
+            setting.active_ml_model = ml_model
+            setting.save()
+
+    def test_warm_get_model_runs_no_queries(self):
+        self.activate(self.models[0])
+        get_model()
+        with self.assertNumQueries(0):
+            get_model()
+            get_compiled_model()
+        self.assertEqual(get_active_model_id(), self.models[0].id)
+
+    def test_activation_invalidates_cached_pointer(self):
+        self.activate(self.models[0])
+        first = get_model()
+        self.activate(self.models[1])
+        self.assertIsNot(get_model(), first)
+        self.assertEqual(get_active_model_id(), self.models[1].id)
+
+
+class ModelCacheTest(SimpleTestCase):
+    """The shared model cache counts hits/misses and evicts LRU over its byte budget."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.paths = []
+        for name in ('a', 'b', 'c'):
+            path = os.path.join(self.tmp_dir, f'{name}.pkl')
+            shutil.copy(FALLBACK_MODEL_PATH, path)
+            self.paths.append(path)
+        self.size = os.path.getsize(FALLBACK_MODEL_PATH)
+
+    def test_hits_and_misses(self):
+        cache = ModelCache(max_bytes=10 * self.size)
+        first = cache.get(self.paths[0], model_id=1)
+        self.assertIs(cache.get(self.paths[0], model_id=1), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNotNone(first.compiled)
+        self.assertGreater(first.load_seconds, 0)
+
+    def test_lru_eviction_respects_budget(self):
+        cache = ModelCache(max_bytes=2 * self.size)
+        cache.get(self.paths[0], model_id=1)
+        cache.get(self.paths[1], model_id=2)
+        cache.get(self.paths[0], model_id=1)  # 'a' is now most recently used
+        cache.get(self.paths[2], model_id=3)
+
+        resident = {entry['model_id'] for entry in cache.stats()['entries']}
+        self.assertEqual(resident, {1, 3})
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+    def test_replaced_file_is_reloaded(self):
+        cache = ModelCache(max_bytes=10 * self.size)
+        first = cache.get(self.paths[0], model_id=1)
+        # A re-upload over the same path, atomically renamed into place
+        replacement = f"{self.paths[0]}.new"
+        shutil.copy(FALLBACK_MODEL_PATH, replacement)
+        os.replace(replacement, self.paths[0])
+
+        second = cache.get(self.paths[0], model_id=1)
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.fingerprint, first.fingerprint)
+        self.assertIs(cache.get(self.paths[0], model_id=1), second)
+        self.assertEqual(len(cache.stats()['entries']), 1)
+
+    @override_settings(ML_MODEL_SHARED_MEMORY=True)
+    def test_lazily_unpickled_model_counts_towards_budget(self):
+        cache = ModelCache(max_bytes=10 * self.size)
+        first = cache.get(self.paths[0], model_id=1)
+        artifact_bytes = first.size_bytes
+        self.assertFalse(first.model_loaded)
+
+        self.assertIsNotNone(first.model)  # e.g. a model test falling back to sklearn
+        self.assertEqual(first.size_bytes, artifact_bytes + self.size)
+        self.assertEqual(cache.total_bytes, artifact_bytes + self.size)
+
+        cache.get(self.paths[1], model_id=2)
+        cache._max_bytes = cache.total_bytes - 1
+        cache.get(self.paths[1], model_id=2)
+        self.assertEqual({entry['model_id'] for entry in cache.stats()['entries']}, {2})
+
+
+class ModelPreloadTest(TestCase):
+    """preload_active_model() loads and warms the model, even without a usable DB."""
+
+    def setUp(self):
+        model_loader._active_version = None
+
+    def test_preload_reports_timings(self):
+        timings = preload_active_model()
+        self.assertIsNotNone(timings)
+        self.assertIn('load_seconds', timings)
+        self.assertIn('warmup_seconds', timings)
+        self.assertIn('compiled_warmup_seconds', timings)
+
+    def test_preload_survives_unmigrated_database(self):
+        with patch.object(model_loader, '_resolve_active_model', side_effect=OperationalError('no such table')):
+            timings = preload_active_model()
+        self.assertIsNotNone(timings)
+        self.assertIsNone(timings['model_id'])
+
+
+class SharedModelMemoryTest(SimpleTestCase):
+    """Memory-mapped compiled sidecars predict like the pickle and skip unpickling."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.path = os.path.join(self.tmp_dir, 'model.pkl')
+        shutil.copy(FALLBACK_MODEL_PATH, self.path)
+        self.X = preprocess_test_data(pd.read_csv(SAMPLE_DATA_PATH))[REQUIRED_ML_COLUMNS]
+
+    def test_sidecar_of_older_format_is_stale(self):
+        write_artifact(self.path)
+        self.assertTrue(sidecar_is_fresh(self.path))
+        schema_path = os.path.join(sidecar_path(self.path), 'schema.json')
+        with open(schema_path, encoding='utf-8') as f:
+            schema = json.load(f)
+        schema['format_version'] = 1
+        with open(schema_path, 'w', encoding='utf-8') as f:
+            json.dump(schema, f)
+        self.assertFalse(sidecar_is_fresh(self.path))
+
+    def test_sidecar_round_trip(self):
+        model = joblib.load(self.path)
+        compile_model(model).save(sidecar_path(self.path))
+        mapped = CompiledPipeline.load(sidecar_path(self.path), mmap_mode='r')
+        self.assertIsInstance(mapped.threshold, np.memmap)
+        np.testing.assert_array_equal(mapped.predict(self.X), model.predict(self.X))
+
+    @override_settings(ML_MODEL_SHARED_MEMORY=True)
+    def test_shared_cache_entry_maps_sidecar(self):
+        entry = ModelCache().get(self.path)
+        self.assertTrue(entry.shared)
+        self.assertTrue(sidecar_is_fresh(self.path))
+        self.assertFalse(entry.model_loaded)
+
+        second = ModelCache().get(self.path)  # e.g. another worker
+        np.testing.assert_array_equal(second.compiled.predict(self.X), entry.model.predict(self.X))
+
+
+class CompactArtifactTest(TestCase):
+    """Uploads emit a pickle-free artifact that the model cache loads instead of the .pkl."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.path = os.path.join(self.media_root, 'model.pkl')
+        shutil.copy(FALLBACK_MODEL_PATH, self.path)
+
+    def test_artifact_is_preferred_over_pickle(self):
+        report = write_artifact(self.path)
+        self.assertEqual(report, artifact_report(self.path))
+        self.assertEqual(report['pickle_bytes'], os.path.getsize(self.path))
+
+        entry = ModelCache().get(self.path)
+        self.assertFalse(entry.model_loaded)
+        self.assertFalse(entry.shared)
+        X = preprocess_test_data(pd.read_csv(SAMPLE_DATA_PATH))[REQUIRED_ML_COLUMNS]
+        np.testing.assert_array_equal(entry.compiled.predict(X), entry.model.predict(X))
+
+    def test_unsupported_model_has_no_artifact(self):
+        from sklearn.linear_model import LinearRegression
+        joblib.dump(LinearRegression(), self.path)
+        self.assertIsNone(write_artifact(self.path))
+        self.assertIsNone(artifact_report(self.path))
+
+    def test_upload_writes_artifact(self):
+        user = User.objects.create_user(email="uploader@example.com", password="pass12345", type="scientist")
+        self.client.force_login(user)
+        with open(FALLBACK_MODEL_PATH, 'rb') as f:
+            response = self.client.post(reverse('data_scientist:model_upload'), {
+                'name': 'Uploaded', 'version': '2.0', 'description': 'test', 'model_file': f,
+            }, follow=True)
+        model = MLModel.objects.get(name='Uploaded')
+        self.assertIsNotNone(artifact_report(os.path.join(self.media_root, model.model_file_path)))
+        self.assertContains(response, 'Compact artifact')
+
+
+class PredictionCacheTest(SimpleTestCase):
+    """Predictions are memoized per (model, feature row) with LRU/TTL bounds."""
+
+    def setUp(self):
+        self.row = preprocess_test_data(pd.read_csv(SAMPLE_DATA_PATH)).iloc[0].to_dict()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return 42.0
+
+    def test_equal_rows_hit(self):
+        cache = PredictionCache(max_entries=10, ttl=60)
+        cache.get_or_compute('m1', self.row, self.compute)
+        # Same values in other types (e.g. Decimal widths from a formset)
+        row = {**self.row, 'width_m': Decimal(str(self.row['width_m']))}
+        self.assertEqual(cache.get_or_compute('m1', row, self.compute), 42.0)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['hit_ratio'], 0.5)
+
+    def test_model_change_misses(self):
+        cache = PredictionCache(max_entries=10, ttl=60)
+        cache.get_or_compute('m1', self.row, self.compute)
+        cache.get_or_compute('m2', self.row, self.compute)
+        self.assertEqual(self.calls, 2)
+
+    def test_lru_and_ttl_bounds(self):
+        cache = PredictionCache(max_entries=1, ttl=60)
+        cache.get_or_compute('m1', self.row, self.compute)
+        cache.get_or_compute('m1', {**self.row, 'area_m2': 1.0}, self.compute)
+        cache.get_or_compute('m1', self.row, self.compute)
+        self.assertEqual(self.calls, 3)
+
+        cache = PredictionCache(max_entries=10, ttl=0)
+        cache.get_or_compute('m1', self.row, self.compute)
+        cache.get_or_compute('m1', self.row, self.compute)
+        self.assertEqual(self.calls, 5)
+
+    def test_shared_backend(self):
+        caches['default'].clear()
+        backend = PredictionCache(max_entries=10, ttl=60, backend='default')
+        backend.get_or_compute('m1', self.row, self.compute)
+        other_worker = PredictionCache(max_entries=10, ttl=60, backend='default')
+        other_worker.get_or_compute('m1', self.row, self.compute)
+        self.assertEqual(self.calls, 1)
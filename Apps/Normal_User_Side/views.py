@@ -1,5 +1,4 @@
 from django.contrib import messages
-from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.db.models import Sum
@@ -176,7 +175,7 @@ def newProject(request, project_id=None):
                             Valuation.objects.filter(
                                 project=project, 
                                 deleted_at__isnull=True
-                            ).update(deleted_at=timezone.now())
+                            ).soft_delete()
                             
                             # Create new valuation
                             Valuation.objects.create(
@@ -506,7 +505,7 @@ def api_confirm_prediction(request):
                 Valuation.objects.filter(
                     project=project, 
                     deleted_at__isnull=True
-                ).update(deleted_at=timezone.now())
+                ).soft_delete()
                 
                 valuation = Valuation.objects.create(
                     project=project,
@@ -546,7 +545,7 @@ def api_confirm_prediction(request):
                     Valuation.objects.filter(
                         project=project, 
                         deleted_at__isnull=True
-                    ).update(deleted_at=timezone.now())
+                    ).soft_delete()
                     
                     Valuation.objects.create(
                         project=project,
@@ -3,7 +3,7 @@ from Apps.core.models import (
     Governorate, Town, Area, Neighborhood,
     LandUseType, FacilityType, EnvironmentalFactorType,
     Project, 
-    ProjectRoad, MLModel, Setting, Valuation
+    ProjectRoad, MLModel, Setting, Valuation, EvaluationJob
 )
 
 
@@ -130,3 +130,11 @@ class ValuationAdmin(admin.ModelAdmin):
     list_filter = ['deleted_at', 'created_at']
     search_fields = ['project__project_name']
     readonly_fields = ['created_at']
+
+
+@admin.register(EvaluationJob)
+class EvaluationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model', 'status', 'rows_processed', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['input_name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'heartbeat_at']
@@ -1,7 +1,25 @@
+import warnings
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Apps.core'
     verbose_name = 'Core'
+
+    def ready(self):
+        # Register signal handlers
+        from Apps.core import signals  # noqa: F401
+
+        # Optionally load + warm up the active ML model before serving requests
+        if getattr(settings, 'ML_PRELOAD_ON_STARTUP', False):
+            from Apps.Normal_User_Side.ml.warmup import preload_active_model
+            with warnings.catch_warnings():
+                # Resolving the active model is a single read of the settings row;
+                # preload_active_model() copes with an unmigrated database.
+                warnings.filterwarnings(
+                    'ignore', message='Accessing the database during app initialization',
+                    category=RuntimeWarning,
+                )
+                preload_active_model()
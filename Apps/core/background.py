@@ -0,0 +1,21 @@
+"""
+Work a request shouldn't wait for, run on a daemon thread of the same process.
+
+Used for the stale-while-revalidate refresh of the scientist page cache and
+the batched flush of the drift histograms. There is no queue: callers make
+sure only one such thread per task runs at a time.
+"""
+import threading
+
+from django.db import connections
+
+
+def run_in_background(target):
+    """Call target() on a new daemon thread, then close that thread's database connections."""
+    def run():
+        try:
+            target()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, daemon=True).start()
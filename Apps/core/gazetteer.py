@@ -0,0 +1,66 @@
+"""
+In-process id -> name_ar maps for Area and Neighborhood.
+
+The feature row for a prediction needs the Arabic names of the parcel's
+Area and Neighborhood; reading them through project.area / project.neighborhood
+costs a query each. The whole gazetteer is small, so it is loaded once per
+process and reloaded only when a location row changes (signals bump the
+"gazetteer" version) or an unknown id is requested. Unknown ids reload at
+most once per version: after that they are None until the next bump, so a
+stream of stale ids can't reload the maps on every lookup.
+"""
+import threading
+from Apps.core.versioning import read_version, bump_version
+
+VERSION_NAME = "gazetteer"
+
+
+class Gazetteer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._reloaded = False
+        self._areas = {}
+        self._neighborhoods = {}
+
+    def _load(self, version, reloaded=False):
+        from Apps.core.models import Area, Neighborhood
+        areas = dict(Area.objects.values_list('id', 'name_ar'))
+        neighborhoods = dict(Neighborhood.objects.values_list('id', 'name_ar'))
+        with self._lock:
+            self._areas = areas
+            self._neighborhoods = neighborhoods
+            self._version = version
+            self._reloaded = reloaded
+
+    def _lookup(self, attr, pk):
+        if pk is None:
+            return None
+        version = read_version(VERSION_NAME)
+        if version != self._version:
+            self._load(version)
+        name = getattr(self, attr).get(pk)
+        if name is None and not self._reloaded:
+            # Row created since the last load (e.g. before its signal committed)
+            self._load(version, reloaded=True)
+            name = getattr(self, attr).get(pk)
+        return name
+
+    def area_name(self, area_id):
+        return self._lookup('_areas', area_id)
+
+    def neighborhood_name(self, neighborhood_id):
+        return self._lookup('_neighborhoods', neighborhood_id)
+
+    def invalidate(self):
+        """Drop this process's maps; the next lookup reloads them."""
+        with self._lock:
+            self._version = None
+
+
+gazetteer = Gazetteer()
+
+
+def bump_gazetteer_version():
+    gazetteer.invalidate()
+    bump_version(VERSION_NAME)
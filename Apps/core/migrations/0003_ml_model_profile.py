@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_evaluation_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodel',
+            name='artifact_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='batch_rows_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='load_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='memory_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='profile_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='profile_status',
+            field=models.CharField(choices=[('NOT_PROFILED', 'Not profiled'), ('PASSED', 'Passed'), ('FAILED', 'Failed')], default='NOT_PROFILED', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='profiled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='single_row_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
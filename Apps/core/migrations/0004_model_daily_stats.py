@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Abs, TruncDate
+
+STAT_FIELDS = [
+    'valuation_count', 'feedback_count', 'predicted_sum',
+    'abs_error_sum', 'deviation_percent_sum', 'squared_error_sum',
+]
+
+
+def backfill(apps, schema_editor):
+    """Fill the new table from the live valuations (frozen copy of model_stats.rebuild)."""
+    ModelDailyStats = apps.get_model('core', 'ModelDailyStats')
+    Valuation = apps.get_model('core', 'Valuation')
+
+    error = ExpressionWrapper(Abs(F('predicted_price_per_m2') - F('user_expected_price')), output_field=FloatField())
+    feedback = Q(user_expected_price__isnull=False)
+    rows = Valuation.objects.filter(deleted_at__isnull=True).annotate(
+        day=TruncDate('created_at'),
+    ).values('model_id', 'day').annotate(
+        valuation_count=Count('id'),
+        feedback_count=Count('id', filter=feedback),
+        predicted_sum=Sum(ExpressionWrapper(F('predicted_price_per_m2'), output_field=FloatField())),
+        abs_error_sum=Sum(error, filter=feedback),
+        deviation_percent_sum=Sum(Case(
+            When(user_expected_price__gt=0, then=ExpressionWrapper(
+                error * Value(100.0) / F('user_expected_price'), output_field=FloatField()
+            )),
+            output_field=FloatField(),
+        )),
+        squared_error_sum=Sum(ExpressionWrapper(error * error, output_field=FloatField()), filter=feedback),
+    )
+
+    now = django.utils.timezone.now()
+    ModelDailyStats.objects.bulk_create([
+        ModelDailyStats(
+            model_id=row['model_id'], day=row['day'], updated_at=now,
+            **{field: row[field] or 0 for field in STAT_FIELDS},
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_ml_model_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('valuation_count', models.IntegerField(default=0)),
+                ('feedback_count', models.IntegerField(default=0)),
+                ('predicted_sum', models.FloatField(default=0)),
+                ('abs_error_sum', models.FloatField(default=0)),
+                ('deviation_percent_sum', models.FloatField(default=0)),
+                ('squared_error_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.mlmodel')),
+            ],
+            options={
+                'db_table': 'model_daily_stats',
+                'indexes': [models.Index(fields=['day'], name='ix_model_daily_stats_day')],
+                'constraints': [models.UniqueConstraint(fields=('model', 'day'), name='uq_model_daily_stats')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
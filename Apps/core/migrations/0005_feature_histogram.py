@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_model_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('REFERENCE', 'Reference'), ('LIVE', 'Live')], max_length=10)),
+                ('feature', models.CharField(max_length=64)),
+                ('edges', models.JSONField(blank=True, null=True)),
+                ('counts', models.JSONField(default=list)),
+                ('total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.mlmodel')),
+            ],
+            options={
+                'db_table': 'feature_histograms',
+                'constraints': [models.UniqueConstraint(fields=('model', 'source', 'feature'), name='uq_feature_histogram')],
+            },
+        ),
+    ]
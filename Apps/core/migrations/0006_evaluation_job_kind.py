@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_feature_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluationjob',
+            name='kind',
+            field=models.CharField(choices=[('EVALUATE', 'Evaluate'), ('PROFILE', 'Profile')], default='EVALUATE', max_length=20),
+        ),
+    ]
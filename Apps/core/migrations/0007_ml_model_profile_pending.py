@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+def mark_pending(apps, schema_editor):
+    """Models with a load check still queued are PENDING; the rest predate the gate."""
+    MLModel = apps.get_model('core', 'MLModel')
+    EvaluationJob = apps.get_model('core', 'EvaluationJob')
+    queued = EvaluationJob.objects.filter(kind='PROFILE', status__in=['QUEUED', 'RUNNING'])
+    MLModel.objects.filter(
+        profile_status='NOT_PROFILED', pk__in=queued.values('model_id'),
+    ).update(profile_status='PENDING')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_evaluation_job_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mlmodel',
+            name='profile_status',
+            field=models.CharField(choices=[('NOT_PROFILED', 'Not profiled'), ('PENDING', 'Pending'), ('PASSED', 'Passed'), ('FAILED', 'Failed')], default='NOT_PROFILED', max_length=20),
+        ),
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,129 @@
+"""
+Per-model, per-day rollup of valuations (ModelDailyStats).
+
+Every live (not soft-deleted) valuation contributes to the row of its model
+and creation day: one to valuation_count, its predicted price to
+predicted_sum and, once it has a user_expected_price, one to feedback_count
+plus its absolute, percent and squared error. Valuation.save(),
+ValuationQuerySet.soft_delete() and the post_delete signal apply the change
+in a valuation's contribution in the same transaction as the write, so the
+statistics pages read a few dozen rollup rows instead of every valuation.
+
+rebuild() recomputes the table from the valuations (`manage.py
+backfill_model_stats`, and once by the migration that adds the table).
+
+Every change also bumps STATS_VERSION_NAME (Apps/core/versioning.py) once
+it commits, which invalidates the cached statistics pages in every worker.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Abs, TruncDate
+from django.utils import timezone
+
+from Apps.core.versioning import bump_version
+
+# Version of everything the scientist dashboard and statistics pages show;
+# also bumped by MLModel, Setting and Project writes (Apps/core/signals.py)
+STATS_VERSION_NAME = 'valuation_stats'
+
+# Summed fields of ModelDailyStats, in contribution order
+STAT_FIELDS = [
+    'valuation_count', 'feedback_count', 'predicted_sum',
+    'abs_error_sum', 'deviation_percent_sum', 'squared_error_sum',
+]
+
+
+def bump_stats_version():
+    """Invalidate cached statistics in every worker once the current write commits."""
+    transaction.on_commit(lambda: bump_version(STATS_VERSION_NAME))
+
+
+def contribution(valuation):
+    """((model id, day), {field: value}) a valuation adds to the rollup, or None if it's deleted."""
+    if valuation is None or valuation.deleted_at is not None:
+        return None
+    predicted = float(valuation.predicted_price_per_m2)
+    values = dict.fromkeys(STAT_FIELDS, 0)
+    values['valuation_count'] = 1
+    values['predicted_sum'] = predicted
+    if valuation.user_expected_price is not None:
+        expected = float(valuation.user_expected_price)
+        error = abs(predicted - expected)
+        values['feedback_count'] = 1
+        values['abs_error_sum'] = error
+        values['squared_error_sum'] = error * error
+        # Same rule as the statistics page: no percentage against a zero price
+        if expected > 0:
+            values['deviation_percent_sum'] = error / expected * 100
+    return (valuation.model_id, timezone.localdate(valuation.created_at)), values
+
+
+def apply(key, values, sign=1):
+    """Add (sign=1) or subtract (sign=-1) `values` to the rollup row `key`."""
+    from Apps.core.models import ModelDailyStats
+
+    changes = {field: F(field) + sign * value for field, value in values.items() if value}
+    if not changes:
+        return
+    model_id, day = key
+    stats, _ = ModelDailyStats.objects.get_or_create(model_id=model_id, day=day)
+    ModelDailyStats.objects.filter(pk=stats.pk).update(updated_at=timezone.now(), **changes)
+
+
+def record_change(before, after):
+    """Move the rollup from one contribution (or None) to another, in the caller's transaction."""
+    bump_stats_version()
+    if before is not None and after is not None and before[0] == after[0]:
+        key = after[0]
+        apply(key, {field: after[1][field] - before[1][field] for field in STAT_FIELDS})
+        return
+    if before is not None:
+        apply(*before, sign=-1)
+    if after is not None:
+        apply(*after)
+
+
+def rebuild(apps=None):
+    """
+    Recompute every rollup row from the live valuations. Returns the row count.
+    Writes made while it runs can be lost on databases without table locks;
+    run it when valuations aren't being written. `apps` is the app registry
+    to take the models from (a migration's historical one, or the live one).
+    """
+    if apps is None:
+        from django.apps import apps
+    ModelDailyStats = apps.get_model('core', 'ModelDailyStats')
+    Valuation = apps.get_model('core', 'Valuation')
+
+    error = Abs(F('predicted_price_per_m2') - F('user_expected_price'))
+    feedback = Q(user_expected_price__isnull=False)
+    float_error = ExpressionWrapper(error, output_field=FloatField())
+    rows = Valuation.objects.filter(deleted_at__isnull=True).annotate(
+        day=TruncDate('created_at'),
+    ).values('model_id', 'day').annotate(
+        valuation_count=Count('id'),
+        feedback_count=Count('id', filter=feedback),
+        predicted_sum=Sum(ExpressionWrapper(F('predicted_price_per_m2'), output_field=FloatField())),
+        abs_error_sum=Sum(float_error, filter=feedback),
+        deviation_percent_sum=Sum(Case(
+            When(user_expected_price__gt=0, then=ExpressionWrapper(
+                float_error * Value(100.0) / F('user_expected_price'), output_field=FloatField()
+            )),
+            output_field=FloatField(),
+        )),
+        squared_error_sum=Sum(ExpressionWrapper(float_error * float_error, output_field=FloatField()),
+                              filter=feedback),
+    )
+
+    with transaction.atomic():
+        ModelDailyStats.objects.all().delete()
+        now = timezone.now()
+        ModelDailyStats.objects.bulk_create([
+            ModelDailyStats(
+                model_id=row['model_id'], day=row['day'], updated_at=now,
+                **{field: row[field] or 0 for field in STAT_FIELDS},
+            )
+            for row in rows
+        ])
+        bump_stats_version()
+    return ModelDailyStats.objects.count()
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
+from django.utils import timezone
 from django.conf import settings
 from Apps.core.mixins import AutoCodeMixin
 
@@ -328,6 +329,13 @@ class ProjectRoad(models.Model):
 
 
 class MLModel(models.Model):
+    class ProfileStatus(models.TextChoices):
+        # Uploaded before load checks existed; never gated
+        NOT_PROFILED = 'NOT_PROFILED', 'Not profiled'
+        PENDING = 'PENDING', 'Pending'
+        PASSED = 'PASSED', 'Passed'
+        FAILED = 'FAILED', 'Failed'
+
     name = models.CharField(max_length=120)
     version = models.CharField(max_length=50)
     description = models.TextField()
@@ -337,6 +345,18 @@ class MLModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    # Upload-time check (Apps/Data_Scientist_Side/profiling.py)
+    profile_status = models.CharField(
+        max_length=20, choices=ProfileStatus.choices, default=ProfileStatus.NOT_PROFILED
+    )
+    profile_error = models.TextField(blank=True)
+    profiled_at = models.DateTimeField(null=True, blank=True)
+    load_ms = models.FloatField(null=True, blank=True)
+    single_row_ms = models.FloatField(null=True, blank=True)
+    batch_rows_per_second = models.FloatField(null=True, blank=True)
+    artifact_bytes = models.BigIntegerField(null=True, blank=True)
+    memory_bytes = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         db_table = 'ml_models'
 
@@ -349,6 +369,19 @@ class Setting(models.Model):
         db_table = 'settings'
 
 
+class ValuationQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Mark the live valuations in this queryset deleted, taking them out of ModelDailyStats."""
+        from Apps.core import model_stats
+
+        with transaction.atomic():
+            live = list(self.filter(deleted_at__isnull=True).select_for_update())
+            self.model.objects.filter(pk__in=[v.pk for v in live]).update(deleted_at=timezone.now())
+            for valuation in live:
+                model_stats.record_change(model_stats.contribution(valuation), None)
+        return len(live)
+
+
 class Valuation(models.Model):
     project = models.ForeignKey(Project, on_delete=models.PROTECT)
     model = models.ForeignKey(MLModel, on_delete=models.PROTECT)
@@ -359,6 +392,8 @@ class Valuation(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    objects = ValuationQuerySet.as_manager()
+
     class Meta:
         db_table = 'valuations'
         constraints = [
@@ -368,3 +403,112 @@ class Valuation(models.Model):
                 name='uq_valuation_project_active'
             )
         ]
+
+    def save(self, *args, **kwargs):
+        # The rollup moves with the row: from what's stored to what's saved
+        from Apps.core import model_stats
+
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                stored = Valuation.objects.select_for_update().filter(pk=self.pk).first()
+                before = model_stats.contribution(stored)
+            super().save(*args, **kwargs)
+            model_stats.record_change(before, model_stats.contribution(self))
+
+
+class ModelDailyStats(models.Model):
+    """Sums over one model's live valuations created on one day (see Apps/core/model_stats.py)."""
+    model = models.ForeignKey(MLModel, on_delete=models.CASCADE)
+    day = models.DateField()
+    valuation_count = models.IntegerField(default=0)
+    feedback_count = models.IntegerField(default=0)
+    predicted_sum = models.FloatField(default=0)
+    abs_error_sum = models.FloatField(default=0)
+    deviation_percent_sum = models.FloatField(default=0)
+    squared_error_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'model_daily_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'day'], name='uq_model_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='ix_model_daily_stats_day'),
+        ]
+
+
+class FeatureHistogram(models.Model):
+    """
+    Distribution of one model input feature, from the reference data or live
+    traffic (see Apps/Normal_User_Side/ml/drift.py). Numeric features have
+    bin edges and a list of len(edges) + 1 counts; categorical ones no edges
+    and {value: count}.
+    """
+
+    class Source(models.TextChoices):
+        REFERENCE = 'REFERENCE', 'Reference'
+        LIVE = 'LIVE', 'Live'
+
+    model = models.ForeignKey(MLModel, on_delete=models.CASCADE)
+    source = models.CharField(max_length=10, choices=Source.choices)
+    feature = models.CharField(max_length=64)
+    edges = models.JSONField(null=True, blank=True)
+    counts = models.JSONField(default=list)
+    total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'feature_histograms'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'source', 'feature'], name='uq_feature_histogram'),
+        ]
+
+
+class EvaluationJob(models.Model):
+    """
+    A job executed by `manage.py run_jobs`: a model test run queued from
+    model_test, or the load check of an uploaded model.
+    """
+
+    class Kind(models.TextChoices):
+        EVALUATE = 'EVALUATE', 'Evaluate'
+        PROFILE = 'PROFILE', 'Profile'
+
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+
+    model = models.ForeignKey(MLModel, on_delete=models.PROTECT)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.EVALUATE)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    input_name = models.CharField(max_length=255)
+    input_path = models.CharField(max_length=1024)
+    input_bytes = models.BigIntegerField(default=0)
+    results_token = models.CharField(max_length=32)
+    bytes_processed = models.BigIntegerField(default=0)
+    rows_processed = models.BigIntegerField(default=0)
+    metrics = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=255, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'evaluation_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='ix_evaluation_job_queue'),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED, self.Status.CANCELLED)
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from Apps.core.gazetteer import gazetteer, bump_gazetteer_version
+from Apps.core import model_stats
+from Apps.core.models import Area, MLModel, Neighborhood, Project, Setting, Valuation
+
+
+def _bump_model_version():
+    """Tell every worker to re-resolve the active model once the write commits."""
+    from Apps.Normal_User_Side.ml.model_loader import bump_model_version
+    transaction.on_commit(bump_model_version)
+
+
+@receiver(post_save, sender=Setting)
+@receiver(post_delete, sender=Setting)
+def setting_changed(sender, **kwargs):
+    _bump_model_version()
+    model_stats.bump_stats_version()
+
+
+@receiver(post_save, sender=MLModel)
+def ml_model_changed(sender, **kwargs):
+    # The active model's file path or soft-delete state may have changed
+    _bump_model_version()
+    model_stats.bump_stats_version()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, **kwargs):
+    # Project counts and the geographic distribution on the statistics page
+    model_stats.bump_stats_version()
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(post_save, sender=Neighborhood)
+@receiver(post_delete, sender=Neighborhood)
+def location_changed(sender, **kwargs):
+    # Drop this process's names now, everyone else's once the write commits
+    gazetteer.invalidate()
+    transaction.on_commit(bump_gazetteer_version)
+
+
+@receiver(post_delete, sender=Valuation)
+def valuation_deleted(sender, instance, **kwargs):
+    # Runs inside the delete's transaction; soft deletes go through soft_delete()
+    model_stats.record_change(model_stats.contribution(instance), None)
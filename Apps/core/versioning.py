@@ -0,0 +1,36 @@
+"""
+Cross-process version counters for in-process caches.
+
+Each named version is a small file that is atomically replaced on every
+bump. Readers compare its (inode, mtime) with the token they cached against,
+which costs a single stat() and no SQL, so every worker notices a bump made
+by any other worker on its next lookup.
+"""
+import os
+import uuid
+from django.conf import settings
+
+VERSIONS_DIRNAME = ".versions"
+
+
+def version_file(name):
+    return os.path.join(settings.MEDIA_ROOT, VERSIONS_DIRNAME, f"{name}.version")
+
+
+def read_version(name):
+    """Cheap version token for `name` (0 if it was never bumped)."""
+    try:
+        stat = os.stat(version_file(name))
+    except OSError:
+        return 0
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def bump_version(name):
+    """Invalidate every process's caches that depend on `name`."""
+    path = version_file(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp_path, path)
@@ -156,3 +156,91 @@ DEFAULT_FROM_EMAIL = "LandPriceEstimator <msamalq306@gmail.com>"
 # Media files (uploaded by users)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+
+# ML inference
+# Lower supported sklearn pipelines to flat NumPy arrays for prediction
+# (see Apps/Normal_User_Side/ml/compiled.py). Set to False to always use sklearn.
+ML_COMPILED_INFERENCE = True
+
+# Upper bound (bytes on disk) for models kept resident per worker by the
+# shared LRU model cache (Apps/Normal_User_Side/ml/model_cache.py).
+ML_MODEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Load and warm up the active ML model in CoreConfig.ready() so the first
+# request after a deploy doesn't pay for it. Timings are logged.
+ML_PRELOAD_ON_STARTUP = os.environ.get('ML_PRELOAD_ON_STARTUP', '') == '1'
+
+# Serve compilable models from a memory-mapped sidecar directory written next
+# to the .pkl (<name>.compiled/) so pre-forked workers share one physical copy
+# of the arrays instead of each unpickling its own.
+ML_MODEL_SHARED_MEMORY = os.environ.get('ML_MODEL_SHARED_MEMORY', '') == '1'
+
+# Memoized single-parcel predictions, keyed by feature row + model
+# (Apps/Normal_User_Side/ml/prediction_cache.py). Size 0 disables it; set
+# the backend to a CACHES alias to share entries between workers.
+ML_PREDICTION_CACHE_SIZE = 10000
+ML_PREDICTION_CACHE_TTL = 60 * 60
+ML_PREDICTION_CACHE_BACKEND = None
+
+# Model testing (Data_Scientist_Side): test files are evaluated in chunks of
+# this many rows (Apps/Data_Scientist_Side/evaluation.py), so memory doesn't
+# grow with the upload; the size cap only bounds disk use and run time.
+MODEL_TEST_CHUNK_ROWS = 50000
+MODEL_TEST_MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+
+# Test files larger than this are queued as EvaluationJobs for
+# `manage.py run_jobs` instead of being evaluated inside the request.
+MODEL_TEST_SYNC_MAX_BYTES = 5 * 1024 * 1024
+
+# Full test results are kept in the on-disk result store
+# (Apps/Data_Scientist_Side/result_store.py) for this many seconds.
+MODEL_TEST_RESULTS_TTL = 24 * 60 * 60
+
+# Parsed and preprocessed test files are cached by content
+# (Apps/Data_Scientist_Side/dataset_cache.py) up to this many bytes on disk.
+MODEL_TEST_DATASET_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Comparing several models on one file (Apps/Data_Scientist_Side/comparison.py):
+# the preprocessed file is held in memory and the models predict in a pool
+# of this many processes (None = one per CPU).
+MODEL_COMPARE_MAX_BYTES = 100 * 1024 * 1024
+MODEL_COMPARE_WORKERS = None
+
+# Bootstrap confidence intervals of test metrics (Apps/Data_Scientist_Side/analysis.py)
+# are computed in this many processes for large files (None = one per CPU).
+MODEL_TEST_BOOTSTRAP_WORKERS = None
+
+# Uploaded models are loaded and timed in a separate process
+# (Apps/Data_Scientist_Side/profiling.py), queued as a job for
+# `manage.py run_jobs`; model_activate refuses a model that fails that check
+# or is outside these budgets (None disables a budget).
+MODEL_PROFILE_TIMEOUT = 60
+MODEL_PROFILE_MAX_LOAD_MS = 5000
+MODEL_PROFILE_MAX_SINGLE_ROW_MS = 50
+MODEL_PROFILE_MIN_BATCH_ROWS_PER_SECOND = 1000
+MODEL_PROFILE_MAX_MEMORY_BYTES = 1024 * 1024 * 1024
+
+# The computed dashboard and statistics pages are cached in this cache backend
+# (Apps/Data_Scientist_Side/page_cache.py) under keys that change whenever
+# valuations, models or the active model are written; the TTL only bounds
+# memory (0 disables the cache). With stale-while-revalidate, the previous
+# payload (at most MAX_STALE seconds old) is served while a background thread
+# recomputes it.
+SCIENTIST_PAGE_CACHE_BACKEND = 'default'
+SCIENTIST_PAGE_CACHE_TTL = 10 * 60
+SCIENTIST_PAGE_CACHE_STALE_WHILE_REVALIDATE = False
+SCIENTIST_PAGE_CACHE_MAX_STALE = 60 * 60
+
+# Feature drift monitoring (Apps/Normal_User_Side/ml/drift.py): served feature
+# rows are buffered per process and counted into histograms by a background
+# thread every FLUSH_ROWS rows or FLUSH_SECONDS; rows past MAX_PENDING_ROWS
+# are dropped. The drift page flags features whose PSI against the upload-time
+# reference reaches WARN / ALERT, once MIN_LIVE_ROWS rows were counted.
+DRIFT_MONITORING = True
+DRIFT_FLUSH_ROWS = 500
+DRIFT_FLUSH_SECONDS = 60
+DRIFT_MAX_PENDING_ROWS = 100000
+DRIFT_PSI_WARN = 0.1
+DRIFT_PSI_ALERT = 0.25
+DRIFT_MIN_LIVE_ROWS = 100
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Land_Price_Estimator.settings')
 
 application = get_wsgi_application()
+
+# Only a serving process buffers drift rows, so only it needs them written at exit
+from Apps.Normal_User_Side.ml.drift import register_exit_flush  # noqa: E402
+
+register_exit_flush()
@@ -0,0 +1,117 @@
+"""
+Wall time and peak memory of reading a model-test workbook: pd.read_excel
+on the whole file (the previous .xlsx path) against the chunked read-only
+openpyxl reader model_test uses now (read_xlsx_chunks).
+
+The workbook is built from data/sample_data.csv rows (200k by default) and
+kept at --workbook between runs, since writing it takes a while. Each
+reader runs in its own forked process so peak RSS isn't shared between
+them. The two readers are first checked to return the same frame on a
+small workbook.
+
+Usage:
+    python benchmarks/excel_ingestion.py [--rows 200000] [--workbook /tmp/model_test.xlsx]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Land_Price_Estimator.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from Apps.Data_Scientist_Side.evaluation import DEFAULT_CHUNK_ROWS, read_xlsx_chunks  # noqa: E402
+
+SAMPLE_DATA_PATH = os.path.join(ROOT, 'data', 'sample_data.csv')
+
+
+def write_workbook(path, n_rows, seed=0):
+    sample = pd.read_csv(SAMPLE_DATA_PATH)
+    rng = np.random.default_rng(seed)
+    rows = sample.astype(object).where(sample.notna(), None).values.tolist()
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(sample.columns))
+    for i in rng.integers(0, len(rows), n_rows):
+        sheet.append(rows[i])
+    workbook.save(path)
+
+
+def read_whole(path):
+    df = pd.read_excel(path)
+    return sum(len(df.iloc[start:start + DEFAULT_CHUNK_ROWS]) for start in range(0, len(df), DEFAULT_CHUNK_ROWS))
+
+
+def read_streaming(path):
+    with open(path, 'rb') as f:
+        return sum(len(chunk) for chunk in read_xlsx_chunks(f, DEFAULT_CHUNK_ROWS))
+
+
+READERS = [('pd.read_excel', read_whole), ('read_xlsx_chunks', read_streaming)]
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(queue, func, path):
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    rows = func(path)
+    queue.put((rows, time.perf_counter() - started, _peak_rss_mb(), _peak_rss_mb() - baseline))
+
+
+def measure(func, path):
+    context = mp.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(queue, func, path))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def check_same_frame():
+    with tempfile.NamedTemporaryFile(suffix='.xlsx') as f:
+        write_workbook(f.name, 500, seed=1)
+        expected = pd.read_excel(f.name)
+        with open(f.name, 'rb') as source:
+            actual = pd.concat(read_xlsx_chunks(source, 128))
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--workbook', default=os.path.join(tempfile.gettempdir(), 'model_test.xlsx'))
+    args = parser.parse_args()
+
+    check_same_frame()
+
+    if not os.path.exists(args.workbook):
+        print(f"Writing {args.rows:,} rows to {args.workbook} ...")
+        write_workbook(args.workbook, args.rows)
+    size_mb = os.path.getsize(args.workbook) / (1024 * 1024)
+    print(f"{args.workbook}: {size_mb:.1f} MB")
+
+    print(f"{'reader':<18}  {'rows':>9}  {'seconds':>8}  {'peak RSS MB':>11}  {'growth MB':>9}")
+    for name, func in READERS:
+        rows, seconds, peak, growth = measure(func, args.workbook)
+        print(f"{name:<18}  {rows:>9,}  {seconds:>8.1f}  {peak:>11.0f}  {growth:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Throughput of preprocess_test_data against the per-element implementation
+it replaced, at 10k, 100k and 1M synthetic rows.
+
+Rows are drawn from data/sample_data.csv with messy variants mixed in
+(padded/lowercase slope and view values, yes/no/1/True flags, blanks), and
+the two implementations are checked to produce the same frame first.
+
+Usage:
+    python benchmarks/preprocess_test_data.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Apps.Data_Scientist_Side.preprocessing import (  # noqa: E402
+    BINARY_COLUMNS, SLOPE_MAPPING, VIEW_QUALITY_MAPPING, preprocess_test_data,
+)
+
+SAMPLE_DATA_PATH = os.path.join(ROOT, 'data', 'sample_data.csv')
+
+
+# The implementation before the column spec, kept for comparison
+def legacy_preprocess_test_data(df):
+    """
+    Transform user's CSV/Excel data to match ML model's expected format.
+    Handles column renaming, value mappings, and data type conversions.
+    """
+    result = pd.DataFrame()
+    
+    # Copy location columns directly
+    result['Area'] = df['Area']
+    result['Neighborhood'] = df['Neighborhood']
+    result['political_classification'] = df['political_classification']
+    result['parcel_shape'] = df['parcel_shape']
+    
+    # Handle road statuses - convert FALSE to proper ML format
+    for i, col_name in enumerate(['road_status1', 'road_status2', 'road_status3']):
+        if col_name in df.columns:
+            result[col_name] = df[col_name].fillna('FALSE').replace('', 'FALSE')
+        else:
+            result[col_name] = 'FALSE'
+    
+    # Map slope values to ML format
+    if 'slope' in df.columns:
+        result['slope'] = df['slope'].map(lambda x: SLOPE_MAPPING.get(str(x).strip(), 'FLAT'))
+    else:
+        result['slope'] = 'FLAT'
+    
+    # Map view_quality values (handle typos)
+    if 'view_quality' in df.columns:
+        result['view_quality'] = df['view_quality'].map(
+            lambda x: VIEW_QUALITY_MAPPING.get(str(x).strip().upper(), 'GOOD')
+        )
+    else:
+        result['view_quality'] = 'GOOD'
+    
+    # Copy electricity and Sewage
+    result['electricity'] = df['electricity'] if 'electricity' in df.columns else 'NO'
+    result['Sewage'] = df['Sewage'] if 'Sewage' in df.columns else 'NO'
+    
+    # Numeric columns
+    result['area_m2'] = pd.to_numeric(df['area_m2'], errors='coerce').fillna(0)
+    
+    if 'parcel_frontage (m)' in df.columns:
+        result['parcel_frontage (m)'] = pd.to_numeric(df['parcel_frontage (m)'], errors='coerce').fillna(0)
+    else:
+        result['parcel_frontage (m)'] = 0
+    
+    # Handle width_m columns - user file may have multiple columns with same name
+    # or may have them as width_m, width_m, width_m (which pandas renames to width_m, width_m.1, width_m.2)
+    width_cols = [c for c in df.columns if c.startswith('width_m')]
+    for i, ml_col in enumerate(['width_m', 'width_m.1', 'width_m.2']):
+        if i < len(width_cols):
+            result[ml_col] = pd.to_numeric(df[width_cols[i]], errors='coerce').fillna(0)
+        else:
+            result[ml_col] = 0
+    
+    # Binary columns - convert TRUE/FALSE strings to 1/0
+    binary_columns = [
+        'land_use_residential', 'land_use_commercial', 'land_use_agricultural',
+        'land_use_industrial', 'hospitals_facility', 'schools_facility',
+        'police_facility', 'municipality_facility', 'FACTORIES_NEARBY',
+        'NOISY_FACILITIES', 'ANIMAL_FARMS'
+    ]
+    
+    for col in binary_columns:
+        if col in df.columns:
+            result[col] = df[col].map(lambda x: 1 if str(x).upper() in ['TRUE', '1', 'YES'] else 0)
+        else:
+            result[col] = 0
+    
+    # Water - convert YES/NO to 1/0 for ML
+    if 'water' in df.columns:
+        result['water'] = df['water'].map(lambda x: 1 if str(x).upper() == 'YES' else 0)
+    else:
+        result['water'] = 0
+    
+    return result
+
+
+def synthetic_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(SAMPLE_DATA_PATH)
+    df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+
+    df['slope'] = rng.choice(['Flat (0-5%)', ' MILD ', 'Steep (>30%)', 'moderate', 'unknown'], n_rows)
+    df['view_quality'] = rng.choice(['good', 'FANTACTIC ', 'BAD', 'Fantastic', ''], n_rows)
+    flags = np.array(['TRUE', 'FALSE', 'yes', 'no', '1', '0', ''], dtype=object)
+    for column in BINARY_COLUMNS:
+        df[column] = rng.choice(flags, n_rows)
+    df['water'] = rng.choice(['YES', 'no', 'Yes', ''], n_rows)
+    return df
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    check = synthetic_frame(10_000, seed=1)
+    pd.testing.assert_frame_equal(
+        preprocess_test_data(check), legacy_preprocess_test_data(check), check_dtype=False
+    )
+
+    print(f"{'rows':>10}  {'legacy rows/s':>14}  {'spec rows/s':>14}  {'speedup':>8}")
+    for n_rows in args.sizes:
+        df = synthetic_frame(n_rows)
+        legacy = best_of(legacy_preprocess_test_data, df, args.repeat)
+        current = best_of(preprocess_test_data, df, args.repeat)
+        print(f"{n_rows:>10,}  {n_rows / legacy:>14,.0f}  {n_rows / current:>14,.0f}  {legacy / current:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Per-worker memory of the three model loading modes, with 1, 4 and 16
+forked workers (Linux only: reads /proc/<pid>/smaps_rollup).
+
+    pickle   every worker joblib.load()s its own copy (the default today)
+    prefork  the parent loads the pickle once, workers inherit it copy-on-write
+    mmap     every worker maps the compiled .npy sidecar (ML_MODEL_SHARED_MEMORY)
+
+RSS counts shared pages in full for every process, so compare PSS (shared
+pages divided between the processes mapping them) and USS (private pages).
+
+The bundled models are only a few KB, so by default a large tree with the
+same pipeline shape is fitted on synthetic rows to make the difference
+visible. Pass --model to measure a real artifact instead.
+
+Usage:
+    python benchmarks/shared_model_memory.py [--rows 300000] [--model path.pkl]
+"""
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Apps.Normal_User_Side.ml.compiled import CompiledPipeline, compile_model, sidecar_path  # noqa: E402
+
+NUMERIC = ['area_m2', 'parcel_frontage (m)', 'width_m', 'width_m.1', 'width_m.2']
+CATEGORICAL = ['Area', 'Neighborhood', 'parcel_shape', 'road_status1']
+BINARY = ['land_use_residential', 'land_use_commercial', 'water']
+
+
+def synthetic_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {name: rng.uniform(0, 5000, n_rows) for name in NUMERIC}
+    for name in CATEGORICAL:
+        data[name] = rng.choice([f'{name}_{i}' for i in range(40)], n_rows)
+    for name in BINARY:
+        data[name] = rng.integers(0, 2, n_rows)
+    return pd.DataFrame(data)
+
+
+def fit_synthetic_model(n_rows):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    from sklearn.tree import DecisionTreeRegressor
+
+    X = synthetic_frame(n_rows)
+    y = np.random.default_rng(1).uniform(10, 500, n_rows)
+    model = Pipeline([
+        ('preprocessor', ColumnTransformer([
+            ('num', StandardScaler(), NUMERIC),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL),
+            ('bin', 'passthrough', BINARY),
+        ])),
+        ('regressor', DecisionTreeRegressor(random_state=42)),
+    ])
+    return model.fit(X, y)
+
+
+def memory_kb(pid='self'):
+    """RSS / PSS / USS in KB from smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def worker(mode, model_path, preloaded, X, start, stop, results):
+    if mode == 'pickle':
+        predictor = joblib.load(model_path)
+    elif mode == 'prefork':
+        predictor = preloaded
+    else:
+        predictor = CompiledPipeline.load(sidecar_path(model_path), mmap_mode='r')
+    predictor.predict(X)  # touch the model like a serving worker would
+    gc.collect()
+    start.wait()   # every worker is resident before anyone measures
+    results.put(memory_kb())
+    stop.wait()
+
+
+def run(mode, n_workers, model_path, X):
+    ctx = mp.get_context('fork')
+    preloaded = joblib.load(model_path) if mode == 'prefork' else None
+    start = ctx.Barrier(n_workers + 1)
+    stop = ctx.Event()
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(mode, model_path, preloaded, X, start, stop, results))
+        for _ in range(n_workers)
+    ]
+    for p in procs:
+        p.start()
+    start.wait()
+    samples = [results.get() for _ in procs]
+    stop.set()
+    for p in procs:
+        p.join()
+    return {
+        key: round(sum(s[key] for s in samples) / len(samples) / 1024, 1)
+        for key in ('rss', 'pss', 'uss')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='Model .pkl to measure (default: synthetic large tree)')
+    parser.add_argument('--rows', type=int, default=300_000, help='Training rows for the synthetic tree')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            model_path = os.path.join(tmp, os.path.basename(args.model))
+            model = joblib.load(args.model)
+            X = None
+        else:
+            model = fit_synthetic_model(args.rows)
+            model_path = os.path.join(tmp, 'synthetic.pkl')
+            X = synthetic_frame(1000, seed=7)
+        joblib.dump(model, model_path)
+
+        compiled = compile_model(model)
+        if compiled is None:
+            sys.exit('Model cannot be compiled; the mmap mode does not apply to it.')
+        compiled.save(sidecar_path(model_path))
+        if X is None:
+            # Feed the real model rows built from its own vocabularies
+            X = pd.DataFrame({
+                **{name: np.zeros(1000) for name in compiled.numeric_columns},
+                **{name: np.resize(vocab, 1000) for name, vocab in
+                   zip(compiled.categorical_columns, compiled.vocabularies)},
+            })
+        del model, compiled
+        gc.collect()
+
+        report = {
+            'model_bytes': os.path.getsize(model_path),
+            'node_count': int(np.load(os.path.join(sidecar_path(model_path), 'value.npy')).shape[0]),
+            'results': [],
+        }
+        for mode in ('pickle', 'prefork', 'mmap'):
+            for n in args.workers:
+                report['results'].append({'mode': mode, 'workers': n, **run(mode, n, model_path, X)})
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"model: {report['model_bytes'] / 1e6:.1f} MB pickle, {report['node_count']} tree nodes")
+    print(f"{'mode':<8} {'workers':>7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}   (mean per worker)")
+    for r in report['results']:
+        print(f"{r['mode']:<8} {r['workers']:>7} {r['rss']:>8} {r['pss']:>8} {r['uss']:>8}")
+
+
+if __name__ == '__main__':
+    main()